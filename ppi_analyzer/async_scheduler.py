@@ -0,0 +1,216 @@
+"""
+Async Scheduler Module
+Aggregazione asincrona su scala genomica con limiti di concorrenza per endpoint
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Tuple
+from config import DEFAULT_MAX_PENDING_GENES
+from sparql_aggregator import SPARQLAggregator, SOURCE_ENDPOINTS
+
+
+class AsyncAggregationEngine:
+    """
+    Scheduler asincrono per l'aggregazione di migliaia di geni.
+
+    Ogni richiesta (gene, fonte) è un task indipendente che attende solo il
+    semaforo del proprio endpoint: UniProt, STRING e WikiPathways sono quindi
+    saturati ciascuno fino al proprio limite ("concurrency" in ENDPOINTS),
+    invece di restare in attesa l'uno dell'altro. Le chiamate HTTP restano
+    quelle bloccanti di SPARQLAggregator, eseguite su un pool di thread.
+    """
+
+    def __init__(self, aggregator: Optional[SPARQLAggregator] = None,
+                 concurrency: Optional[Dict[str, int]] = None,
+                 max_pending_genes: int = DEFAULT_MAX_PENDING_GENES):
+        """
+        Args:
+            aggregator: Aggregatore da usare (i suoi endpoint determinano i limiti)
+            concurrency: Richieste simultanee per endpoint (default da ENDPOINTS)
+            max_pending_genes: Geni in lavorazione contemporaneamente
+        """
+        self.aggregator = aggregator or SPARQLAggregator()
+        self.concurrency = concurrency or {
+            name: conf.get("concurrency", 1)
+            for name, conf in self.aggregator.endpoints.items()
+        }
+        self.max_pending_genes = max_pending_genes
+
+    async def _fetch(self, executor: ThreadPoolExecutor, semaphores: Dict[str, asyncio.Semaphore],
+                     name: str, fetch: Any, gene: str) -> Any:
+        """Esegue la chiamata di una fonte rispettando il limite del suo endpoint"""
+        loop = asyncio.get_running_loop()
+        async with semaphores[SOURCE_ENDPOINTS[name]]:
+            return await loop.run_in_executor(executor, fetch, gene)
+
+    async def _aggregate_gene(self, executor: ThreadPoolExecutor,
+                              semaphores: Dict[str, asyncio.Semaphore],
+                              gene: str) -> Tuple[str, Dict[str, Any]]:
+        """Interroga tutte le fonti di un gene e costruisce il risultato unificato"""
+        fetchers = self.aggregator.source_fetchers()
+        values = await asyncio.gather(*(
+            self._fetch(executor, semaphores, name, fetch, gene)
+            for name, fetch in fetchers.items()
+        ))
+        return gene, self.aggregator.build_result(gene, dict(zip(fetchers, values)))
+
+    async def stream(self, genes: Iterable[str]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Aggrega i geni e produce (gene, dati) man mano che vengono completati.
+        La lista di geni è consumata in modo incrementale (al più
+        max_pending_genes geni in corso).
+        """
+        limits = {name: self.concurrency.get(name, 1) for name in set(SOURCE_ENDPOINTS.values())}
+        semaphores = {name: asyncio.Semaphore(limit) for name, limit in limits.items()}
+        workers = sum(limits.values())
+        gene_iter = iter(genes)
+        pending = set()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                while True:
+                    while len(pending) < self.max_pending_genes:
+                        gene = next(gene_iter, None)
+                        if gene is None:
+                            break
+                        pending.add(asyncio.ensure_future(
+                            self._aggregate_gene(executor, semaphores, gene)))
+
+                    if not pending:
+                        break
+
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+            finally:
+                for task in pending:
+                    task.cancel()
+
+    async def run(self, genes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Aggrega tutti i geni e ritorna un dizionario gene -> dati"""
+        return {gene: data async for gene, data in self.stream(genes)}
+
+    def aggregate(self, genes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Versione sincrona di run() (crea un nuovo event loop)"""
+        return asyncio.run(self.run(genes))
+
+
+# =============================================================================
+# ENDPOINT LOCALI DI PROVA
+# =============================================================================
+
+def start_local_endpoints(latency: float = 0.05) -> Tuple[Dict[str, Dict], Dict[str, int], Any]:
+    """
+    Avvia un server http.server locale per ogni endpoint (porte libere su
+    127.0.0.1) che risponde dopo latency secondi con risultati vuoti: SPARQL
+    JSON per UniProt e WikiPathways, lista JSON per STRING. Serve a misurare
+    lo scheduler (concorrenza per endpoint, throughput) senza toccare i
+    servizi reali.
+
+    Ritorna (endpoints, picchi, stop): la configurazione da passare a
+    SPARQLAggregator(endpoints=...), il massimo di richieste simultanee
+    osservato per endpoint e la funzione che ferma i server.
+    """
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from config import ENDPOINTS
+
+    peaks = {name: 0 for name in ENDPOINTS}
+    in_flight = {name: 0 for name in ENDPOINTS}
+    lock = threading.Lock()
+    servers = []
+
+    def make_handler(name: str):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive come i servizi reali
+
+            def _respond(self):
+                with lock:
+                    in_flight[name] += 1
+                    peaks[name] = max(peaks[name], in_flight[name])
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    if length:
+                        self.rfile.read(length)
+                    time.sleep(latency)
+                    empty = [] if name == "string" else {"head": {"vars": []}, "results": {"bindings": []}}
+                    body = json.dumps(empty).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with lock:
+                        in_flight[name] -= 1
+
+            do_GET = do_POST = _respond
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    endpoints = {}
+    for name, conf in ENDPOINTS.items():
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(name))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        endpoints[name] = dict(conf, url=f"http://127.0.0.1:{server.server_port}/{name}",
+                               mode="remote", result_format="json")
+
+    def stop():
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+    return endpoints, peaks, stop
+
+
+# =============================================================================
+# TEST
+# =============================================================================
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Aggregazione asincrona di prova")
+    parser.add_argument("genes", nargs="*", default=["EYS", "ABCA4", "RPGR", "PRPH2"], help="Geni da aggregare")
+    parser.add_argument("--local", type=int, metavar="N",
+                        help="Usa endpoint locali di prova con N geni sintetici (nessuna richiesta esterna)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latenza degli endpoint locali (secondi)")
+    args = parser.parse_args()
+
+    genes = args.genes
+    peaks = stop = None
+    if args.local:
+        endpoints, peaks, stop = start_local_endpoints(args.latency)
+        aggregator = SPARQLAggregator(endpoints=endpoints, rate_limiting=False, verbose=False)
+        genes = [f"GENE{i}" for i in range(args.local)]
+    else:
+        aggregator = SPARQLAggregator()
+    engine = AsyncAggregationEngine(aggregator)
+    start = time.time()
+
+    async def main():
+        async for gene, data in engine.stream(genes):
+            if not args.local:
+                print(f"[OK] {gene}: {', '.join(data['sources']) or 'nessuna fonte'}")
+
+    try:
+        asyncio.run(main())
+    finally:
+        aggregator.close()
+        if stop is not None:
+            stop()
+
+    elapsed = time.time() - start
+    print(f"\nCompletato in {elapsed:.1f}s ({len(genes) / elapsed if elapsed else 0:.1f} geni/s)")
+    if peaks is not None:
+        for name, peak in peaks.items():
+            print(f"  {name}: {peak} richieste simultanee (limite {engine.concurrency.get(name)})")
@@ -0,0 +1,156 @@
+"""
+Checkpoint Module
+Journal append-only (JSONL) delle aggregazioni multi-gene: i risultati per
+fonte sono salvati man mano, così un'esecuzione interrotta può riprendere
+rifacendo solo il lavoro mancante
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+from sparql_aggregator import ProteinInfo, Interaction
+
+
+def _encode(source: str, value: Any) -> Any:
+    """Risultato di una fonte in forma serializzabile JSON"""
+    if value is None:
+        return None
+    if source == "protein_info":
+        return asdict(value)
+    if source == "interactions":
+        return [asdict(i) for i in value]
+    return value
+
+
+def _decode(source: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if source == "protein_info":
+        return ProteinInfo(**value)
+    if source == "interactions":
+        return [Interaction(**i) for i in value]
+    return value
+
+
+class CheckpointJournal:
+    """
+    Journal dei geni aggregati.
+
+    Ogni riga è un record JSON {"gene", "results", "failed", "time"} con i
+    risultati per fonte ("protein_info", "go_terms", ...) e le fonti fallite.
+    Un gene può avere più righe (una per tentativo): i risultati si
+    sovrappongono nell'ordine di scrittura e valgono le fonti fallite
+    dell'ultimo tentativo. In memoria restano solo gli offset delle righe,
+    i risultati vengono riletti dal file quando servono.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        """
+        Args:
+            path: File JSONL del journal (creato se non esiste)
+            fsync: Forza la scrittura su disco dopo ogni record
+        """
+        self.path = path
+        self.fsync = fsync
+        self._offsets: Dict[str, List[int]] = {}
+        self._failed: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._load()
+        self._file = open(path, "ab")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        offset = 0
+        bad = None
+        with open(self.path, "rb") as f:
+            for number, line in enumerate(f, 1):
+                if bad is not None:
+                    # La riga non valida non era l'ultima: la si ignora
+                    print(f"[ERRORE] {self.path}: riga {bad} non valida, ignorata")
+                    bad = None
+                try:
+                    record = json.loads(line)
+                    gene = record["gene"]
+                except (ValueError, KeyError, TypeError):
+                    bad = number
+                else:
+                    self._offsets.setdefault(gene, []).append(offset)
+                    self._failed[gene] = record.get("failed", [])
+                offset += len(line)
+                last = line
+
+        if bad is not None:
+            # Ultima riga troncata da un'interruzione: viene rimossa
+            with open(self.path, "r+b") as f:
+                f.truncate(offset - len(last))
+        elif offset and not last.endswith(b"\n"):
+            # Ultima riga valida ma senza a capo: il prossimo record inizia su una riga nuova
+            with open(self.path, "ab") as f:
+                f.write(b"\n")
+
+    def __contains__(self, gene: str) -> bool:
+        return gene in self._offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def is_complete(self, gene: str) -> bool:
+        """True se il gene è nel journal senza fonti fallite"""
+        return gene in self._offsets and not self._failed.get(gene)
+
+    def pending_sources(self, gene: str) -> Optional[List[str]]:
+        """Fonti ancora da interrogare: None = tutte (gene mai registrato)"""
+        if gene not in self._offsets:
+            return None
+        return list(self._failed.get(gene, []))
+
+    def results(self, gene: str) -> Dict[str, Any]:
+        """Risultati per fonte di un gene, uniti da tutti i suoi record"""
+        with self._lock:
+            self._file.flush()
+            offsets = list(self._offsets.get(gene, []))
+        results: Dict[str, Any] = {}
+        with open(self.path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                record = json.loads(f.readline())
+                for source, value in record["results"].items():
+                    results[source] = _decode(source, value)
+        return results
+
+    def record(self, gene: str, results: Dict[str, Any], failed: List[str]):
+        """Aggiunge il risultato di un tentativo (solo le fonti interrogate)"""
+        line = json.dumps({
+            "gene": gene,
+            "results": {source: _encode(source, value) for source, value in results.items()
+                        if source not in failed},
+            "failed": list(failed),
+            "time": time.time()
+        }, ensure_ascii=False).encode("utf-8") + b"\n"
+
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._offsets.setdefault(gene, []).append(offset)
+            self._failed[gene] = list(failed)
+
+    def stats(self) -> Dict[str, int]:
+        failed = sum(1 for sources in self._failed.values() if sources)
+        return {"genes": len(self._offsets), "complete": len(self._offsets) - failed, "with_failures": failed}
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "CheckpointJournal":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -8,19 +8,50 @@ ENDPOINTS = {
         "url": "https://sparql.uniprot.org/sparql",
         "name": "UniProt",
         "description": "Database proteico principale",
-        "timeout": 60
+        "timeout": 60,
+        "batch_size": 100,     # Geni per query VALUES nelle richieste batch
+        "cache_ttl": 7 * 24 * 3600,  # Validità risposte in cache (secondi)
+        "pool_size": 12,       # Connessioni keep-alive verso l'host
+        "concurrency": 8,      # Richieste simultanee iniziali (scheduler asincrono e AIMD)
+        "max_concurrency": 12,  # Tetto della concorrenza adattiva (al più pool_size)
+        "rate_limit": 10.0,    # Richieste/secondo iniziali (adattate con AIMD)
+        "max_rate_limit": 20.0,  # Tetto del rate adattivo
+        "hedge_percentile": 0.95,  # Hedging: duplica oltre il p95 della latenza
+        "hedge_budget": 0.1,   # Frazione massima di richieste duplicate
+        "result_format": "json"  # "json", "tsv" o "csv" (tsv/csv: meno byte e parsing più rapido)
     },
     "wikipathways": {
         "url": "https://sparql.wikipathways.org/sparql",
         "name": "WikiPathways",
         "description": "Database pathway biologici",
-        "timeout": 60
+        "timeout": 60,
+        "batch_size": 50,      # Geni per query VALUES (il FILTER UCASE è valutato riga per riga)
+        "cache_ttl": 7 * 24 * 3600,
+        "pool_size": 6,
+        "concurrency": 4,
+        "max_concurrency": 6,
+        "rate_limit": 5.0,
+        "max_rate_limit": 10.0,
+        "hedge_percentile": 0.95,
+        "hedge_budget": 0.1,
+        "result_format": "json",
+        "mode": "remote",      # "remote" (SPARQL) o "offline" (indice locale da dump RDF/GPML)
+        "index_path": "wikipathways_index.sqlite"  # Creato con: python wikipathways_index.py <dump>
     },
     "string": {
         "url": "https://string-db.org/api",
         "name": "STRING",
         "description": "Interazioni proteina-proteina",
-        "timeout": 30
+        "timeout": 30,
+        "batch_size": 200,     # Identificativi per chiamata nelle richieste batch
+        "cache_ttl": 30 * 24 * 3600,
+        "pool_size": 4,
+        "concurrency": 2,
+        "max_concurrency": 4,
+        "rate_limit": 1.0,     # STRING chiede circa una richiesta al secondo
+        "max_rate_limit": 2.0,
+        "mode": "remote",      # "remote" (API REST) o "offline" (indice mmap da protein.links.detailed)
+        "index_path": "string_index"  # Creato con: python string_index.py <links> --info <info>
     }
 }
 
@@ -28,6 +59,31 @@ ENDPOINTS = {
 DEFAULT_ORGANISM = "9606"  # Homo sapiens
 DEFAULT_CONFIDENCE = 0.7   # Score minimo STRING
 DEFAULT_LIMIT = 100        # Limite risultati query
+DEFAULT_MAX_WORKERS = 5    # Thread per interrogazioni concorrenti delle fonti
+DEFAULT_POOL_SIZE = 4      # Connessioni keep-alive per host non configurati
+DEFAULT_MAX_PENDING_GENES = 64  # Geni in corso nello scheduler asincrono
+DEFAULT_MAX_RETRIES = 4    # Tentativi extra su 429/5xx/timeout
+DEFAULT_PAGE_SIZE = 1000   # Righe per pagina nelle query paginate (LIMIT/OFFSET)
+
+# Espansione multi-hop della rete (network_expansion.py)
+DEFAULT_EXPANSION_DEPTH = 2      # Hop dai geni seed
+DEFAULT_EXPANSION_FANOUT = 20    # Partner per gene interrogato (i migliori per score)
+DEFAULT_EXPANSION_MAX_NODES = 5000  # Geni interrogati al massimo per espansione
+
+# Metriche di rete (network_analytics.py)
+DEFAULT_BETWEENNESS_SAMPLES = 32   # Sorgenti campionate per la betweenness approssimata
+DEFAULT_PAGERANK_ALPHA = 0.85      # Probabilità di proseguire il random walk (1 - restart)
+DEFAULT_PAGERANK_EPSILON = 1e-7    # Residuo massimo per unità di grado nel PageRank a push
+# Pesi dei percentili nella priorità dei candidati alla validazione
+DEFAULT_RANKING_WEIGHTS = {"score": 0.5, "pagerank": 0.3, "betweenness": 0.1, "clustering": 0.1}
+
+# Sovrarappresentazione GO/pathway (term_enrichment.py)
+DEFAULT_ENRICHMENT_MIN_TERM_SIZE = 3    # Geni annotati minimi nel background per testare un termine
+DEFAULT_ENRICHMENT_MAX_TERM_SIZE = 500  # Termini più generici sono esclusi
+
+# Cache persistente delle risposte
+DEFAULT_CACHE_PATH = "ppi_cache.sqlite"
+DEFAULT_CACHE_MAX_MB = 512  # Oltre questa dimensione si eliminano le voci meno usate (LRU)
 
 # Colori per output console
 COLORS = {
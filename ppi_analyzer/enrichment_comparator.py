@@ -3,10 +3,15 @@ Enrichment Comparator Module
 Confronta interattori da fonti diverse (letteratura/PDF vs database) e identifica gap di conoscenza
 """
 
+import bisect
+import io
 import json
-from typing import Dict, List, Set, Optional, Tuple
+import operator
+from typing import Dict, Iterable, List, Set, Optional, TextIO, Tuple
 from dataclasses import dataclass, field
 from collections import defaultdict
+from config import DEFAULT_CONFIDENCE, DEFAULT_RANKING_WEIGHTS
+from interaction_graph import InteractionGraph
 
 
 @dataclass
@@ -21,6 +26,56 @@ class ComparisonResult:
     overlap_score: float = 0.0
 
 
+@dataclass
+class BatchComparison:
+    """
+    Confronto letteratura vs database per molti geni.
+    Conteggi e Jaccard sono calcolati per tutti i geni insieme; gli insiemi
+    only_in_a/only_in_b/in_both sono costruiti solo su richiesta (result),
+    il riepilogo usa solo i conteggi.
+    """
+    genes: List[str]
+    sets_a: List[Set[str]]
+    sets_b: List[Set[str]]
+    count_a: List[int]
+    count_b: List[int]
+    count_both: List[int]
+    overlap_scores: List[float]
+
+    def __post_init__(self):
+        self._rows = {gene: i for i, gene in enumerate(self.genes)}
+
+    def __len__(self) -> int:
+        return len(self.genes)
+
+    def result(self, gene: str) -> ComparisonResult:
+        """ComparisonResult di un gene (equivalente a compare_sources)"""
+        i = self._rows[gene]
+        a, b = self.sets_a[i], self.sets_b[i]
+        return ComparisonResult(
+            gene=gene,
+            source_a="Literature",
+            source_b="Databases",
+            only_in_a=a - b,
+            only_in_b=b - a,
+            in_both=a & b,
+            overlap_score=self.overlap_scores[i]
+        )
+
+    def summary(self) -> List[Dict]:
+        """Conteggi e Jaccard per gene, senza costruire gli insiemi"""
+        return [
+            {
+                "gene": gene,
+                "only_in_literature": self.count_a[i] - self.count_both[i],
+                "only_in_databases": self.count_b[i] - self.count_both[i],
+                "in_both": self.count_both[i],
+                "overlap_score": self.overlap_scores[i]
+            }
+            for i, gene in enumerate(self.genes)
+        ]
+
+
 @dataclass
 class GapAnalysis:
     """Analisi dei gap di conoscenza"""
@@ -41,6 +96,31 @@ class EnrichmentComparator:
     def __init__(self):
         self.literature_data: Dict[str, Set[str]] = {}
         self.database_data: Dict[str, Dict] = {}
+        # Metriche di rete per gene centrale: partner -> metriche (network_analytics)
+        self.network_data: Dict[str, Dict[str, Dict[str, float]]] = {}
+        # Risultati per gene ("comparison", "gaps", "partners"), azzerati a ogni load del gene
+        self._memo: Dict[str, Dict[str, object]] = {}
+
+    def _invalidate(self, gene: str):
+        """Scarta i risultati memorizzati di un gene dopo un nuovo load"""
+        self._memo.pop(gene, None)
+
+    def discard(self, gene: str):
+        """
+        Rimuove tutti i dati di un gene (letteratura, database, risultati
+        memorizzati): permette di elaborare un flusso di geni (iter_aggregate)
+        un record alla volta con memoria costante.
+        """
+        self.literature_data.pop(gene, None)
+        self.database_data.pop(gene, None)
+        self.network_data.pop(gene, None)
+        self._invalidate(gene)
+
+    def _memoized(self, gene: str, key: str, compute):
+        memo = self._memo.setdefault(gene, {})
+        if key not in memo:
+            memo[key] = compute(gene)
+        return memo[key]
 
     def load_literature_interactors(self, gene: str, interactors: List[str],
                                     metadata: Optional[Dict] = None):
@@ -56,6 +136,7 @@ class EnrichmentComparator:
             "interactors": set(i.upper() for i in interactors),
             "metadata": metadata or {}
         }
+        self._invalidate(gene)
 
     def load_database_interactors(self, gene: str, aggregated_data: Dict):
         """
@@ -77,14 +158,77 @@ class EnrichmentComparator:
             "interactors": interactors,
             "full_data": aggregated_data
         }
+        self._invalidate(gene)
+
+    def load_database_graph(self, graph: InteractionGraph, genes: Optional[List[str]] = None):
+        """
+        Carica interattori da un InteractionGraph, senza copiare le interazioni
+        in dizionari: i dettagli degli archi sono letti dal grafo quando servono.
+
+        Args:
+            graph: Grafo delle interazioni
+            genes: Geni centrali da caricare (default: tutti i geni con archi)
+        """
+        for gene in genes if genes is not None else graph.genes():
+            self.database_data[gene] = {
+                "interactors": graph.partners(gene),
+                "graph": graph
+            }
+            self._invalidate(gene)
+
+    def load_database_snapshot(self, snapshot, genes: Optional[List[str]] = None):
+        """
+        Carica interattori da uno snapshot colonnare (snapshot.Snapshot).
+        Ogni gene è passato a load_database_interactors come vista lazy:
+        vengono lette solo le colonne delle interazioni.
+
+        Args:
+            snapshot: Snapshot aperto
+            genes: Geni centrali da caricare (default: tutti)
+        """
+        for gene in genes if genes is not None else snapshot.genes():
+            if gene in snapshot:
+                self.load_database_interactors(gene, snapshot.view(gene))
+
+    def load_network_metrics(self, gene: str, metrics: Dict[str, Dict[str, float]]):
+        """
+        Carica le metriche di rete dei partner di un gene, usate per ordinare
+        i candidati alla validazione e come attributi dei nodi Cytoscape.
+
+        Args:
+            gene: Gene centrale
+            metrics: Gene -> metriche, es. NetworkAnalytics.metrics(seeds=[gene])
+                     (degree, weighted_degree, clustering, betweenness, pagerank)
+        """
+        self.network_data[gene] = {g.upper(): values for g, values in metrics.items()}
+        self._memo.pop(gene, None)
+
+    def _partner_index(self, gene: str) -> Dict[str, Dict]:
+        """Partner (maiuscolo) -> interazione (partner, score, evidence) per un gene (memorizzato)"""
+        return self._memoized(gene, "partners", self._build_partner_index)
+
+    def _build_partner_index(self, gene: str) -> Dict[str, Dict]:
+        db_entry = self.database_data.get(gene, {})
+        graph = db_entry.get("graph")
+        if graph is not None:
+            interactions = graph.neighbors(gene)
+        else:
+            interactions = db_entry.get("full_data", {}).get("interactions", [])
+        return {i.get("partner", "").upper(): i for i in interactions}
 
     def compare_sources(self, gene: str) -> ComparisonResult:
         """
         Confronta interattori da letteratura vs database per un gene.
 
+        Il risultato è memorizzato fino al successivo load del gene
+        (non va modificato dal chiamante).
+
         Returns:
             ComparisonResult con overlap e differenze
         """
+        return self._memoized(gene, "comparison", self._compare_sources)
+
+    def _compare_sources(self, gene: str) -> ComparisonResult:
         lit_interactors = self.literature_data.get(gene, {}).get("interactors", set())
         db_interactors = self.database_data.get(gene, {}).get("interactors", set())
 
@@ -106,16 +250,58 @@ class EnrichmentComparator:
             overlap_score=overlap_score
         )
 
+    def compare_all(self, genes: Optional[List[str]] = None) -> BatchComparison:
+        """
+        Confronta letteratura vs database per tutti i geni caricati (o quelli
+        indicati) in un solo passaggio.
+
+        Le intersezioni e i conteggi di tutti i geni sono calcolati con map
+        sulle operazioni dei set (il ciclo sui geni è eseguito in C); le
+        differenze, che il riepilogo non usa, sono rimandate a result().
+
+        Returns:
+            BatchComparison con conteggi e Jaccard per gene
+        """
+        if genes is None:
+            genes = list(dict.fromkeys(list(self.literature_data) + list(self.database_data)))
+        else:
+            genes = list(genes)
+
+        empty = frozenset()
+        literature, databases = self.literature_data, self.database_data
+        sets_a = [literature[gene]["interactors"] if gene in literature else empty for gene in genes]
+        sets_b = [databases[gene]["interactors"] if gene in databases else empty for gene in genes]
+        count_a = list(map(len, sets_a))
+        count_b = list(map(len, sets_b))
+        count_both = list(map(len, map(operator.and_, sets_a, sets_b)))
+        scores = [both / (n_a + n_b - both) if n_a + n_b - both else 0.0
+                  for n_a, n_b, both in zip(count_a, count_b, count_both)]
+
+        return BatchComparison(
+            genes=genes,
+            sets_a=sets_a,
+            sets_b=sets_b,
+            count_a=count_a,
+            count_b=count_b,
+            count_both=count_both,
+            overlap_scores=scores
+        )
+
     def analyze_gaps(self, gene: str) -> GapAnalysis:
         """
         Analizza i gap di conoscenza per un gene.
 
+        Il risultato è memorizzato fino al successivo load del gene
+        (non va modificato dal chiamante).
+
         Returns:
             GapAnalysis con dettagli su missing data e candidati
         """
+        return self._memoized(gene, "gaps", self._analyze_gaps)
+
+    def _analyze_gaps(self, gene: str) -> GapAnalysis:
         comparison = self.compare_sources(gene)
         lit_metadata = self.literature_data.get(gene, {}).get("metadata", {})
-        db_data = self.database_data.get(gene, {}).get("full_data", {})
 
         # Gap nei database (presente in letteratura ma non nei DB)
         missing_in_db = []
@@ -129,10 +315,7 @@ class EnrichmentComparator:
 
         # Gap nella letteratura (presente nei DB ma non citato)
         missing_in_lit = []
-        interactions_dict = {
-            i.get("partner", "").upper(): i
-            for i in db_data.get("interactions", [])
-        }
+        interactions_dict = self._partner_index(gene)
 
         for interactor in comparison.only_in_b:
             interaction_info = interactions_dict.get(interactor, {})
@@ -150,9 +333,15 @@ class EnrichmentComparator:
         # Candidati per validazione (alta confidenza ma non in letteratura)
         validation_candidates = [
             item for item in missing_in_lit
-            if item.get("score", 0) >= 0.7
+            if item.get("score", 0) >= DEFAULT_CONFIDENCE
         ]
 
+        network = self.network_data.get(gene)
+        if network:
+            for item in missing_in_lit:
+                item["network"] = network.get(item["gene"], {})
+            self._rank_candidates(validation_candidates)
+
         # Assessment di confidenza
         confidence = {
             "total_literature": len(comparison.only_in_a) + len(comparison.in_both),
@@ -171,166 +360,254 @@ class EnrichmentComparator:
             confidence_assessment=confidence
         )
 
+    @staticmethod
+    def _rank_candidates(candidates: List[Dict]):
+        """
+        Ordina i candidati per priorità: media pesata dei percentili di score
+        STRING e metriche di rete (DEFAULT_RANKING_WEIGHTS). I percentili
+        rendono confrontabili grandezze con scale diverse (PageRank ~1e-3,
+        score 0-1).
+        """
+        if not candidates:
+            return
+
+        def value(item: Dict, metric: str) -> float:
+            if metric == "score":
+                return item.get("score", 0)
+            return item.get("network", {}).get(metric, 0.0)
+
+        priority = [0.0] * len(candidates)
+        for metric, weight in DEFAULT_RANKING_WEIGHTS.items():
+            values = sorted(value(item, metric) for item in candidates)
+            for i, item in enumerate(candidates):
+                # Percentile in (0, 1], con rango medio per gli ex aequo
+                v = value(item, metric)
+                below = bisect.bisect_left(values, v)
+                equal = bisect.bisect_right(values, v) - below
+                priority[i] += weight * (below + (equal + 1) / 2) / len(values)
+
+        for item, p in zip(candidates, priority):
+            item["priority"] = round(p, 4)
+        candidates.sort(key=lambda item: (-item["priority"], -item.get("score", 0)))
+
+    def report_data(self, gene: str) -> Dict:
+        """Contenuto del report JSON di un gene (confronto e analisi dei gap)"""
+        comparison = self.compare_sources(gene)
+        gap_analysis = self.analyze_gaps(gene)
+        return {
+            "gene": gene,
+            "comparison": {
+                "only_in_literature": list(comparison.only_in_a),
+                "only_in_databases": list(comparison.only_in_b),
+                "in_both": list(comparison.in_both),
+                "overlap_score": comparison.overlap_score
+            },
+            "gap_analysis": {
+                "missing_in_databases": gap_analysis.missing_in_databases,
+                "missing_in_literature": gap_analysis.missing_in_literature,
+                "validation_candidates": gap_analysis.validation_candidates,
+                "confidence": gap_analysis.confidence_assessment
+            }
+        }
+
+    def write_report(self, gene: str, out: TextIO, output_format: str = "text"):
+        """
+        Scrive il report di confronto di un gene su un file (o stream) testuale,
+        sezione per sezione.
+
+        Args:
+            gene: Gene da analizzare
+            out: Destinazione (file aperto, sys.stdout, ...)
+            output_format: "text", "json", "ndjson" o "markdown"
+        """
+        if output_format == "ndjson":
+            out.write(json.dumps(self.report_data(gene), ensure_ascii=False) + "\n")
+
+        elif output_format == "json":
+            out.write(json.dumps(self.report_data(gene), indent=2, ensure_ascii=False) + "\n")
+
+        elif output_format == "markdown":
+            self._write_markdown_report(out, gene, self.compare_sources(gene), self.analyze_gaps(gene))
+
+        else:
+            self._write_text_report(out, gene, self.compare_sources(gene), self.analyze_gaps(gene))
+
+    def write_reports(self, genes: Iterable[str], out: TextIO, output_format: str = "text",
+                      flush: bool = True):
+        """
+        Scrive i report di più geni uno dopo l'altro, senza trattenerli in memoria:
+        "ndjson" produce una riga JSON per gene, "json" un array emesso
+        elemento per elemento, "text"/"markdown" report concatenati.
+        I risultati memorizzati di ciascun gene sono scartati dopo la scrittura.
+        """
+        first = True
+        if output_format == "json":
+            out.write("[\n")
+        for gene in genes:
+            cached = gene in self._memo
+            if output_format == "json":
+                if not first:
+                    out.write(",\n")
+                out.write(json.dumps(self.report_data(gene), indent=2, ensure_ascii=False))
+            else:
+                if not first and output_format != "ndjson":
+                    out.write("\n")
+                self.write_report(gene, out, output_format)
+            if not cached:
+                self._memo.pop(gene, None)
+            if flush:
+                out.flush()
+            first = False
+        if output_format == "json":
+            out.write("\n]\n")
+
     def generate_report(self, gene: str, output_format: str = "text") -> str:
         """
         Genera report di confronto.
 
         Args:
             gene: Gene da analizzare
-            output_format: "text", "json", o "markdown"
+            output_format: "text", "json", "ndjson" o "markdown"
 
         Returns:
             Report formattato
         """
-        comparison = self.compare_sources(gene)
-        gap_analysis = self.analyze_gaps(gene)
-
-        if output_format == "json":
-            return json.dumps({
-                "gene": gene,
-                "comparison": {
-                    "only_in_literature": list(comparison.only_in_a),
-                    "only_in_databases": list(comparison.only_in_b),
-                    "in_both": list(comparison.in_both),
-                    "overlap_score": comparison.overlap_score
-                },
-                "gap_analysis": {
-                    "missing_in_databases": gap_analysis.missing_in_databases,
-                    "missing_in_literature": gap_analysis.missing_in_literature,
-                    "validation_candidates": gap_analysis.validation_candidates,
-                    "confidence": gap_analysis.confidence_assessment
-                }
-            }, indent=2, ensure_ascii=False)
-
-        elif output_format == "markdown":
-            return self._generate_markdown_report(gene, comparison, gap_analysis)
+        buffer = io.StringIO()
+        self.write_report(gene, buffer, output_format)
+        report = buffer.getvalue()
+        return report[:-1] if report.endswith("\n") else report
 
-        else:
-            return self._generate_text_report(gene, comparison, gap_analysis)
+    def _write_text_report(self, out: TextIO, gene: str, comparison: ComparisonResult,
+                           gap_analysis: GapAnalysis):
+        """Scrive il report testuale"""
 
-    def _generate_text_report(self, gene: str, comparison: ComparisonResult,
-                              gap_analysis: GapAnalysis) -> str:
-        """Genera report testuale"""
+        def line(text: str = ""):
+            out.write(text + "\n")
 
-        lines = []
-        lines.append("=" * 70)
-        lines.append(f"ENRICHMENT COMPARISON REPORT: {gene}")
-        lines.append("=" * 70)
+        line("=" * 70)
+        line(f"ENRICHMENT COMPARISON REPORT: {gene}")
+        line("=" * 70)
 
         # Summary
         conf = gap_analysis.confidence_assessment
-        lines.append(f"\n{'SUMMARY':^70}")
-        lines.append("-" * 70)
-        lines.append(f"  Interattori da letteratura:  {conf['total_literature']}")
-        lines.append(f"  Interattori da database:     {conf['total_databases']}")
-        lines.append(f"  Overlap:                     {conf['overlap_count']} ({conf['overlap_percentage']}%)")
-        lines.append(f"  Gap nei database:            {conf['gaps_in_databases']}")
-        lines.append(f"  Gap nella letteratura:       {conf['gaps_in_literature']}")
+        line(f"\n{'SUMMARY':^70}")
+        line("-" * 70)
+        line(f"  Interattori da letteratura:  {conf['total_literature']}")
+        line(f"  Interattori da database:     {conf['total_databases']}")
+        line(f"  Overlap:                     {conf['overlap_count']} ({conf['overlap_percentage']}%)")
+        line(f"  Gap nei database:            {conf['gaps_in_databases']}")
+        line(f"  Gap nella letteratura:       {conf['gaps_in_literature']}")
 
         # Overlap
-        lines.append(f"\n{'INTERATTORI CONFERMATI (in entrambe le fonti)':^70}")
-        lines.append("-" * 70)
+        line(f"\n{'INTERATTORI CONFERMATI (in entrambe le fonti)':^70}")
+        line("-" * 70)
         if comparison.in_both:
             for gene_name in sorted(comparison.in_both):
-                lines.append(f"  [OK] {gene_name}")
+                line(f"  [OK] {gene_name}")
         else:
-            lines.append("  Nessun overlap trovato")
+            line("  Nessun overlap trovato")
 
         # Only in literature
-        lines.append(f"\n{'GAP NEI DATABASE (solo in letteratura)':^70}")
-        lines.append("-" * 70)
+        line(f"\n{'GAP NEI DATABASE (solo in letteratura)':^70}")
+        line("-" * 70)
         if comparison.only_in_a:
             for item in gap_analysis.missing_in_databases:
-                lines.append(f"  [!] {item['gene']}")
-                lines.append(f"      -> {item['suggestion']}")
+                line(f"  [!] {item['gene']}")
+                line(f"      -> {item['suggestion']}")
         else:
-            lines.append("  Tutti gli interattori sono presenti nei database")
+            line("  Tutti gli interattori sono presenti nei database")
 
         # Only in databases
-        lines.append(f"\n{'NUOVE INTERAZIONI DA DATABASE (non in letteratura)':^70}")
-        lines.append("-" * 70)
+        line(f"\n{'NUOVE INTERAZIONI DA DATABASE (non in letteratura)':^70}")
+        line("-" * 70)
         if gap_analysis.missing_in_literature:
             for item in gap_analysis.missing_in_literature[:10]:  # Top 10
                 score_bar = "#" * int(item.get('score', 0) * 10)
-                lines.append(f"  [+] {item['gene']:<12} Score: {item.get('score', 0):.3f} {score_bar}")
+                line(f"  [+] {item['gene']:<12} Score: {item.get('score', 0):.3f} {score_bar}")
                 if item.get('evidence'):
-                    lines.append(f"      Evidence: {item['evidence']}")
+                    line(f"      Evidence: {item['evidence']}")
         else:
-            lines.append("  Nessuna nuova interazione trovata")
+            line("  Nessuna nuova interazione trovata")
 
         # Validation candidates
-        lines.append(f"\n{'CANDIDATI PER VALIDAZIONE SPERIMENTALE':^70}")
-        lines.append("-" * 70)
+        line(f"\n{'CANDIDATI PER VALIDAZIONE SPERIMENTALE':^70}")
+        line("-" * 70)
         if gap_analysis.validation_candidates:
             for item in gap_analysis.validation_candidates[:5]:  # Top 5
-                lines.append(f"  [*] {item['gene']:<12} Score: {item.get('score', 0):.3f}")
-                lines.append(f"      -> Alta confidenza, non documentato in letteratura")
+                line(f"  [*] {item['gene']:<12} Score: {item.get('score', 0):.3f}")
+                if "priority" in item:
+                    network = item.get("network", {})
+                    line(f"      Priorità: {item['priority']:.3f}  (PPR {network.get('pagerank', 0):.4f}, "
+                         f"grado {network.get('degree', 0)})")
+                line(f"      -> Alta confidenza, non documentato in letteratura")
         else:
-            lines.append("  Nessun candidato ad alta confidenza")
+            line("  Nessun candidato ad alta confidenza")
 
-        lines.append("\n" + "=" * 70)
+        line("\n" + "=" * 70)
 
-        return "\n".join(lines)
+    def _write_markdown_report(self, out: TextIO, gene: str, comparison: ComparisonResult,
+                               gap_analysis: GapAnalysis):
+        """Scrive il report in Markdown"""
 
-    def _generate_markdown_report(self, gene: str, comparison: ComparisonResult,
-                                   gap_analysis: GapAnalysis) -> str:
-        """Genera report in Markdown"""
+        def line(text: str = ""):
+            out.write(text + "\n")
 
-        lines = []
         conf = gap_analysis.confidence_assessment
 
-        lines.append(f"# Enrichment Comparison Report: {gene}\n")
+        line(f"# Enrichment Comparison Report: {gene}\n")
 
         # Summary table
-        lines.append("## Summary\n")
-        lines.append("| Metrica | Valore |")
-        lines.append("|---------|--------|")
-        lines.append(f"| Interattori letteratura | {conf['total_literature']} |")
-        lines.append(f"| Interattori database | {conf['total_databases']} |")
-        lines.append(f"| Overlap | {conf['overlap_count']} ({conf['overlap_percentage']}%) |")
-        lines.append(f"| Gap nei database | {conf['gaps_in_databases']} |")
-        lines.append(f"| Gap in letteratura | {conf['gaps_in_literature']} |")
-        lines.append("")
+        line("## Summary\n")
+        line("| Metrica | Valore |")
+        line("|---------|--------|")
+        line(f"| Interattori letteratura | {conf['total_literature']} |")
+        line(f"| Interattori database | {conf['total_databases']} |")
+        line(f"| Overlap | {conf['overlap_count']} ({conf['overlap_percentage']}%) |")
+        line(f"| Gap nei database | {conf['gaps_in_databases']} |")
+        line(f"| Gap in letteratura | {conf['gaps_in_literature']} |")
+        line("")
 
         # Confirmed
-        lines.append("## Interattori Confermati\n")
+        line("## Interattori Confermati\n")
         if comparison.in_both:
             for g in sorted(comparison.in_both):
-                lines.append(f"- ✅ **{g}**")
+                line(f"- ✅ **{g}**")
         else:
-            lines.append("*Nessun overlap*")
-        lines.append("")
+            line("*Nessun overlap*")
+        line("")
 
         # Gaps in DB
-        lines.append("## Gap nei Database\n")
-        lines.append("*Interattori presenti in letteratura ma non nei database*\n")
+        line("## Gap nei Database\n")
+        line("*Interattori presenti in letteratura ma non nei database*\n")
         if comparison.only_in_a:
             for item in gap_analysis.missing_in_databases:
-                lines.append(f"- ⚠️ **{item['gene']}** - {item['suggestion']}")
+                line(f"- ⚠️ **{item['gene']}** - {item['suggestion']}")
         else:
-            lines.append("*Tutti presenti*")
-        lines.append("")
+            line("*Tutti presenti*")
+        line("")
 
         # New from DB
-        lines.append("## Nuove Interazioni da Database\n")
+        line("## Nuove Interazioni da Database\n")
         if gap_analysis.missing_in_literature:
-            lines.append("| Gene | Score | Evidenza |")
-            lines.append("|------|-------|----------|")
+            line("| Gene | Score | Evidenza |")
+            line("|------|-------|----------|")
             for item in gap_analysis.missing_in_literature[:10]:
-                lines.append(f"| {item['gene']} | {item.get('score', 0):.3f} | {item.get('evidence', '-')} |")
+                line(f"| {item['gene']} | {item.get('score', 0):.3f} | {item.get('evidence', '-')} |")
         else:
-            lines.append("*Nessuna*")
-        lines.append("")
+            line("*Nessuna*")
+        line("")
 
         # Candidates
-        lines.append("## Candidati per Validazione\n")
+        line("## Candidati per Validazione\n")
         if gap_analysis.validation_candidates:
             for item in gap_analysis.validation_candidates[:5]:
-                lines.append(f"- 🔬 **{item['gene']}** (score: {item.get('score', 0):.3f})")
+                if "priority" in item:
+                    line(f"- 🔬 **{item['gene']}** (score: {item.get('score', 0):.3f}, "
+                         f"priorità: {item['priority']:.3f})")
+                else:
+                    line(f"- 🔬 **{item['gene']}** (score: {item.get('score', 0):.3f})")
         else:
-            lines.append("*Nessun candidato ad alta confidenza*")
-
-        return "\n".join(lines)
+            line("*Nessun candidato ad alta confidenza*")
 
     def export_for_cytoscape(self, gene: str) -> Dict:
         """
@@ -340,7 +617,6 @@ class EnrichmentComparator:
             Dizionario con nodi e archi per import in Cytoscape
         """
         comparison = self.compare_sources(gene)
-        db_data = self.database_data.get(gene, {}).get("full_data", {})
 
         nodes = []
         edges = []
@@ -354,10 +630,7 @@ class EnrichmentComparator:
         })
 
         # Interattori
-        interactions_dict = {
-            i.get("partner", "").upper(): i
-            for i in db_data.get("interactions", [])
-        }
+        interactions_dict = self._partner_index(gene)
 
         for interactor in comparison.in_both:
             info = interactions_dict.get(interactor, {})
@@ -406,6 +679,12 @@ class EnrichmentComparator:
                 "validation": "database_only"
             })
 
+        # Metriche di rete come attributi dei nodi (se caricate)
+        network = self.network_data.get(gene)
+        if network:
+            for node in nodes:
+                node.update(network.get(node["id"].upper(), {}))
+
         return {
             "nodes": nodes,
             "edges": edges
@@ -0,0 +1,140 @@
+"""
+Hedging Module
+Richieste "hedged" per ridurre la coda di latenza degli endpoint lenti
+"""
+
+import collections
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+from config import ENDPOINTS
+from http_transport import CancelToken
+
+
+class LatencyTracker:
+    """Finestra mobile delle latenze osservate per un endpoint"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = collections.deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self.samples.append(latency)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Percentile p (0-1) delle latenze, None se i campioni sono pochi"""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(p * len(ordered)))
+        return ordered[index]
+
+
+class HedgeBudget:
+    """
+    Limita il carico extra: ogni richiesta accumula ratio crediti (fino a
+    burst), ogni richiesta duplicata ne consuma uno. Con ratio=0.1 al più
+    circa il 10% delle richieste viene duplicato.
+    """
+
+    def __init__(self, ratio: float, burst: float = 5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._credits = burst
+        self._lock = threading.Lock()
+
+    def on_request(self):
+        with self._lock:
+            self._credits = min(self.burst, self._credits + self.ratio)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._credits >= 1:
+                self._credits -= 1
+                return True
+            return False
+
+
+class Hedger:
+    """
+    Esegue richieste con hedging per endpoint.
+
+    Se la richiesta non risponde entro il percentile configurato
+    ("hedge_percentile" in ENDPOINTS) delle latenze recenti dell'endpoint,
+    viene inviata una copia; vince la prima risposta valida e l'altra viene
+    annullata tramite CancelToken. Il budget ("hedge_budget") limita la
+    frazione di richieste duplicate.
+    """
+
+    def __init__(self, endpoints: Optional[Dict[str, Dict]] = None, max_workers: int = 32):
+        endpoints = endpoints or ENDPOINTS
+        self.percentiles = {
+            name: conf["hedge_percentile"]
+            for name, conf in endpoints.items() if conf.get("hedge_percentile")
+        }
+        self.trackers = {name: LatencyTracker() for name in self.percentiles}
+        self.budgets = {
+            name: HedgeBudget(endpoints[name].get("hedge_budget", 0.1))
+            for name in self.percentiles
+        }
+        self.hedges_issued = collections.Counter()
+        self.hedges_won = collections.Counter()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    @staticmethod
+    def _timed(fn: Callable[..., Any], cancel: CancelToken) -> Any:
+        start = time.monotonic()
+        result = fn(cancel)
+        return result, time.monotonic() - start
+
+    def call(self, name: str, fn: Callable[[CancelToken], Any]) -> Any:
+        """
+        Esegue fn(cancel_token) con hedging se l'endpoint lo prevede.
+        fn deve passare il token al trasporto HTTP.
+        """
+        if name not in self.percentiles:
+            return fn(CancelToken())
+
+        tracker = self.trackers[name]
+        budget = self.budgets[name]
+        budget.on_request()
+        delay = tracker.percentile(self.percentiles[name])
+
+        primary_token = CancelToken()
+        primary = self._executor.submit(self._timed, fn, primary_token)
+        done, _ = wait([primary], timeout=delay)
+
+        if done or not budget.try_acquire():
+            result, latency = primary.result()
+            tracker.record(latency)
+            return result
+
+        self.hedges_issued[name] += 1
+        hedge_token = CancelToken()
+        hedge = self._executor.submit(self._timed, fn, hedge_token)
+        tokens = {primary: primary_token, hedge: hedge_token}
+
+        pending = {primary, hedge}
+        first_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        tokens[other].cancel()
+                    result, latency = future.result()
+                    tracker.record(latency)
+                    if future is hedge:
+                        self.hedges_won[name] += 1
+                    return result
+                if first_error is None or future is primary:
+                    first_error = future.exception()
+
+        raise first_error
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,373 @@
+"""
+HTTP Transport Module
+Trasporto HTTP con connessioni keep-alive riutilizzate (pool per host)
+"""
+
+import http.client
+import queue
+import socket
+import threading
+import urllib.parse
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from config import ENDPOINTS, DEFAULT_POOL_SIZE
+
+
+@dataclass
+class HTTPResponse:
+    """Risposta HTTP completamente letta"""
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+
+class HTTPError(Exception):
+    """Risposta HTTP con status di errore (>= 400)"""
+
+    def __init__(self, url: str, status: int, reason: str, headers: Dict[str, str]):
+        super().__init__(f"HTTP {status} {reason} ({url})")
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+
+
+def _is_zlib_header(head: bytes) -> bool:
+    """True se i primi due byte sono un header zlib (RFC 1950)"""
+    return len(head) >= 2 and head[0] & 0x0F == 8 and ((head[0] << 8) | head[1]) % 31 == 0
+
+
+def _decompressor(content_encoding: str, head: bytes = b""):
+    """
+    Decompressore zlib per il Content-Encoding indicato (None se identità).
+    Per deflate servono i primi byte del body (head): alcuni server inviano
+    deflate "raw" invece del formato con header zlib.
+    """
+    encoding = (content_encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return zlib.decompressobj(zlib.MAX_WBITS if _is_zlib_header(head) else -zlib.MAX_WBITS)
+    return None
+
+
+def _is_compressed(content_encoding: str) -> bool:
+    return (content_encoding or "").strip().lower() in ("gzip", "x-gzip", "deflate")
+
+
+def _decode_body(data: bytes, content_encoding: str) -> bytes:
+    """Decomprime un body completo secondo il Content-Encoding"""
+    if not data or not _is_compressed(content_encoding):
+        return data
+    decompressor = _decompressor(content_encoding, data[:2])
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+class StreamingResponse:
+    """
+    Risposta HTTP letta in modo incrementale (read a blocchi), decompressa
+    al volo se il server usa gzip/deflate.
+    close() restituisce la connessione al pool se il body è stato letto
+    completamente, altrimenti la chiude.
+    """
+
+    def __init__(self, pool: "_HostPool", conn: http.client.HTTPConnection,
+                 response: http.client.HTTPResponse):
+        self._pool = pool
+        self._conn = conn
+        self._response = response
+        self.status = response.status
+        self.headers = {k.lower(): v for k, v in response.getheaders()}
+        self.closed = False
+        self._encoding = self.headers.get("content-encoding")
+        self._compressed = _is_compressed(self._encoding)
+        self._decompressor = None
+        self._flushed = False
+        self._head = b""
+        self._pending = b""
+
+    def _decompress(self, raw: bytes) -> bytes:
+        """
+        Decomprime un blocco (b"" = fine del body). Il decompressore è creato
+        quando sono arrivati i primi due byte, che distinguono zlib da deflate raw.
+        """
+        if self._decompressor is None:
+            self._head += raw
+            if raw and len(self._head) < 2:
+                return b""
+            self._decompressor = _decompressor(self._encoding, self._head)
+            data = self._decompressor.decompress(self._head)
+            self._head = b""
+        else:
+            data = self._decompressor.decompress(raw) if raw else b""
+        if raw or self._flushed:
+            return data
+        self._flushed = True
+        return data + self._decompressor.flush()
+
+    def read(self, amt: int = -1) -> bytes:
+        if not self._compressed:
+            if amt is None or amt < 0:
+                return self._response.read()
+            return self._response.read(amt)
+
+        if amt is None or amt < 0:
+            data = self._pending + self._decompress(self._response.read())
+            self._pending = b""
+            return data + self._decompress(b"")
+
+        while len(self._pending) < amt:
+            raw = self._response.read(amt)
+            self._pending += self._decompress(raw)
+            if not raw:
+                break
+
+        data, self._pending = self._pending[:amt], self._pending[amt:]
+        return data
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        reusable = self._response.isclosed() and not self._response.will_close
+        if not reusable:
+            self._response.close()
+        self._pool.release(self._conn, reusable)
+
+    def __enter__(self) -> "StreamingResponse":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RequestCancelled(Exception):
+    """Richiesta interrotta tramite CancelToken"""
+
+
+class CancelToken:
+    """
+    Permette di interrompere da un altro thread una richiesta in corso:
+    cancel() chiude il socket della connessione, sbloccando la lettura.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._lock = threading.Lock()
+
+    def attach(self, conn: http.client.HTTPConnection):
+        with self._lock:
+            if self.cancelled:
+                raise RequestCancelled()
+            self._conn = conn
+
+    def detach(self):
+        with self._lock:
+            self._conn = None
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            if self._conn is not None and self._conn.sock is not None:
+                try:
+                    self._conn.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+# Errori tipici di una connessione keep-alive chiusa dal server
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+class _HostPool:
+    """Pool di connessioni persistenti verso un singolo host"""
+
+    def __init__(self, scheme: str, host: str, port: Optional[int], size: int):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.size = size
+        self.idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+
+    def new_connection(self, timeout: float) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def acquire(self, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """Ritorna (connessione, riutilizzata)"""
+        self.slots.acquire()
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            return self.new_connection(timeout), False
+
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def release(self, conn: http.client.HTTPConnection, reusable: bool):
+        if reusable:
+            self.idle.put(conn)
+        else:
+            conn.close()
+        self.slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class HTTPTransport:
+    """
+    Trasporto HTTP condiviso da tutti i metodi dell'aggregatore.
+    Mantiene un pool di connessioni keep-alive per host, dimensionato per
+    endpoint tramite ENDPOINTS[...]["pool_size"], evitando un nuovo
+    handshake TCP/TLS per ogni richiesta.
+    """
+
+    def __init__(self, pool_sizes: Optional[Dict[str, int]] = None,
+                 default_pool_size: int = DEFAULT_POOL_SIZE,
+                 user_agent: str = "PPI-Analyzer/1.0",
+                 endpoints: Optional[Dict[str, Dict]] = None,
+                 compression: bool = True):
+        """
+        Args:
+            pool_sizes: Connessioni massime per host (default da endpoints)
+            default_pool_size: Connessioni per host non configurati
+            user_agent: Header User-Agent inviato con ogni richiesta
+            endpoints: Configurazione endpoint (default: config.ENDPOINTS)
+            compression: Negozia risposte compresse (Accept-Encoding gzip/deflate)
+        """
+        if pool_sizes is None:
+            pool_sizes = {
+                urllib.parse.urlsplit(conf["url"]).netloc: conf.get("pool_size", default_pool_size)
+                for conf in (endpoints or ENDPOINTS).values()
+            }
+        self.pool_sizes = pool_sizes
+        self.default_pool_size = default_pool_size
+        self.user_agent = user_agent
+        self.compression = compression
+        self._pools: Dict[Tuple[str, str], _HostPool] = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self, scheme: str, netloc: str) -> _HostPool:
+        with self._lock:
+            pool = self._pools.get((scheme, netloc))
+            if pool is None:
+                parts = urllib.parse.urlsplit(f"{scheme}://{netloc}")
+                size = self.pool_sizes.get(netloc, self.default_pool_size)
+                pool = _HostPool(scheme, parts.hostname, parts.port, size)
+                self._pools[(scheme, netloc)] = pool
+            return pool
+
+    def _headers(self, headers: Optional[Dict[str, str]]) -> Dict[str, str]:
+        request_headers = {"User-Agent": self.user_agent}
+        if self.compression:
+            request_headers["Accept-Encoding"] = "gzip, deflate"
+        request_headers.update(headers or {})
+        return request_headers
+
+    def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                body: Optional[bytes] = None, timeout: float = 60,
+                cancel: Optional[CancelToken] = None) -> HTTPResponse:
+        """
+        Esegue una richiesta HTTP riutilizzando una connessione del pool.
+
+        Raises:
+            HTTPError: se lo status della risposta è >= 400
+            RequestCancelled: se la richiesta è stata annullata tramite cancel
+        """
+        parts = urllib.parse.urlsplit(url)
+        pool = self._get_pool(parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        request_headers = self._headers(headers)
+
+        while True:
+            conn, reused = pool.acquire(timeout)
+            try:
+                if cancel is not None:
+                    cancel.attach(conn)
+                conn.request(method, path, body=body, headers=request_headers)
+                response = conn.getresponse()
+                data = response.read()
+            except BaseException as e:
+                pool.release(conn, reusable=False)
+                if cancel is not None and cancel.cancelled:
+                    raise RequestCancelled() from e
+                if isinstance(e, _STALE_CONNECTION_ERRORS) and reused:
+                    # Connessione chiusa dal server mentre era inattiva: riprova
+                    continue
+                raise
+            finally:
+                if cancel is not None:
+                    cancel.detach()
+
+            pool.release(conn, reusable=not response.will_close)
+            break
+
+        response_headers = {k.lower(): v for k, v in response.getheaders()}
+        if response.status >= 400:
+            raise HTTPError(url, response.status, response.reason, response_headers)
+
+        body = _decode_body(data, response_headers.get("content-encoding"))
+        return HTTPResponse(status=response.status, headers=response_headers, body=body)
+
+    def open(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+             body: Optional[bytes] = None, timeout: float = 60) -> StreamingResponse:
+        """
+        Invia una richiesta e ritorna la risposta senza leggerne il body.
+        La connessione resta occupata fino a StreamingResponse.close().
+
+        Raises:
+            HTTPError: se lo status della risposta è >= 400
+        """
+        parts = urllib.parse.urlsplit(url)
+        pool = self._get_pool(parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        request_headers = self._headers(headers)
+
+        while True:
+            conn, reused = pool.acquire(timeout)
+            try:
+                conn.request(method, path, body=body, headers=request_headers)
+                response = conn.getresponse()
+            except BaseException as e:
+                pool.release(conn, reusable=False)
+                if isinstance(e, _STALE_CONNECTION_ERRORS) and reused:
+                    continue
+                raise
+            break
+
+        streaming = StreamingResponse(pool, conn, response)
+        if streaming.status >= 400:
+            streaming.read()
+            streaming.close()
+            raise HTTPError(url, streaming.status, response.reason, streaming.headers)
+
+        return streaming
+
+    def close(self):
+        """Chiude tutte le connessioni inattive"""
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
@@ -0,0 +1,202 @@
+"""
+Interaction Graph Module
+Grafo compatto delle interazioni: simboli genici internati in id interi e
+archi memorizzati in array tipizzati (invece di liste di dizionari)
+"""
+
+import array
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+# Canali di evidenza STRING: (campo di Interaction / JSON STRING, etichetta)
+CHANNELS = (
+    ("escore", "experimental"),
+    ("dscore", "database"),
+    ("tscore", "textmining"),
+    ("ascore", "coexpression")
+)
+EVIDENCE_BITS = {label: 1 << i for i, (_, label) in enumerate(CHANNELS)}
+
+
+def evidence_mask(evidence: str) -> int:
+    """Converte una stringa di evidenza ("textmining, experimental") in bitmask"""
+    mask = 0
+    for label in evidence.split(","):
+        mask |= EVIDENCE_BITS.get(label.strip(), 0)
+    return mask
+
+
+def evidence_labels(mask: int) -> str:
+    """Converte una bitmask di evidenza nella stringa usata da Interaction.evidence_type"""
+    labels = [label for _, label in CHANNELS if mask & EVIDENCE_BITS[label]]
+    return ", ".join(labels) if labels else "combined"
+
+
+class SymbolTable:
+    """Internamento dei simboli genici (senza distinzione di maiuscole) in id consecutivi"""
+
+    def __init__(self):
+        self.symbols: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def intern(self, symbol: str) -> int:
+        key = symbol.upper()
+        index = self.ids.get(key)
+        if index is None:
+            index = len(self.symbols)
+            self.ids[key] = index
+            self.symbols.append(key)
+        return index
+
+    def get(self, symbol: str) -> Optional[int]:
+        return self.ids.get(symbol.upper())
+
+    def __getitem__(self, index: int) -> str:
+        return self.symbols[index]
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self.ids
+
+
+class InteractionGraph:
+    """
+    Grafo diretto delle interazioni (gene -> partner).
+
+    Ogni arco occupa circa 29 byte: src/dst uint32, score e quattro canali
+    float32, evidenza come bitmask uint8. Le adiacenze per gene sono
+    ricavate con un indice CSR costruito alla prima interrogazione.
+    """
+
+    def __init__(self, symbols: Optional[SymbolTable] = None):
+        self.symbols = symbols or SymbolTable()
+        self.src = array.array("I")
+        self.dst = array.array("I")
+        self.score = array.array("f")
+        self.channels = {name: array.array("f") for name, _ in CHANNELS}
+        self.evidence = array.array("B")
+        self._offsets: Optional[array.array] = None
+        self._order: Optional[array.array] = None
+
+    # -------------------------------------------------------------------------
+    # Costruzione
+    # -------------------------------------------------------------------------
+
+    def add_edge(self, gene_a: str, gene_b: str, score: float = 0.0,
+                 evidence: int = 0, channel_scores: Optional[Dict[str, float]] = None):
+        """Aggiunge l'arco gene_a -> gene_b (evidence: bitmask, vedi evidence_mask)"""
+        channel_scores = channel_scores or {}
+        for name, label in CHANNELS:
+            value = channel_scores.get(name, 0.0)
+            self.channels[name].append(value)
+            if value > 0:
+                evidence |= EVIDENCE_BITS[label]
+        self.src.append(self.symbols.intern(gene_a))
+        self.dst.append(self.symbols.intern(gene_b))
+        self.score.append(score)
+        self.evidence.append(evidence)
+        self._offsets = None
+
+    def add_interaction(self, interaction, gene: Optional[str] = None):
+        """
+        Aggiunge un Interaction (SPARQLAggregator). Se gene è indicato l'arco
+        è orientato da gene verso il partner.
+        """
+        gene_a, gene_b = interaction.protein_a, interaction.protein_b
+        if gene and gene_b.upper() == gene.upper():
+            gene_a, gene_b = gene_b, gene_a
+        self.add_edge(gene_a, gene_b, interaction.score,
+                      evidence_mask(interaction.evidence_type),
+                      {name: getattr(interaction, name, 0.0) for name, _ in CHANNELS})
+
+    def add_aggregated(self, gene: str, aggregated_data: Dict):
+        """Aggiunge le interazioni di un gene dal dizionario di aggregate_gene_data"""
+        for item in aggregated_data.get("interactions", []):
+            partner = item.get("partner", "")
+            if partner:
+                self.add_edge(gene, partner, item.get("score", 0.0),
+                              evidence_mask(item.get("evidence", "")), item)
+
+    @classmethod
+    def from_aggregated(cls, all_data: Dict[str, Dict]) -> "InteractionGraph":
+        """Costruisce il grafo dall'output di aggregate_multiple_genes"""
+        graph = cls()
+        for gene, data in all_data.items():
+            graph.symbols.intern(gene)
+            graph.add_aggregated(gene, data)
+        return graph
+
+    @classmethod
+    def from_interactions(cls, interactions: Dict[str, List]) -> "InteractionGraph":
+        """Costruisce il grafo da gene -> List[Interaction] (es. get_interactions_string_batch)"""
+        graph = cls()
+        for gene, items in interactions.items():
+            graph.symbols.intern(gene)
+            for interaction in items:
+                graph.add_interaction(interaction, gene)
+        return graph
+
+    # -------------------------------------------------------------------------
+    # Interrogazione
+    # -------------------------------------------------------------------------
+
+    def _index(self) -> Tuple[array.array, array.array]:
+        """Indice CSR: per ogni nodo, posizioni dei suoi archi uscenti"""
+        if self._offsets is None or len(self._offsets) != len(self.symbols) + 1:
+            counts = array.array("I", bytes(4 * (len(self.symbols) + 1)))
+            for src in self.src:
+                counts[src + 1] += 1
+            offsets = array.array("Q", [0]) * (len(self.symbols) + 1)
+            for i in range(1, len(offsets)):
+                offsets[i] = offsets[i - 1] + counts[i]
+            cursor = offsets[:-1]
+            order = array.array("Q", bytes(8 * len(self.src)))
+            for pos, src in enumerate(self.src):
+                order[cursor[src]] = pos
+                cursor[src] += 1
+            self._offsets, self._order = offsets, order
+        return self._offsets, self._order
+
+    def edge_positions(self, gene: str) -> Iterable[int]:
+        """Posizioni negli array degli archi uscenti da gene"""
+        node = self.symbols.get(gene)
+        if node is None:
+            return ()
+        offsets, order = self._index()
+        return order[offsets[node]:offsets[node + 1]]
+
+    def edge(self, pos: int) -> Dict:
+        """Arco in posizione pos nel formato delle interazioni aggregate"""
+        item = {
+            "partner": self.symbols[self.dst[pos]],
+            "score": round(self.score[pos], 6),
+            "evidence": evidence_labels(self.evidence[pos])
+        }
+        for name, _ in CHANNELS:
+            item[name] = round(self.channels[name][pos], 6)
+        return item
+
+    def neighbors(self, gene: str) -> Iterator[Dict]:
+        """Interazioni di un gene (stesso formato di aggregate_gene_data["interactions"])"""
+        for pos in self.edge_positions(gene):
+            yield self.edge(pos)
+
+    def partners(self, gene: str) -> Set[str]:
+        """Simboli (maiuscoli) dei partner di un gene"""
+        return {self.symbols[self.dst[pos]] for pos in self.edge_positions(gene)}
+
+    def genes(self) -> List[str]:
+        """Geni con almeno un arco uscente"""
+        offsets, _ = self._index()
+        return [self.symbols[i] for i in range(len(self.symbols)) if offsets[i + 1] > offsets[i]]
+
+    def __len__(self) -> int:
+        return len(self.src)
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria occupata dagli array degli archi"""
+        arrays = [self.src, self.dst, self.score, self.evidence] + list(self.channels.values())
+        return sum(a.itemsize * len(a) for a in arrays)
@@ -7,19 +7,29 @@ Uso:
     python main.py --gene EYS
     python main.py --gene EYS --literature GRK7,AIPL1,DAG1
     python main.py --gene EYS --output report.md --format markdown
+    python main.py --gene EYS --literature GRK7,AIPL1 --network-depth 2
+    python main.py --genes-file genes.txt --literature-file literature.tsv --workers 8
+    python main.py --genes-file genes.txt --checkpoint run.jsonl
 """
 
 import argparse
+import contextlib
 import json
 import sys
 import os
+import time
+from collections import defaultdict
 
 # Aggiungi directory corrente al path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from sparql_aggregator import SPARQLAggregator
 from enrichment_comparator import EnrichmentComparator
-from config import COLORS
+from snapshot import write_snapshot
+from checkpoint import CheckpointJournal
+from network_expansion import NetworkExpander
+from network_analytics import NetworkAnalytics, METRICS
+from config import COLORS, DEFAULT_LIMIT, DEFAULT_EXPANSION_FANOUT, DEFAULT_MAX_WORKERS
 
 
 def print_header():
@@ -47,13 +57,24 @@ def print_section(title: str):
     print(f"{COLORS['cyan']}{'-'*70}{COLORS['end']}")
 
 
-def run_aggregation(gene: str, output_file: str = None) -> dict:
-    """Esegue aggregazione dati da tutti gli endpoint"""
+def run_aggregation(gene: str, output_file: str = None, parallel: bool = False,
+                    cache_path: str = None, combined_uniprot: bool = False,
+                    hedging: bool = False, snapshot_dir: str = None,
+                    aggregator: SPARQLAggregator = None) -> dict:
+    """
+    Esegue aggregazione dati da tutti gli endpoint.
+    Con aggregator le opzioni di cache e interrogazione sono le sue e resta aperto
+    """
 
     print_section(f"AGGREGAZIONE DATI PER {gene}")
 
-    aggregator = SPARQLAggregator()
-    data = aggregator.aggregate_gene_data(gene)
+    if aggregator is not None:
+        data = aggregator.aggregate_gene_data(gene, parallel)
+    else:
+        # La cache su disco è aperta dall'aggregatore (con i TTL dei suoi endpoint) e chiusa all'uscita
+        with SPARQLAggregator(cache=cache_path, combined_uniprot=combined_uniprot,
+                              hedging=hedging) as aggregator:
+            data = aggregator.aggregate_gene_data(gene, parallel)
 
     # Mostra risultati
     print(f"\n{COLORS['green']}Fonti interrogate:{COLORS['end']} {', '.join(data['sources'])}")
@@ -94,12 +115,43 @@ def run_aggregation(gene: str, output_file: str = None) -> dict:
             json.dump(data, f, indent=2, ensure_ascii=False)
         print(f"\n{COLORS['green']}[OK] Dati salvati in {output_file}{COLORS['end']}")
 
+    if snapshot_dir:
+        write_snapshot({gene: data}, snapshot_dir)
+        print(f"{COLORS['green']}[OK] Snapshot colonnare salvato in {snapshot_dir}{COLORS['end']}")
+
     return data
 
 
+def run_network_analysis(gene: str, depth: int, aggregator: SPARQLAggregator) -> dict:
+    """
+    Espande la rete attorno al gene (depth hop) e calcola le metriche di rete
+    dei nodi (PageRank personalizzato sul gene)
+    """
+
+    print_section(f"ANALISI DI RETE PER {gene} ({depth} hop)")
+
+    # Al primo hop tutti i partner dell'aggregazione (DEFAULT_LIMIT), così ogni
+    # candidato del confronto ha le sue metriche; poi il fan-out ridotto
+    expander = NetworkExpander(aggregator, fanout=[DEFAULT_LIMIT, DEFAULT_EXPANSION_FANOUT])
+    result = expander.expand([gene], depth)
+
+    start = time.time()
+    analytics = NetworkAnalytics(result.graph)
+    metrics = analytics.metrics(seeds=[gene])
+    print(f"{COLORS['green']}[OK]{COLORS['end']} {len(analytics)} nodi, {analytics.edges} archi, "
+          f"metriche in {time.time() - start:.2f}s")
+    return metrics
+
+
 def run_comparison(gene: str, literature_genes: list, db_data: dict,
-                   output_file: str = None, output_format: str = "text") -> str:
-    """Esegue confronto tra letteratura e database"""
+                   output_file: str = None, output_format: str = "text",
+                   network_metrics: dict = None, out=None) -> str:
+    """
+    Esegue confronto tra letteratura e database e ritorna il report.
+    Con out (file-like) il report è scritto direttamente su out e sul file,
+    senza costruirlo in memoria, e viene ritornato None.
+    Con network_metrics i candidati sono ordinati anche per metriche di rete.
+    """
 
     print_section(f"CONFRONTO FONTI PER {gene}")
 
@@ -111,38 +163,51 @@ def run_comparison(gene: str, literature_genes: list, db_data: dict,
         "confidence": "curated"
     })
     comparator.load_database_interactors(gene, db_data)
+    if network_metrics:
+        comparator.load_network_metrics(gene, network_metrics)
 
-    # Genera report
-    report = comparator.generate_report(gene, output_format)
-    print(report)
+    # Genera report (il confronto è calcolato una sola volta anche con più destinazioni)
+    if out is not None:
+        report = None
+        comparator.write_report(gene, out, output_format)
+    else:
+        report = comparator.generate_report(gene, output_format)
+        print(report)
 
     # Salva su file se richiesto
     if output_file:
         with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(report)
+            if report is None:
+                comparator.write_report(gene, f, output_format)
+            else:
+                f.write(report)
         print(f"\n{COLORS['green']}[OK] Report salvato in {output_file}{COLORS['end']}")
 
     return report
 
 
 def run_cytoscape_export(gene: str, literature_genes: list, db_data: dict,
-                         output_file: str):
-    """Esporta dati per Cytoscape"""
+                         output_file: str, network_metrics: dict = None):
+    """Esporta dati per Cytoscape (con network_metrics, metriche di rete come attributi dei nodi)"""
 
     print_section(f"EXPORT CYTOSCAPE PER {gene}")
 
     comparator = EnrichmentComparator()
     comparator.load_literature_interactors(gene, literature_genes)
     comparator.load_database_interactors(gene, db_data)
+    if network_metrics:
+        comparator.load_network_metrics(gene, network_metrics)
 
     cytoscape_data = comparator.export_for_cytoscape(gene)
 
     # Salva nodi
     nodes_file = output_file.replace('.json', '_nodes.csv')
+    metric_columns = list(METRICS) if network_metrics else []
     with open(nodes_file, 'w', encoding='utf-8') as f:
-        f.write("id,label,type,source\n")
+        f.write(",".join(["id", "label", "type", "source"] + metric_columns) + "\n")
         for node in cytoscape_data['nodes']:
-            f.write(f"{node['id']},{node['label']},{node['type']},{node['source']}\n")
+            values = [str(node.get(column, "")) for column in metric_columns]
+            f.write(",".join([node['id'], node['label'], node['type'], node['source']] + values) + "\n")
 
     # Salva archi
     edges_file = output_file.replace('.json', '_edges.csv')
@@ -161,6 +226,112 @@ def run_cytoscape_export(gene: str, literature_genes: list, db_data: dict,
     print(f"  - {output_file} (JSON completo)")
 
 
+def iter_genes_file(path: str):
+    """
+    Legge i simboli genici uno alla volta (uno per riga, '#' per i commenti;
+    conta solo la prima colonna), senza duplicati
+    """
+    seen = set()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                gene = line.split()[0].upper()
+                if gene not in seen:
+                    seen.add(gene)
+                    yield gene
+
+
+def read_literature_tsv(path: str) -> dict:
+    """
+    Legge gli interattori da letteratura da un TSV: gene<TAB>interattori.
+    Gli interattori possono essere separati da virgola o ripartiti su più righe
+    dello stesso gene; un'eventuale intestazione "gene" viene ignorata.
+    """
+    literature = defaultdict(list)
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip() or line.startswith('#'):
+                continue
+            fields = line.rstrip('\n').split('\t')
+            gene = fields[0].strip().upper()
+            if gene == "GENE" or len(fields) < 2:
+                continue
+            literature[gene].extend(g.strip().upper() for g in fields[1].split(',') if g.strip())
+    return dict(literature)
+
+
+def run_batch(genes_file: str, literature_file: str = None, output_file: str = None,
+              workers: int = DEFAULT_MAX_WORKERS, parallel: bool = False,
+              cache_path: str = None, combined_uniprot: bool = False,
+              hedging: bool = False, checkpoint_path: str = None) -> int:
+    """
+    Aggrega e confronta una lista di geni in un solo processo.
+
+    I geni sono letti dal file e aggregati in streaming (iter_aggregate) da
+    workers thread con un aggregatore condiviso (connessioni, cache e rate
+    limit comuni). Per ogni gene viene scritto un
+    record NDJSON (aggregazione + confronto) appena completato; avanzamento e
+    messaggi vanno su stderr, così stdout contiene solo NDJSON.
+
+    Con checkpoint_path i risultati per fonte sono salvati in un journal:
+    rilanciando lo stesso comando dopo un'interruzione i geni completi sono
+    letti dal journal e si ripetono solo le fonti fallite.
+
+    Returns:
+        Numero di geni falliti
+    """
+    literature = read_literature_tsv(literature_file) if literature_file else {}
+
+    out = open(output_file, 'w', encoding='utf-8') if output_file else sys.stdout
+    aggregator = SPARQLAggregator(cache=cache_path, combined_uniprot=combined_uniprot,
+                                  hedging=hedging, verbose=False)
+    journal = CheckpointJournal(checkpoint_path) if checkpoint_path else None
+    if journal is not None and len(journal):
+        stats = journal.stats()
+        sys.stderr.write(f"[INFO] Ripresa da {checkpoint_path}: {stats['complete']} geni completi, "
+                         f"{stats['with_failures']} con fonti da ripetere\n")
+    comparator = EnrichmentComparator()
+
+    start = time.time()
+    done = failed = 0
+
+    # Tutti i print (errori, retry) vanno su stderr: stdout resta NDJSON valido
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            # I geni sono letti dal file man mano: memoria costante anche con liste lunghe
+            for gene, data in aggregator.iter_aggregate(iter_genes_file(genes_file), parallel,
+                                                        workers=workers, journal=journal,
+                                                        return_exceptions=True):
+                if isinstance(data, Exception):
+                    failed += 1
+                    record = {"gene": gene, "error": str(data)}
+                else:
+                    comparator.load_literature_interactors(gene, literature.get(gene, []))
+                    comparator.load_database_interactors(gene, data)
+                    record = {"gene": gene, "aggregation": data, **comparator.report_data(gene)}
+                    comparator.discard(gene)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                done += 1
+
+                elapsed = time.time() - start
+                sys.stderr.write(f"\r[{done}] {done / elapsed if elapsed else 0:.1f} geni/s, "
+                                 f"{failed} falliti")
+                sys.stderr.flush()
+        finally:
+            if out is not sys.stdout:
+                out.close()
+            if journal is not None:
+                journal.close()
+            aggregator.close()
+
+    elapsed = time.time() - start
+    sys.stderr.write(f"\n[OK] {done} geni in {elapsed:.1f}s "
+                     f"({done / elapsed if elapsed else 0:.1f} geni/s), {failed} falliti\n")
+    return failed
+
+
 def interactive_mode():
     """Modalità interattiva"""
 
@@ -249,6 +420,7 @@ Esempi:
   python main.py --gene EYS
   python main.py --gene EYS --literature GRK7,AIPL1,DAG1
   python main.py --gene EYS --output report.md --format markdown
+  python main.py --genes-file genes.txt --literature-file literature.tsv --workers 8 -o out.ndjson
   python main.py --interactive
   python main.py --demo
         """
@@ -258,10 +430,30 @@ Esempi:
     parser.add_argument("--literature", "-l", type=str,
                         help="Interattori da letteratura (separati da virgola)")
     parser.add_argument("--output", "-o", type=str, help="File di output")
-    parser.add_argument("--format", "-f", choices=["text", "json", "markdown"],
+    parser.add_argument("--format", "-f", choices=["text", "json", "ndjson", "markdown"],
                         default="text", help="Formato output (default: text)")
     parser.add_argument("--cytoscape", "-c", type=str,
                         help="Esporta per Cytoscape nel file specificato")
+    parser.add_argument("--parallel", "-p", action="store_true",
+                        help="Interroga gli endpoint in parallelo")
+    parser.add_argument("--combined-uniprot", action="store_true",
+                        help="Una sola query UniProt per proteina, GO e malattie")
+    parser.add_argument("--hedging", action="store_true",
+                        help="Duplica le richieste SPARQL lente (riduce la coda di latenza)")
+    parser.add_argument("--cache", type=str, metavar="PATH",
+                        help="Cache persistente delle risposte (file SQLite)")
+    parser.add_argument("--snapshot", type=str, metavar="DIR",
+                        help="Salva i dati aggregati come snapshot colonnare")
+    parser.add_argument("--network-depth", type=int, default=0, metavar="K",
+                        help="Espande la rete a K hop e ordina i candidati con metriche di rete")
+    parser.add_argument("--genes-file", type=str, metavar="PATH",
+                        help="Modalità batch: file con un gene per riga (output NDJSON)")
+    parser.add_argument("--literature-file", type=str, metavar="PATH",
+                        help="Interattori da letteratura per gene (TSV: gene<TAB>interattori)")
+    parser.add_argument("--checkpoint", type=str, metavar="PATH",
+                        help="Modalità batch: journal per riprendere un'esecuzione interrotta")
+    parser.add_argument("--workers", "-w", type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f"Geni elaborati in parallelo in modalità batch (default: {DEFAULT_MAX_WORKERS})")
     parser.add_argument("--interactive", "-i", action="store_true",
                         help="Modalità interattiva")
     parser.add_argument("--demo", "-d", action="store_true",
@@ -269,6 +461,13 @@ Esempi:
 
     args = parser.parse_args()
 
+    # Modalità batch: nessun output decorativo, solo NDJSON
+    if args.genes_file:
+        failed = run_batch(args.genes_file, args.literature_file, args.output, args.workers,
+                           args.parallel, args.cache, args.combined_uniprot, args.hedging,
+                           args.checkpoint)
+        sys.exit(1 if failed else 0)
+
     print_header()
 
     # Modalità interattiva
@@ -285,22 +484,30 @@ Esempi:
     if args.gene:
         gene = args.gene.upper()
 
-        # Aggrega dati
-        db_data = run_aggregation(gene, args.output if args.format == "json" else None)
+        # Un solo aggregatore (e una sola cache) per aggregazione e analisi di rete
+        with SPARQLAggregator(cache=args.cache, combined_uniprot=args.combined_uniprot,
+                              hedging=args.hedging) as aggregator:
+            db_data = run_aggregation(gene, args.output if args.format == "json" else None,
+                                      args.parallel, snapshot_dir=args.snapshot,
+                                      aggregator=aggregator)
+
+            network_metrics = None
+            if args.network_depth > 0 and (args.literature or args.cytoscape):
+                network_metrics = run_network_analysis(gene, args.network_depth, aggregator)
 
         # Confronto se specificati interattori letteratura
         if args.literature:
             literature_genes = [g.strip().upper() for g in args.literature.split(",")]
             run_comparison(gene, literature_genes, db_data,
                           args.output if args.format != "json" else None,
-                          args.format)
+                          args.format, network_metrics, out=sys.stdout)
 
         # Export Cytoscape
         if args.cytoscape:
             literature_genes = []
             if args.literature:
                 literature_genes = [g.strip().upper() for g in args.literature.split(",")]
-            run_cytoscape_export(gene, literature_genes, db_data, args.cytoscape)
+            run_cytoscape_export(gene, literature_genes, db_data, args.cytoscape, network_metrics)
 
     else:
         # Nessun argomento: modalità interattiva
@@ -0,0 +1,358 @@
+"""
+Network Analytics Module
+Metriche di rete (grado, grado pesato, clustering, betweenness approssimata,
+PageRank personalizzato) su una matrice di adiacenza sparsa in formato CSR
+costruita da un InteractionGraph
+"""
+
+import array
+import random
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+from config import DEFAULT_BETWEENNESS_SAMPLES, DEFAULT_PAGERANK_ALPHA, DEFAULT_PAGERANK_EPSILON
+from interaction_graph import InteractionGraph
+
+
+# Metriche calcolate per ogni nodo (chiavi dei dizionari di metrics/node)
+METRICS = ("degree", "weighted_degree", "clustering", "betweenness", "pagerank")
+
+
+class NetworkAnalytics:
+    """
+    Analisi della rete non orientata associata a un InteractionGraph.
+
+    Gli archi A -> B e B -> A diventano un solo arco non orientato con lo
+    score massimo; l'adiacenza è memorizzata in CSR (offsets, vicini, pesi)
+    su array tipizzati, con i vicini di ogni nodo ordinati per id. Gli id
+    dei nodi sono quelli della SymbolTable del grafo.
+
+    Uso:
+        analytics = NetworkAnalytics(result.graph)
+        metrics = analytics.metrics(seeds=["EYS"])
+        metrics["CRB1"]["pagerank"]
+    """
+
+    def __init__(self, graph: InteractionGraph, min_score: float = 0.0):
+        """
+        Args:
+            graph: Grafo delle interazioni (es. da NetworkExpander o from_aggregated)
+            min_score: Archi con score inferiore sono ignorati
+        """
+        self.symbols = graph.symbols
+        n = len(graph.symbols)
+
+        # Coppie non orientate (u < v) con il peso massimo
+        pairs: Dict[int, float] = {}
+        for src, dst, score in zip(graph.src, graph.dst, graph.score):
+            if src == dst or score < min_score:
+                continue
+            key = src * n + dst if src < dst else dst * n + src
+            if score > pairs.get(key, -1.0):
+                pairs[key] = score
+
+        degree = array.array("I", bytes(4 * n))
+        for key in pairs:
+            degree[key // n] += 1
+            degree[key % n] += 1
+        offsets = array.array("Q", [0]) * (n + 1)
+        for i in range(n):
+            offsets[i + 1] = offsets[i] + degree[i]
+
+        neighbors = array.array("I", bytes(4 * offsets[n]))
+        weights = array.array("f", bytes(4 * offsets[n]))
+        cursor = offsets[:-1]
+        # Chiavi in ordine crescente: i vicini di ogni riga risultano ordinati per id
+        for key in sorted(pairs):
+            u, v = divmod(key, n)
+            w = pairs[key]
+            neighbors[cursor[u]] = v
+            weights[cursor[u]] = w
+            cursor[u] += 1
+            neighbors[cursor[v]] = u
+            weights[cursor[v]] = w
+            cursor[v] += 1
+
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.weights = weights
+        self._strength: Optional[List[float]] = None
+        self._clustering: Optional[List[float]] = None
+        self._betweenness: Dict[tuple, List[float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def edges(self) -> int:
+        """Numero di archi non orientati"""
+        return len(self.neighbors) // 2
+
+    def _row(self, u: int):
+        return self.neighbors[self.offsets[u]:self.offsets[u + 1]]
+
+    def _node(self, gene: str) -> int:
+        node = self.symbols.get(gene)
+        if node is None:
+            raise KeyError(gene)
+        return node
+
+    # -------------------------------------------------------------------------
+    # Grado
+    # -------------------------------------------------------------------------
+
+    def degree(self) -> List[int]:
+        """Numero di vicini di ogni nodo"""
+        offsets = self.offsets
+        return [offsets[i + 1] - offsets[i] for i in range(len(self))]
+
+    def weighted_degree(self) -> List[float]:
+        """Somma degli score degli archi di ogni nodo"""
+        if self._strength is None:
+            offsets, weights = self.offsets, self.weights
+            self._strength = [sum(weights[offsets[i]:offsets[i + 1]]) for i in range(len(self))]
+        return self._strength
+
+    # -------------------------------------------------------------------------
+    # Clustering
+    # -------------------------------------------------------------------------
+
+    def clustering(self) -> List[float]:
+        """
+        Coefficiente di clustering locale (non pesato).
+
+        I triangoli sono contati una volta sola orientando ogni arco verso il
+        nodo di grado maggiore: ogni nodo confronta solo i vicini "in avanti",
+        costo O(m * sqrt(m)) anche con hub di grado elevato.
+        """
+        if self._clustering is None:
+            n = len(self)
+            degree = self.degree()
+            rank = sorted(range(n), key=lambda i: (degree[i], i))
+            position = [0] * n
+            for r, node in enumerate(rank):
+                position[node] = r
+            forward = [
+                {v for v in self._row(u) if position[v] > position[u]}
+                for u in range(n)
+            ]
+
+            triangles = [0] * n
+            for u in range(n):
+                forward_u = forward[u]
+                for v in forward_u:
+                    for w in forward_u & forward[v]:
+                        triangles[u] += 1
+                        triangles[v] += 1
+                        triangles[w] += 1
+
+            self._clustering = [
+                2.0 * triangles[i] / (degree[i] * (degree[i] - 1)) if degree[i] > 1 else 0.0
+                for i in range(n)
+            ]
+        return self._clustering
+
+    # -------------------------------------------------------------------------
+    # Betweenness
+    # -------------------------------------------------------------------------
+
+    def betweenness(self, samples: Optional[int] = DEFAULT_BETWEENNESS_SAMPLES,
+                    seed: int = 0, normalized: bool = True) -> List[float]:
+        """
+        Betweenness centrality (cammini minimi non pesati), algoritmo di
+        Brandes. Con samples le visite partono da un campione casuale di nodi
+        e il risultato è scalato a n / samples (stima non distorta); con
+        samples=None il calcolo è esatto.
+
+        Args:
+            samples: Nodi sorgente campionati (None = tutti)
+            seed: Seme del generatore casuale (risultati riproducibili)
+            normalized: Divide per (n-1)(n-2)/2, il massimo possibile
+        """
+        n = len(self)
+        sources = list(range(n))
+        if samples is not None and samples < n:
+            sources = random.Random(seed).sample(sources, samples)
+
+        key = (len(sources), seed, normalized)
+        cached = self._betweenness.get(key)
+        if cached is not None:
+            return cached
+
+        # Righe CSR come liste: l'iterazione su liste Python è più rapida delle slice di array
+        rows = [self.neighbors[self.offsets[v]:self.offsets[v + 1]].tolist() for v in range(n)]
+        centrality = [0.0] * n
+        sigma = [0] * n
+        distance = [-1] * n
+        delta = [0.0] * n
+
+        for s in sources:
+            order = [s]
+            sigma[s] = 1
+            distance[s] = 0
+            # BFS con order come coda: i predecessori sono i vicini a distanza - 1
+            i = 0
+            while i < len(order):
+                v = order[i]
+                i += 1
+                next_distance = distance[v] + 1
+                sigma_v = sigma[v]
+                for w in rows[v]:
+                    if distance[w] < 0:
+                        distance[w] = next_distance
+                        order.append(w)
+                    if distance[w] == next_distance:
+                        sigma[w] += sigma_v
+
+            for w in reversed(order):
+                coefficient = (1.0 + delta[w]) / sigma[w]
+                previous = distance[w] - 1
+                for v in rows[w]:
+                    if distance[v] == previous:
+                        delta[v] += sigma[v] * coefficient
+                if w != s:
+                    centrality[w] += delta[w]
+
+            # Azzeramento solo dei nodi visitati
+            for v in order:
+                sigma[v] = 0
+                distance[v] = -1
+                delta[v] = 0.0
+
+        # Grafo non orientato: ogni coppia contata da entrambe le estremità
+        scale = n / len(sources) / 2 if sources else 0.0
+        if normalized and n > 2:
+            scale /= (n - 1) * (n - 2) / 2
+        result = [value * scale for value in centrality]
+        self._betweenness[key] = result
+        return result
+
+    # -------------------------------------------------------------------------
+    # PageRank personalizzato
+    # -------------------------------------------------------------------------
+
+    def personalized_pagerank(self, seeds: Iterable[str], alpha: float = DEFAULT_PAGERANK_ALPHA,
+                              epsilon: float = DEFAULT_PAGERANK_EPSILON) -> Dict[str, float]:
+        """
+        PageRank personalizzato sui geni seed (random walk pesato con restart
+        sui seed con probabilità 1 - alpha).
+
+        Approssimazione locale a push (Andersen-Chung-Lang): si propaga solo
+        il residuo dei nodi con residuo / grado pesato > epsilon, quindi il
+        costo dipende dall'intorno dei seed e non dalla dimensione del grafo.
+        L'errore per nodo è al massimo epsilon * grado pesato.
+
+        Returns:
+            Gene (maiuscolo) -> score, solo per i nodi raggiunti
+        """
+        nodes = [node for node in (self.symbols.get(seed) for seed in seeds) if node is not None]
+        if not nodes:
+            return {}
+
+        offsets, neighbors, weights = self.offsets, self.neighbors, self.weights
+        strength = self.weighted_degree()
+        threshold = [epsilon * value for value in strength]
+        rank: Dict[int, float] = {}
+        residual = [0.0] * len(self)
+        queued = [False] * len(self)
+        for node in nodes:
+            residual[node] += 1.0 / len(nodes)
+            queued[node] = True
+        queue = deque(dict.fromkeys(nodes))
+
+        while queue:
+            u = queue.popleft()
+            queued[u] = False
+            r = residual[u]
+            residual[u] = 0.0
+            if strength[u] == 0:
+                rank[u] = rank.get(u, 0.0) + r  # nodo isolato: il walk resta qui
+                continue
+            rank[u] = rank.get(u, 0.0) + (1 - alpha) * r
+            spread = alpha * r / strength[u]
+            lo, hi = offsets[u], offsets[u + 1]
+            for v, w in zip(neighbors[lo:hi], weights[lo:hi]):
+                value = residual[v] + spread * w
+                residual[v] = value
+                if value > threshold[v] and not queued[v]:
+                    queue.append(v)
+                    queued[v] = True
+
+        return {self.symbols[node]: score for node, score in rank.items()}
+
+    # -------------------------------------------------------------------------
+    # Metriche per gene
+    # -------------------------------------------------------------------------
+
+    def metrics(self, seeds: Optional[Iterable[str]] = None,
+                genes: Optional[Iterable[str]] = None,
+                samples: Optional[int] = DEFAULT_BETWEENNESS_SAMPLES) -> Dict[str, Dict[str, float]]:
+        """
+        Tutte le metriche per gene: degree, weighted_degree, clustering,
+        betweenness e pagerank (personalizzato sui seed; 0 senza seed).
+
+        Args:
+            seeds: Geni di partenza del PageRank personalizzato
+            genes: Geni da includere (default: tutti i nodi)
+            samples: Sorgenti campionate per la betweenness (None = esatta)
+        """
+        degree = self.degree()
+        strength = self.weighted_degree()
+        clustering = self.clustering()
+        betweenness = self.betweenness(samples)
+        pagerank = self.personalized_pagerank(seeds) if seeds else {}
+
+        if genes is None:
+            nodes = range(len(self))
+        else:
+            nodes = [node for node in (self.symbols.get(g) for g in genes) if node is not None]
+
+        result = {}
+        for node in nodes:
+            symbol = self.symbols[node]
+            result[symbol] = {
+                "degree": degree[node],
+                "weighted_degree": round(strength[node], 6),
+                "clustering": round(clustering[node], 6),
+                "betweenness": round(betweenness[node], 9),
+                "pagerank": round(pagerank.get(symbol, 0.0), 9)
+            }
+        return result
+
+    def node(self, gene: str, seeds: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Metriche di un singolo gene"""
+        self._node(gene)
+        return self.metrics(seeds, [gene])[gene.upper()]
+
+
+# =============================================================================
+# ANALISI DA RIGA DI COMANDO
+# =============================================================================
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from sparql_aggregator import SPARQLAggregator
+    from network_expansion import NetworkExpander
+    from config import DEFAULT_CONFIDENCE, DEFAULT_EXPANSION_DEPTH
+
+    parser = argparse.ArgumentParser(description="Metriche di rete attorno a geni seed")
+    parser.add_argument("seeds", nargs="+", help="Geni seed (es. EYS)")
+    parser.add_argument("--depth", "-k", type=int, default=DEFAULT_EXPANSION_DEPTH, help="Hop di espansione")
+    parser.add_argument("--min-score", type=float, default=DEFAULT_CONFIDENCE, help="Score minimo STRING (0-1)")
+    parser.add_argument("--samples", type=int, default=DEFAULT_BETWEENNESS_SAMPLES,
+                        help="Sorgenti campionate per la betweenness (0 = esatta)")
+    parser.add_argument("--top", type=int, default=20, help="Geni da mostrare")
+    args = parser.parse_args()
+
+    result = NetworkExpander(SPARQLAggregator(), args.min_score).expand(args.seeds, args.depth)
+
+    start = time.time()
+    analytics = NetworkAnalytics(result.graph)
+    metrics = analytics.metrics(args.seeds, samples=args.samples or None)
+    print(f"\n[OK] {len(analytics)} nodi, {analytics.edges} archi, metriche in {time.time() - start:.2f}s\n")
+
+    print(f"{'Gene':<12} {'Grado':>6} {'Pesato':>8} {'Clust.':>7} {'Betw.':>9} {'PPR':>9}")
+    ranked = sorted(metrics.items(), key=lambda item: item[1]["pagerank"], reverse=True)
+    for gene, values in ranked[:args.top]:
+        print(f"{gene:<12} {values['degree']:>6} {values['weighted_degree']:>8.2f} "
+              f"{values['clustering']:>7.3f} {values['betweenness']:>9.5f} {values['pagerank']:>9.5f}")
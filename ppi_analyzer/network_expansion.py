@@ -0,0 +1,202 @@
+"""
+Network Expansion Module
+Espansione multi-hop della rete PPI attorno a uno o più geni seed: visita in
+ampiezza con una richiesta STRING batch per ogni frontiera
+"""
+
+import heapq
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Union
+from config import (DEFAULT_CONFIDENCE, DEFAULT_EXPANSION_DEPTH, DEFAULT_EXPANSION_FANOUT,
+                    DEFAULT_EXPANSION_MAX_NODES)
+from interaction_graph import InteractionGraph
+
+
+@dataclass
+class ExpansionResult:
+    """Risultato di un'espansione"""
+    seeds: List[str]
+    graph: InteractionGraph
+    # Gene (maiuscolo) -> hop in cui è stato raggiunto (0 = seed)
+    hops: Dict[str, int] = field(default_factory=dict)
+    # Geni interrogati su STRING (ognuno una sola volta)
+    queried: Set[str] = field(default_factory=set)
+    # Statistiche per hop: geni interrogati, archi ricevuti, nuovi geni, secondi
+    hop_stats: List[Dict[str, float]] = field(default_factory=list)
+
+    def genes_at(self, hop: int) -> List[str]:
+        """Geni raggiunti esattamente all'hop indicato"""
+        return sorted(gene for gene, h in self.hops.items() if h == hop)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "seeds": len(self.seeds),
+            "nodes": len(self.hops),
+            "edges": len(self.graph),
+            "queried": len(self.queried),
+            "depth": max(self.hops.values(), default=0)
+        }
+
+
+class NetworkExpander:
+    """
+    Espande la rete di interazioni per hop successivi.
+
+    Ogni hop interroga STRING (interaction_partners) con una sola chiamata
+    batch per l'intera frontiera, deduplicata: un gene già interrogato non
+    viene mai richiesto di nuovo, quindi il costo cresce con i nodi distinti
+    e non con il numero di cammini. Tutti gli archi confluiscono in un
+    unico InteractionGraph.
+
+    Uso:
+        expander = NetworkExpander(SPARQLAggregator())
+        result = expander.expand(["EYS"], depth=2)
+        result.graph.partners("EYS")
+    """
+
+    def __init__(self, aggregator, min_score: float = DEFAULT_CONFIDENCE,
+                 fanout: Union[int, Sequence[int]] = DEFAULT_EXPANSION_FANOUT,
+                 max_frontier: Optional[int] = None,
+                 max_nodes: int = DEFAULT_EXPANSION_MAX_NODES,
+                 chunk_size: Optional[int] = None):
+        """
+        Args:
+            aggregator: SPARQLAggregator usato per le chiamate STRING (cache,
+                        rate limit e indice locale inclusi)
+            min_score: Score minimo STRING degli archi (0-1)
+            fanout: Partner per gene interrogato; una sequenza indica il
+                    limite per ciascun hop (l'ultimo valore vale per i successivi)
+            max_frontier: Geni interrogati al massimo per hop (i più connessi
+                          per score verso la rete già esplorata)
+            max_nodes: Geni interrogati al massimo in tutta l'espansione
+            chunk_size: Geni per richiesta batch (default da config)
+        """
+        self.aggregator = aggregator
+        self.min_score = min_score
+        self.fanout = [fanout] if isinstance(fanout, int) else list(fanout)
+        self.max_frontier = max_frontier
+        self.max_nodes = max_nodes
+        self.chunk_size = chunk_size
+
+    def _log(self, message: str):
+        if getattr(self.aggregator, "verbose", True):
+            print(message)
+
+    def _fanout(self, hop: int) -> int:
+        return self.fanout[min(hop, len(self.fanout) - 1)]
+
+    def _select_frontier(self, candidates: Dict[str, float], budget: int) -> List[str]:
+        """Geni da interrogare nel prossimo hop, per score decrescente entro i limiti"""
+        limit = budget if self.max_frontier is None else min(budget, self.max_frontier)
+        return heapq.nsmallest(max(limit, 0), candidates, key=lambda gene: (-candidates[gene], gene))
+
+    def expand(self, seeds: Iterable[str], depth: int = DEFAULT_EXPANSION_DEPTH,
+               graph: Optional[InteractionGraph] = None) -> ExpansionResult:
+        """
+        Visita in ampiezza fino a depth hop dai seed.
+
+        Con depth=1 si ottengono i partner diretti dei seed; con depth=2 anche
+        i partner dei partner, e così via. Gli archi sono orientati dal gene
+        interrogato verso il partner.
+
+        Args:
+            seeds: Simboli dei geni di partenza
+            depth: Numero di hop
+            graph: Grafo a cui aggiungere gli archi (default: nuovo grafo)
+        """
+        seeds = list(dict.fromkeys(seed.strip().upper() for seed in seeds if seed.strip()))
+        result = ExpansionResult(seeds=seeds, graph=graph if graph is not None else InteractionGraph())
+        for seed in seeds:
+            result.graph.symbols.intern(seed)
+            result.hops[seed] = 0
+
+        # Geni non ancora interrogati con il miglior score verso la rete: gli esclusi
+        # dai limiti di un hop restano candidati per i successivi (coda di priorità)
+        candidates = {seed: float("inf") for seed in seeds}
+
+        for hop in range(depth):
+            frontier = self._select_frontier(candidates, self.max_nodes - len(result.queried))
+            if not frontier:
+                break
+            for gene in frontier:
+                del candidates[gene]
+
+            start = time.time()
+            limit = self._fanout(hop)
+            self._log(f"[INFO] Hop {hop + 1}: {len(frontier)} geni, fino a {limit} partner ciascuno...")
+            interactions = self.aggregator.get_interactions_string_batch(
+                frontier, self.min_score, limit, self.chunk_size)
+            result.queried.update(frontier)
+
+            edges = 0
+            for gene in frontier:
+                for interaction in interactions.get(gene, []):
+                    result.graph.add_interaction(interaction, gene)
+                    edges += 1
+                    partner = interaction.protein_b
+                    if partner.upper() == gene:
+                        partner = interaction.protein_a
+                    partner = partner.upper()
+                    if partner not in result.hops:
+                        result.hops[partner] = hop + 1
+                    if partner not in result.queried and interaction.score > candidates.get(partner, -1.0):
+                        candidates[partner] = interaction.score
+
+            new = sum(1 for h in result.hops.values() if h == hop + 1)
+            result.hop_stats.append({
+                "hop": hop + 1,
+                "queried": len(frontier),
+                "edges": edges,
+                "new_genes": new,
+                "seconds": round(time.time() - start, 3)
+            })
+            self._log(f"[OK] Hop {hop + 1}: {edges} archi, {new} nuovi geni")
+
+        return result
+
+
+def expand_network(aggregator, seeds: Iterable[str], depth: int = DEFAULT_EXPANSION_DEPTH,
+                   **options) -> ExpansionResult:
+    """Scorciatoia per NetworkExpander(aggregator, **options).expand(seeds, depth)"""
+    return NetworkExpander(aggregator, **options).expand(seeds, depth)
+
+
+# =============================================================================
+# ESPANSIONE DA RIGA DI COMANDO
+# =============================================================================
+
+if __name__ == "__main__":
+    import argparse
+    from sparql_aggregator import SPARQLAggregator
+
+    parser = argparse.ArgumentParser(description="Espansione multi-hop della rete PPI da geni seed")
+    parser.add_argument("seeds", nargs="+", help="Geni seed (es. EYS)")
+    parser.add_argument("--depth", "-k", type=int, default=DEFAULT_EXPANSION_DEPTH, help="Numero di hop")
+    parser.add_argument("--min-score", type=float, default=DEFAULT_CONFIDENCE, help="Score minimo STRING (0-1)")
+    parser.add_argument("--fanout", type=int, nargs="+", default=[DEFAULT_EXPANSION_FANOUT],
+                        help="Partner per gene (uno per hop; l'ultimo vale per i successivi)")
+    parser.add_argument("--max-frontier", type=int, help="Geni interrogati al massimo per hop")
+    parser.add_argument("--max-nodes", type=int, default=DEFAULT_EXPANSION_MAX_NODES,
+                        help="Geni interrogati al massimo in totale")
+    parser.add_argument("--output", "-o", help="File TSV degli archi (gene, partner, score, evidenza)")
+    args = parser.parse_args()
+
+    expander = NetworkExpander(SPARQLAggregator(), args.min_score, args.fanout,
+                               args.max_frontier, args.max_nodes)
+    result = expander.expand(args.seeds, args.depth)
+
+    summary = result.summary()
+    print(f"\n[OK] {summary['nodes']} geni, {summary['edges']} archi, "
+          f"{summary['queried']} geni interrogati")
+    for stats in result.hop_stats:
+        print(f"     hop {stats['hop']}: {stats['queried']} interrogati, {stats['edges']} archi, "
+              f"{stats['new_genes']} nuovi geni ({stats['seconds']}s)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write("gene\tpartner\tscore\tevidence\n")
+            for gene in result.graph.genes():
+                for edge in result.graph.neighbors(gene):
+                    f.write(f"{gene}\t{edge['partner']}\t{edge['score']}\t{edge['evidence']}\n")
+        print(f"[OK] Archi salvati in {args.output}")
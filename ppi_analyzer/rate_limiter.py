@@ -0,0 +1,234 @@
+"""
+Rate Limiter Module
+Limitazione adattiva delle richieste per endpoint: token bucket, controllo
+AIMD della concorrenza e retry con backoff esponenziale (jitter)
+"""
+
+import email.utils
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from config import ENDPOINTS, DEFAULT_MAX_RETRIES
+from http_transport import HTTPError
+
+
+# Status che indicano sovraccarico dell'endpoint
+CONGESTION_STATUSES = (429, 503)
+# Status per cui ha senso riprovare
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Interpreta l'header Retry-After (secondi o data HTTP)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class TokenBucket:
+    """Token bucket thread-safe con rate modificabile a runtime"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill()
+            self.rate = rate
+
+    def pause(self, seconds: float):
+        """Sospende l'emissione di token (es. per Retry-After)"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """Attende fino a quando è disponibile un token"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                else:
+                    self._refill()
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AIMDController:
+    """
+    Limite di concorrenza adattivo (additive increase / multiplicative decrease).
+    Ogni successo aumenta il limite di increase/limit (circa +increase per
+    finestra di richieste), ogni segnale di congestione lo moltiplica per
+    decrease, al più una volta per cooldown secondi.
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: Optional[int] = None,
+                 increase: float = 1.0, decrease: float = 0.5, cooldown: float = 1.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum if maximum is not None else max(initial, 1)
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self):
+        with self._cond:
+            self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            self._cond.notify_all()
+
+    def on_congestion(self) -> bool:
+        """Riduce il limite; ritorna False se ancora in cooldown"""
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return False
+            self._last_decrease = now
+            self.limit = max(self.minimum, self.limit * self.decrease)
+            return True
+
+
+class EndpointLimiter:
+    """
+    Limitatore adattivo per un singolo endpoint.
+    Combina token bucket (richieste al secondo) e AIMD (richieste simultanee):
+    entrambi crescono additivamente con i successi e si dimezzano su 429/503,
+    timeout o picchi di latenza. Le richieste fallite per sovraccarico sono
+    ripetute con backoff esponenziale a jitter, rispettando Retry-After.
+    """
+
+    def __init__(self, name: str, conf: Dict[str, Any]):
+        self.name = name
+        self.max_rate = conf.get("max_rate_limit", conf.get("rate_limit", 5.0))
+        self.min_rate = conf.get("min_rate_limit", 0.1)
+        self.max_retries = conf.get("max_retries", DEFAULT_MAX_RETRIES)
+        self.backoff_base = conf.get("backoff_base", 0.5)
+        self.backoff_cap = conf.get("backoff_cap", 30.0)
+        self.spike_factor = conf.get("latency_spike_factor", 3.0)
+
+        self.bucket = TokenBucket(conf.get("rate_limit", 5.0))
+        # Oltre pool_size le richieste aspetterebbero comunque una connessione libera
+        initial = conf.get("concurrency", 4)
+        pool_size = conf.get("pool_size", initial)
+        self.concurrency = AIMDController(
+            initial=min(initial, pool_size),
+            maximum=min(conf.get("max_concurrency", pool_size), pool_size)
+        )
+        self._latency_ewma: Optional[float] = None
+        self._samples = 0
+        self._lock = threading.Lock()
+
+    def _on_success(self, latency: float):
+        with self._lock:
+            spike = (self._samples >= 10 and self._latency_ewma is not None
+                     and latency > self.spike_factor * self._latency_ewma)
+            self._latency_ewma = latency if self._latency_ewma is None else \
+                0.9 * self._latency_ewma + 0.1 * latency
+            self._samples += 1
+
+        if spike:
+            self._on_congestion()
+        else:
+            self.concurrency.on_success()
+            self.bucket.set_rate(min(self.max_rate, self.bucket.rate + 0.1))
+
+    def _on_congestion(self, retry_after: Optional[float] = None):
+        if retry_after:
+            self.bucket.pause(retry_after)
+        if self.concurrency.on_congestion():
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate * self.concurrency.decrease))
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Esegue fn rispettando i limiti dell'endpoint, con retry.
+        Solleva l'ultima eccezione se i tentativi sono esauriti o l'errore
+        non è ripetibile (es. HTTP 400).
+        """
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            self.concurrency.acquire()
+            start = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except HTTPError as e:
+                retry_after = parse_retry_after(e.headers.get("retry-after"))
+                if e.status in CONGESTION_STATUSES:
+                    self._on_congestion(retry_after)
+                if e.status not in RETRYABLE_STATUSES or attempt >= self.max_retries:
+                    raise
+                error = e
+            except (TimeoutError, ConnectionError) as e:
+                retry_after = None
+                self._on_congestion()
+                if attempt >= self.max_retries:
+                    raise
+                error = e
+            else:
+                self._on_success(time.monotonic() - start)
+                return result
+            finally:
+                self.concurrency.release()
+
+            delay = self._backoff(attempt, retry_after)
+            print(f"[RETRY] {self.name}: {error} - nuovo tentativo tra {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+class RateLimiterRegistry:
+    """Limitatori adattivi per tutti gli endpoint configurati"""
+
+    def __init__(self, endpoints: Optional[Dict[str, Dict]] = None):
+        self.limiters = {
+            name: EndpointLimiter(name, conf)
+            for name, conf in (endpoints or ENDPOINTS).items()
+        }
+
+    def __getitem__(self, name: str) -> EndpointLimiter:
+        return self.limiters[name]
+
+    def call(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Esegue fn con il limitatore dell'endpoint (senza limiti se sconosciuto)"""
+        limiter = self.limiters.get(name)
+        if limiter is None:
+            return fn(*args, **kwargs)
+        return limiter.call(fn, *args, **kwargs)
@@ -0,0 +1,192 @@
+"""
+Response Cache Module
+Cache persistente su disco (SQLite) delle risposte degli endpoint SPARQL e STRING
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+from config import ENDPOINTS, DEFAULT_CACHE_PATH, DEFAULT_CACHE_MAX_MB
+
+
+# Letterali stringa SPARQL: il loro contenuto non va normalizzato
+_SPARQL_LITERAL = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizza il testo di una query SPARQL per l'uso come chiave:
+    collassa gli spazi fuori dai letterali stringa.
+    """
+    parts = []
+    last = 0
+    for match in _SPARQL_LITERAL.finditer(query):
+        parts.append(" ".join(query[last:match.start()].split()))
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(" ".join(query[last:].split()))
+    return " ".join(p for p in parts if p)
+
+
+class ResponseCache:
+    """
+    Cache persistente delle risposte, su SQLite.
+
+    - Chiave: endpoint + query normalizzata (o parametri STRING ordinati)
+    - Payload JSON compresso con zlib
+    - TTL per endpoint letto da ENDPOINTS[...]["cache_ttl"]
+    - Dimensione massima con eliminazione LRU
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH,
+                 max_size_mb: float = DEFAULT_CACHE_MAX_MB,
+                 ttls: Optional[Dict[str, int]] = None):
+        self.path = path
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.ttls = ttls if ttls is not None else {
+            name: conf.get("cache_ttl") for name, conf in ENDPOINTS.items()
+        }
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_endpoint ON responses (endpoint)")
+        self._conn.commit()
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(endpoint: str, request: Any) -> str:
+        """
+        Calcola la chiave di cache.
+
+        Args:
+            endpoint: Nome dell'endpoint (chiave di ENDPOINTS)
+            request: Testo della query SPARQL oppure dizionario di parametri
+        """
+        if isinstance(request, str):
+            normalized = normalize_query(request)
+        else:
+            normalized = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(f"{endpoint}\n{normalized}".encode("utf-8")).hexdigest()
+        return f"{endpoint}:{digest}"
+
+    def get(self, endpoint: str, key: str) -> Optional[Any]:
+        """Ritorna il valore in cache, o None se assente o scaduto"""
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, size, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            payload, size, created = row
+            ttl = self.ttls.get(endpoint)
+            if ttl is not None and now - created > ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._size -= size
+                return None
+
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+
+        return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+    def put(self, endpoint: str, key: str, value: Any):
+        """Salva un valore in cache (sovrascrive eventuali voci esistenti)"""
+
+        payload = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        now = time.time()
+
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if old:
+                self._size -= old[0]
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, payload, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, payload, len(payload), now, now)
+            )
+            self._size += len(payload)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Elimina le voci meno recentemente usate fino a rientrare nel limite"""
+
+        while self._size > self.max_size:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 64").fetchall()
+            if not rows:
+                self._size = 0
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                if self._size <= self.max_size:
+                    break
+
+    def invalidate(self, endpoint: Optional[str] = None, key: Optional[str] = None) -> int:
+        """
+        Invalida voci della cache.
+
+        Args:
+            endpoint: Elimina tutte le voci di questo endpoint
+            key: Elimina una singola voce
+            (senza argomenti svuota l'intera cache)
+
+        Returns:
+            Numero di voci eliminate
+        """
+        conditions = []
+        params = []
+        if endpoint is not None:
+            conditions.append("endpoint = ?")
+            params.append(endpoint)
+        if key is not None:
+            conditions.append("key = ?")
+            params.append(key)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM responses{where}", params)
+            self._conn.commit()
+            self._size = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiche della cache (voci e byte per endpoint)"""
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT endpoint, COUNT(*), SUM(size) FROM responses GROUP BY endpoint").fetchall()
+        return {
+            "total_bytes": self._size,
+            "max_bytes": self.max_size,
+            "endpoints": {name: {"entries": count, "bytes": size} for name, count, size in rows}
+        }
+
+    def close(self):
+        """Chiude la connessione al database"""
+        with self._lock:
+            self._conn.close()
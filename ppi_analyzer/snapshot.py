@@ -0,0 +1,345 @@
+"""
+Snapshot Module
+Formato colonnare su disco per i risultati di aggregate_multiple_genes:
+un file tipizzato per colonna, dizionario delle stringhe e riapertura
+lazy tramite memory-mapping
+"""
+
+import array
+import functools
+import json
+import mmap
+import os
+import sys
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+
+SNAPSHOT_VERSION = 1
+
+# Fonti in ordine di _build_aggregated (memorizzate come bitmask)
+SOURCES = ("UniProt", "STRING", "WikiPathways")
+
+# Tabelle figlie di ogni gene: colonna -> tipo ("str" = id nel dizionario delle stringhe)
+TABLES = {
+    "interactions": {"partner": "str", "score": "f", "evidence": "str"},
+    "go_terms": {"id": "str", "label": "str"},
+    "diseases": {"text": "str"},
+    "pathways": {"id": "str", "title": "str", "url": "str"}
+}
+
+GENE_COLUMNS = {"symbol": "str", "uniprot_id": "str", "uniprot_name": "str", "sources": "B"}
+
+
+def _typecode(kind: str) -> str:
+    return "I" if kind == "str" else kind
+
+
+class SnapshotWriter:
+    """
+    Scrive uno snapshot in una directory, un gene alla volta: le colonne
+    sono accodate ai rispettivi file man mano, in memoria resta solo il
+    dizionario delle stringhe.
+
+    Uso:
+        with SnapshotWriter("panel.snapshot") as writer:
+            for gene, data in all_data.items():
+                writer.add(gene, data)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        # Senza manifest la directory non è uno snapshot valido finché close() non completa
+        manifest = os.path.join(path, "manifest.json")
+        if os.path.exists(manifest):
+            os.remove(manifest)
+        self.genes = 0
+        self.rows = {table: 0 for table in TABLES}
+        self._strings: Dict[str, int] = {}
+        self._string_offsets = array.array("Q", [0])
+        self._symbols: List[str] = []
+        self._string_file = open(os.path.join(path, "strings.bin"), "wb")
+        self._files = {}
+        for column in GENE_COLUMNS:
+            self._open(f"genes.{column}")
+        for table, columns in TABLES.items():
+            self._open(f"genes.{table}_offsets")
+            array.array("Q", [0]).tofile(self._files[f"genes.{table}_offsets"])
+            for column in columns:
+                self._open(f"{table}.{column}")
+
+    def _open(self, name: str):
+        self._files[name] = open(os.path.join(self.path, f"{name}.bin"), "wb")
+
+    def _intern(self, value: Any) -> int:
+        value = "" if value is None else str(value)
+        index = self._strings.get(value)
+        if index is None:
+            index = len(self._strings)
+            self._strings[value] = index
+            data = value.encode("utf-8")
+            self._string_file.write(data)
+            self._string_offsets.append(self._string_offsets[-1] + len(data))
+        return index
+
+    def _write(self, name: str, kind: str, values: List[Any]):
+        if kind == "str":
+            values = [self._intern(v) for v in values]
+        array.array(_typecode(kind), values).tofile(self._files[name])
+
+    def add(self, gene: str, data: Dict[str, Any]):
+        """Aggiunge i dati aggregati di un gene (formato di aggregate_gene_data)"""
+        uniprot = data.get("uniprot") or {}
+        sources = data.get("sources", [])
+        mask = sum(1 << i for i, source in enumerate(SOURCES) if source in sources)
+
+        self._write("genes.symbol", "str", [gene])
+        self._symbols.append(gene)
+        self._write("genes.uniprot_id", "str", [uniprot.get("id", "")])
+        self._write("genes.uniprot_name", "str", [uniprot.get("name", "")])
+        self._write("genes.sources", "B", [mask])
+
+        for table, columns in TABLES.items():
+            items = data.get(table, [])
+            if table == "diseases":
+                items = [{"text": disease} for disease in items]
+            for column, kind in columns.items():
+                default = 0.0 if kind == "f" else ""
+                self._write(f"{table}.{column}", kind, [item.get(column, default) for item in items])
+            self.rows[table] += len(items)
+            self._write(f"genes.{table}_offsets", "Q", [self.rows[table]])
+
+        self.genes += 1
+
+    def close(self, complete: bool = True):
+        """
+        Completa lo snapshot (indice delle stringhe e manifest). Con
+        complete=False chiude solo i file: senza manifest lo snapshot
+        parziale non può essere aperto.
+        """
+        if self._string_file.closed:
+            return
+        self._string_file.close()
+        for f in self._files.values():
+            f.close()
+        if not complete:
+            return
+        with open(os.path.join(self.path, "strings.idx.bin"), "wb") as f:
+            self._string_offsets.tofile(f)
+        # Righe dei geni ordinate per simbolo: ricerca binaria senza leggere tutti i simboli
+        with open(os.path.join(self.path, "genes.by_symbol.bin"), "wb") as f:
+            order = sorted(range(len(self._symbols)), key=self._symbols.__getitem__)
+            array.array("I", order).tofile(f)
+
+        manifest = {
+            "version": SNAPSHOT_VERSION,
+            "byteorder": sys.byteorder,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "genes": self.genes,
+            "strings": len(self._strings),
+            "gene_columns": {c: _typecode(k) for c, k in GENE_COLUMNS.items()},
+            "tables": {
+                table: {
+                    "rows": self.rows[table],
+                    "columns": {c: _typecode(k) for c, k in columns.items()}
+                }
+                for table, columns in TABLES.items()
+            }
+        }
+        # Il manifest compare (rename atomico) solo quando tutti i file sono completi
+        manifest_path = os.path.join(self.path, "manifest.json")
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(complete=exc_type is None)
+
+
+def write_snapshot(all_data: Dict[str, Dict], path: str) -> str:
+    """Salva l'output di aggregate_multiple_genes come snapshot colonnare"""
+    with SnapshotWriter(path) as writer:
+        for gene, data in all_data.items():
+            writer.add(gene, data)
+    return path
+
+
+class SnapshotGene(Mapping):
+    """Vista lazy dei dati di un gene: ogni chiave legge le colonne solo quando richiesta"""
+
+    KEYS = ("gene_symbol", "sources", "uniprot", "go_terms", "diseases", "interactions", "pathways")
+
+    def __init__(self, snapshot: "Snapshot", row: int):
+        self.snapshot = snapshot
+        self.row = row
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self.snapshot, f"_{key}")(self.row)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+
+class Snapshot:
+    """
+    Snapshot colonnare in sola lettura.
+
+    All'apertura si legge solo il manifest; ogni colonna viene mappata in
+    memoria al primo accesso, quindi si toccano solo le colonne usate (ad
+    esempio il confronto con la letteratura legge solo le interazioni).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{path}: versione snapshot non supportata")
+        if self.manifest.get("byteorder") != sys.byteorder:
+            raise ValueError(f"{path}: snapshot scritto con byte order {self.manifest.get('byteorder')}")
+        self._columns: Dict[str, memoryview] = {}
+        self._maps = []
+        self.string = functools.lru_cache(maxsize=1 << 16)(self._string)
+
+    def _column(self, name: str, typecode: str) -> memoryview:
+        column = self._columns.get(name)
+        if column is None:
+            with open(os.path.join(self.path, f"{name}.bin"), "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    column = memoryview(array.array(typecode))
+                else:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    base = memoryview(mapped)
+                    column = base.cast(typecode) if typecode != "B" else base
+                    self._maps.append((column, base, mapped))
+            self._columns[name] = column
+        return column
+
+    def _string(self, index: int) -> str:
+        offsets = self._column("strings.idx", "Q")
+        data = self._column("strings", "B")
+        return str(data[offsets[index]:offsets[index + 1]], "utf-8")
+
+    def _gene_column(self, column: str) -> memoryview:
+        return self._column(f"genes.{column}", self.manifest["gene_columns"][column])
+
+    def _table_column(self, table: str, column: str) -> memoryview:
+        return self._column(f"{table}.{column}", self.manifest["tables"][table]["columns"][column])
+
+    def _rows(self, table: str, row: int) -> range:
+        offsets = self._column(f"genes.{table}_offsets", "Q")
+        return range(offsets[row], offsets[row + 1])
+
+    # -------------------------------------------------------------------------
+    # Geni
+    # -------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self.manifest["genes"]
+
+    def genes(self) -> List[str]:
+        symbols = self._gene_column("symbol")
+        return [self.string(symbols[i]) for i in range(len(self))]
+
+    def row(self, gene: str) -> Optional[int]:
+        """Riga di un gene (ricerca binaria sui simboli ordinati)"""
+        order = self._column("genes.by_symbol", "I")
+        symbols = self._gene_column("symbol")
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.string(symbols[order[mid]]) < gene:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order) and self.string(symbols[order[lo]]) == gene:
+            return order[lo]
+        return None
+
+    def __contains__(self, gene: str) -> bool:
+        return self.row(gene) is not None
+
+    def view(self, gene: str) -> SnapshotGene:
+        """Dati di un gene come Mapping lazy (stesse chiavi di aggregate_gene_data)"""
+        row = self.row(gene)
+        if row is None:
+            raise KeyError(gene)
+        return SnapshotGene(self, row)
+
+    def __getitem__(self, gene: str) -> Dict[str, Any]:
+        """Dati di un gene come dizionario (legge tutte le colonne del gene)"""
+        return dict(self.view(gene))
+
+    def interactors(self, gene: str) -> Set[str]:
+        """Partner (maiuscoli) di un gene: legge solo la colonna interactions.partner"""
+        row = self.row(gene)
+        if row is None:
+            return set()
+        partners = self._table_column("interactions", "partner")
+        return {self.string(partners[i]).upper() for i in self._rows("interactions", row)}
+
+    # -------------------------------------------------------------------------
+    # Colonne per riga (usate da SnapshotGene)
+    # -------------------------------------------------------------------------
+
+    def _gene_symbol(self, row: int) -> str:
+        return self.string(self._gene_column("symbol")[row])
+
+    def _sources(self, row: int) -> List[str]:
+        mask = self._gene_column("sources")[row]
+        return [source for i, source in enumerate(SOURCES) if mask & (1 << i)]
+
+    def _uniprot(self, row: int) -> Dict[str, str]:
+        if not self._gene_column("sources")[row] & 1:
+            return {}
+        return {
+            "id": self.string(self._gene_column("uniprot_id")[row]),
+            "name": self.string(self._gene_column("uniprot_name")[row])
+        }
+
+    def _table(self, table: str, row: int) -> List[Dict[str, Any]]:
+        rows = self._rows(table, row)
+        items = [{} for _ in rows]
+        for column, typecode in self.manifest["tables"][table]["columns"].items():
+            values = self._table_column(table, column)
+            for item, i in zip(items, rows):
+                if typecode == "I":
+                    item[column] = self.string(values[i])
+                else:
+                    item[column] = round(values[i], 6)
+        return items
+
+    def _interactions(self, row: int) -> List[Dict[str, Any]]:
+        return self._table("interactions", row)
+
+    def _go_terms(self, row: int) -> List[Dict[str, str]]:
+        return self._table("go_terms", row)
+
+    def _pathways(self, row: int) -> List[Dict[str, str]]:
+        return self._table("pathways", row)
+
+    def _diseases(self, row: int) -> List[str]:
+        texts = self._table_column("diseases", "text")
+        return [self.string(texts[i]) for i in self._rows("diseases", row)]
+
+    def close(self):
+        self._columns = {}
+        self.string.cache_clear()
+        for column, base, mapped in self._maps:
+            try:
+                column.release()
+                base.release()
+                mapped.close()
+            except BufferError:
+                pass  # viste ancora referenziate altrove: chiusura alla garbage collection
+        self._maps = []
@@ -3,12 +3,22 @@ SPARQL Aggregator Module
 Raccoglie e unifica dati da multipli endpoint SPARQL (UniProt, WikiPathways, STRING)
 """
 
-import urllib.request
+import threading
 import urllib.parse
 import json
-from typing import Dict, List, Optional, Any
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Tuple, Union
 from dataclasses import dataclass, field
-from config import ENDPOINTS, DEFAULT_ORGANISM, DEFAULT_CONFIDENCE, DEFAULT_LIMIT
+from config import (ENDPOINTS, DEFAULT_ORGANISM, DEFAULT_CONFIDENCE, DEFAULT_LIMIT,
+                    DEFAULT_MAX_WORKERS, DEFAULT_PAGE_SIZE)
+from response_cache import ResponseCache
+from http_transport import HTTPTransport
+from rate_limiter import RateLimiterRegistry
+from hedging import Hedger
+from sparql_stream import iter_sparql_bindings
+from sparql_formats import MEDIA_TYPES, parse_sparql_results
+from wikipathways_index import WikiPathwaysIndex
+from string_index import StringLinksIndex, DEFAULT_REQUIRED_SCORE
 
 
 @dataclass
@@ -25,6 +35,17 @@ class ProteinInfo:
     source: str = ""
 
 
+# Endpoint (chiave di ENDPOINTS) interrogato da ciascuna fonte
+SOURCE_ENDPOINTS = {
+    "uniprot": "uniprot",
+    "protein_info": "uniprot",
+    "go_terms": "uniprot",
+    "diseases": "uniprot",
+    "interactions": "string",
+    "pathways": "wikipathways"
+}
+
+
 @dataclass
 class Interaction:
     """Interazione proteina-proteina"""
@@ -33,6 +54,10 @@ class Interaction:
     score: float = 0.0
     evidence_type: str = ""
     source: str = ""
+    escore: float = 0.0    # Canali STRING: sperimentale, database, textmining, coespressione
+    dscore: float = 0.0
+    tscore: float = 0.0
+    ascore: float = 0.0
 
 
 class SPARQLAggregator:
@@ -41,42 +66,209 @@ class SPARQLAggregator:
     Unifica risultati da UniProt, STRING, WikiPathways.
     """
 
-    def __init__(self, organism: str = DEFAULT_ORGANISM):
+    def __init__(self, organism: str = DEFAULT_ORGANISM,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 cache: Union[ResponseCache, str, None] = None,
+                 transport: Optional[HTTPTransport] = None,
+                 combined_uniprot: bool = False,
+                 endpoints: Optional[Dict[str, Dict]] = None,
+                 rate_limiting: bool = True,
+                 hedging: bool = False,
+                 verbose: bool = True):
+        """
+        Args:
+            organism: NCBI taxonomy ID
+            max_workers: Thread per le interrogazioni concorrenti
+            cache: Cache persistente delle risposte (None = disabilitata). Con un
+                   percorso la cache è creata con i TTL di endpoints e chiusa da close()
+            transport: Trasporto HTTP con connessioni persistenti (condivisibile)
+            combined_uniprot: Usa una sola query UniProt per proteina, GO e malattie
+            endpoints: Configurazione endpoint (default: config.ENDPOINTS)
+            rate_limiting: Limitazione adattiva e retry per endpoint
+            hedging: Duplica le richieste lente (endpoint con "hedge_percentile")
+            verbose: Stampa l'avanzamento per gene (gli errori sono sempre stampati)
+        """
+        self.endpoints = endpoints or ENDPOINTS
         self.organism = organism
-        self.cache: Dict[str, Any] = {}
+        self.max_workers = max_workers
+        if isinstance(cache, str):
+            cache = ResponseCache(cache, ttls={
+                name: conf.get("cache_ttl") for name, conf in self.endpoints.items()
+            })
+            self._owned_cache = cache
+        else:
+            self._owned_cache = None
+        self.cache = cache
+        self._owns_transport = transport is None
+        self.transport = transport or HTTPTransport(endpoints=self.endpoints)
+        self.combined_uniprot = combined_uniprot
+        self.limiters = RateLimiterRegistry(self.endpoints) if rate_limiting else None
+        self.hedger = Hedger(self.endpoints) if hedging else None
+        self.verbose = verbose
+        # Errori delle richieste nel thread corrente (fonti fallite per il journal)
+        self._errors = threading.local()
+        self._pathway_index: Optional[WikiPathwaysIndex] = None
+        self._pathway_index_lock = threading.Lock()
+        self._string_index: Optional[StringLinksIndex] = None
+        self._string_index_lock = threading.Lock()
+
+    def _log(self, message: str):
+        """Messaggio di avanzamento (solo in modalità verbose)"""
+        if self.verbose:
+            print(message)
+
+    def close(self):
+        """Chiude cache e trasporto creati dall'aggregatore, gli indici locali aperti e il pool dell'hedging"""
+        if self.hedger is not None:
+            self.hedger.shutdown()
+        if self._owned_cache is not None:
+            self._owned_cache.close()
+            self._owned_cache = None
+        if self._owns_transport:
+            self.transport.close()
+        with self._pathway_index_lock:
+            if self._pathway_index is not None:
+                self._pathway_index.close()
+                self._pathway_index = None
+        with self._string_index_lock:
+            if self._string_index is not None:
+                self._string_index.close()
+                self._string_index = None
+
+    def __enter__(self) -> "SPARQLAggregator":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _mark_failed(self):
+        """Registra un errore di richiesta nel thread corrente"""
+        self._errors.count = getattr(self._errors, "count", 0) + 1
+
+    def _call_tracked(self, fetch: Any, *args) -> Tuple[Any, bool]:
+        """Esegue fetch e ritorna (risultato, True se una sua richiesta è fallita)"""
+        self._errors.count = 0
+        result = fetch(*args)
+        return result, self._errors.count > 0
+
+    def _endpoint_name(self, endpoint_url: str) -> str:
+        """Ritorna il nome (chiave di ENDPOINTS) corrispondente a un URL"""
+        for name, conf in self.endpoints.items():
+            if endpoint_url.startswith(conf["url"]):
+                return name
+        return endpoint_url
 
     def _execute_sparql(self, endpoint_url: str, query: str) -> Optional[Dict]:
-        """Esegue una query SPARQL e ritorna i risultati JSON"""
-        try:
-            encoded_query = urllib.parse.quote(query)
-            url = f"{endpoint_url}?format=json&query={encoded_query}"
+        """Esegue una query SPARQL e ritorna i risultati JSON (usando la cache se presente)"""
+
+        if self.cache is None:
+            return self._fetch_sparql(endpoint_url, query)
 
-            req = urllib.request.Request(url)
-            req.add_header('Accept', 'application/sparql-results+json')
-            req.add_header('User-Agent', 'PPI-Analyzer/1.0')
+        name = self._endpoint_name(endpoint_url)
+        key = self.cache.make_key(name, query)
+        result = self.cache.get(name, key)
+        if result is None:
+            result = self._fetch_sparql(endpoint_url, query)
+            if result is not None:
+                self.cache.put(name, key, result)
+        return result
 
-            with urllib.request.urlopen(req, timeout=60) as response:
-                return json.loads(response.read().decode('utf-8'))
+    def _request(self, endpoint_name: str, method: str, url: str, **kwargs):
+        """
+        Richiesta HTTP tramite il limitatore adattivo dell'endpoint (se attivo),
+        con hedging delle richieste lente (se attivo).
+        """
+        def send(cancel=None):
+            if self.limiters is None:
+                return self.transport.request(method, url, cancel=cancel, **kwargs)
+            return self.limiters.call(endpoint_name, self.transport.request, method, url,
+                                      cancel=cancel, **kwargs)
+
+        if self.hedger is None:
+            return send()
+        return self.hedger.call(endpoint_name, send)
+
+    def _fetch_sparql(self, endpoint_url: str, query: str) -> Optional[Dict]:
+        """
+        Esegue una query SPARQL sull'endpoint.
+        Il formato richiesto dipende da ENDPOINTS[...]["result_format"]
+        ("json", "tsv" o "csv"); il risultato ha sempre la struttura JSON.
+        """
+        try:
+            encoded_query = urllib.parse.quote(query)
+            name = self._endpoint_name(endpoint_url)
+            conf = self.endpoints.get(name, {})
+            result_format = conf.get("result_format", "json")
+            if result_format == "json":
+                url = f"{endpoint_url}?format=json&query={encoded_query}"
+            else:
+                url = f"{endpoint_url}?query={encoded_query}"
+
+            response = self._request(
+                name, "GET", url,
+                headers={'Accept': MEDIA_TYPES[result_format]},
+                timeout=conf.get("timeout", 60)
+            )
+            return parse_sparql_results(response.body.decode('utf-8'), result_format)
         except Exception as e:
             print(f"[ERRORE] Query SPARQL fallita: {e}")
+            self._mark_failed()
             return None
 
-    def _call_string_api(self, endpoint: str, params: Dict) -> Optional[List]:
-        """Chiama l'API REST di STRING"""
-        try:
-            base_url = f"https://string-db.org/api/json/{endpoint}"
-            query_string = urllib.parse.urlencode(params)
-            url = f"{base_url}?{query_string}"
+    def _call_string_api(self, endpoint: str, params: Dict, post: bool = False) -> Optional[List]:
+        """
+        Chiama l'API REST di STRING (usando la cache se presente).
+        Con post=True i parametri sono inviati nel body (liste lunghe di identificativi).
+        """
+
+        if self.cache is None:
+            return self._fetch_string_api(endpoint, params, post)
 
-            req = urllib.request.Request(url)
-            req.add_header('User-Agent', 'PPI-Analyzer/1.0')
+        key = self.cache.make_key("string", dict(params, _method=endpoint))
+        result = self.cache.get("string", key)
+        if result is None:
+            result = self._fetch_string_api(endpoint, params, post)
+            if result is not None:
+                self.cache.put("string", key, result)
+        return result
 
-            with urllib.request.urlopen(req, timeout=30) as response:
-                return json.loads(response.read().decode('utf-8'))
+    def _fetch_string_api(self, endpoint: str, params: Dict, post: bool = False) -> Optional[List]:
+        """Esegue la chiamata HTTP all'API REST di STRING"""
+        try:
+            base_url = f"{self.endpoints['string']['url']}/json/{endpoint}"
+            query_string = urllib.parse.urlencode(params)
+            timeout = self.endpoints["string"]["timeout"]
+
+            if post:
+                response = self._request(
+                    "string", "POST", base_url,
+                    headers={'Content-Type': 'application/x-www-form-urlencoded'},
+                    body=query_string.encode('utf-8'),
+                    timeout=timeout
+                )
+            else:
+                response = self._request("string", "GET", f"{base_url}?{query_string}",
+                                         timeout=timeout)
+            return json.loads(response.body.decode('utf-8'))
         except Exception as e:
             print(f"[ERRORE] STRING API fallita: {e}")
+            self._mark_failed()
             return None
 
+    @staticmethod
+    def _chunks(items: List[str], size: int) -> List[List[str]]:
+        """Suddivide una lista in blocchi di dimensione massima size"""
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    @staticmethod
+    def _values_block(variable: str, values: List[str]) -> str:
+        """Costruisce un blocco SPARQL VALUES con letterali stringa"""
+        literals = " ".join(
+            '"' + v.replace("\\", "\\\\").replace('"', '\\"') + '"'
+            for v in values
+        )
+        return f"VALUES ?{variable} {{ {literals} }}"
+
     # =========================================================================
     # UNIPROT QUERIES
     # =========================================================================
@@ -108,7 +300,7 @@ class SPARQLAggregator:
         LIMIT 1
         """
 
-        result = self._execute_sparql(ENDPOINTS["uniprot"]["url"], query)
+        result = self._execute_sparql(self.endpoints["uniprot"]["url"], query)
 
         if result and result.get("results", {}).get("bindings"):
             binding = result["results"]["bindings"][0]
@@ -121,10 +313,9 @@ class SPARQLAggregator:
             return protein
         return None
 
-    def get_go_terms_uniprot(self, gene_symbol: str) -> List[Dict[str, str]]:
-        """Recupera termini GO da UniProt"""
-
-        query = f"""
+    def _go_terms_query(self, gene_symbol: str) -> str:
+        """Query GO per un gene (senza LIMIT)"""
+        return f"""
         PREFIX up: <http://purl.uniprot.org/core/>
         PREFIX taxon: <http://purl.uniprot.org/taxonomy/>
         PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
@@ -141,25 +332,32 @@ class SPARQLAggregator:
           FILTER (?geneName = "{gene_symbol}")
           FILTER (STRSTARTS(STR(?goTerm), "http://purl.obolibrary.org/obo/GO_"))
         }}
-        LIMIT 50
         """
 
-        result = self._execute_sparql(ENDPOINTS["uniprot"]["url"], query)
+    @staticmethod
+    def _parse_go_binding(binding: Dict) -> Dict[str, str]:
+        return {
+            "id": binding.get("goTerm", {}).get("value", "").split("/")[-1].replace("_", ":"),
+            "label": binding.get("goLabel", {}).get("value", "")
+        }
+
+    def get_go_terms_uniprot(self, gene_symbol: str) -> List[Dict[str, str]]:
+        """Recupera termini GO da UniProt"""
+
+        query = self._go_terms_query(gene_symbol) + "LIMIT 50\n"
+
+        result = self._execute_sparql(self.endpoints["uniprot"]["url"], query)
         go_terms = []
 
         if result and result.get("results", {}).get("bindings"):
             for binding in result["results"]["bindings"]:
-                go_terms.append({
-                    "id": binding.get("goTerm", {}).get("value", "").split("/")[-1].replace("_", ":"),
-                    "label": binding.get("goLabel", {}).get("value", "")
-                })
+                go_terms.append(self._parse_go_binding(binding))
 
         return go_terms
 
-    def get_diseases_uniprot(self, gene_symbol: str) -> List[str]:
-        """Recupera annotazioni di malattia da UniProt"""
-
-        query = f"""
+    def _diseases_query(self, gene_symbol: str) -> str:
+        """Query malattie per un gene"""
+        return f"""
         PREFIX up: <http://purl.uniprot.org/core/>
         PREFIX taxon: <http://purl.uniprot.org/taxonomy/>
         PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
@@ -178,7 +376,12 @@ class SPARQLAggregator:
         }}
         """
 
-        result = self._execute_sparql(ENDPOINTS["uniprot"]["url"], query)
+    def get_diseases_uniprot(self, gene_symbol: str) -> List[str]:
+        """Recupera annotazioni di malattia da UniProt"""
+
+        query = self._diseases_query(gene_symbol)
+
+        result = self._execute_sparql(self.endpoints["uniprot"]["url"], query)
         diseases = []
 
         if result and result.get("results", {}).get("bindings"):
@@ -189,13 +392,284 @@ class SPARQLAggregator:
 
         return diseases
 
+    def get_uniprot_combined(self, gene_symbol: str) -> Tuple[Optional[ProteinInfo],
+                                                              List[Dict[str, str]], List[str]]:
+        """
+        Recupera informazioni proteiche, termini GO e malattie con una sola query.
+        Il pattern proteina/gene è risolto una volta e i tre tipi di dato sono
+        recuperati in rami UNION, poi separati nelle strutture delle query singole.
+
+        Returns:
+            Tupla (ProteinInfo o None, go_terms, diseases)
+        """
+
+        query = f"""
+        PREFIX up: <http://purl.uniprot.org/core/>
+        PREFIX taxon: <http://purl.uniprot.org/taxonomy/>
+        PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+        SELECT DISTINCT ?protein ?proteinName ?function ?goTerm ?goLabel ?diseaseText
+        WHERE {{
+          ?protein a up:Protein ;
+                   up:organism taxon:{self.organism} ;
+                   up:encodedBy ?gene .
+          ?gene skos:prefLabel ?geneName .
+          FILTER (?geneName = "{gene_symbol}")
+          {{
+            ?protein up:recommendedName ?recName .
+            ?recName up:fullName ?proteinName .
+            OPTIONAL {{
+              ?protein up:annotation ?ann .
+              ?ann a up:Function_Annotation ;
+                   rdfs:comment ?function .
+            }}
+          }}
+          UNION
+          {{
+            ?protein up:classifiedWith ?goTerm .
+            ?goTerm rdfs:label ?goLabel .
+            FILTER (STRSTARTS(STR(?goTerm), "http://purl.obolibrary.org/obo/GO_"))
+          }}
+          UNION
+          {{
+            ?protein up:annotation ?annotation .
+            ?annotation a up:Disease_Annotation ;
+                        rdfs:comment ?diseaseText .
+          }}
+        }}
+        """
+
+        result = self._execute_sparql(self.endpoints["uniprot"]["url"], query)
+        protein = None
+        go_terms = []
+        diseases = []
+
+        if result and result.get("results", {}).get("bindings"):
+            for binding in result["results"]["bindings"]:
+                if "proteinName" in binding:
+                    if protein is None:
+                        protein = ProteinInfo(
+                            gene_symbol=gene_symbol,
+                            uniprot_id=binding.get("protein", {}).get("value", "").split("/")[-1],
+                            protein_name=binding["proteinName"].get("value", ""),
+                            source="UniProt"
+                        )
+                elif "goTerm" in binding:
+                    # Stesso limite della query singola (LIMIT 50)
+                    if len(go_terms) < 50:
+                        go_terms.append(self._parse_go_binding(binding))
+                elif "diseaseText" in binding:
+                    disease = binding["diseaseText"].get("value", "")
+                    if disease and disease not in diseases:
+                        diseases.append(disease)
+
+        if protein is not None:
+            protein.go_terms = go_terms
+            protein.diseases = diseases
+
+        return protein, go_terms, diseases
+
+    # -------------------------------------------------------------------------
+    # Varianti batch: un blocco VALUES per chunk di geni invece di una query
+    # per gene. I risultati sono ridistribuiti per gene tramite ?geneName.
+    # -------------------------------------------------------------------------
+
+    def get_protein_info_uniprot_batch(self, gene_symbols: List[str],
+                                       chunk_size: Optional[int] = None) -> Dict[str, Optional[ProteinInfo]]:
+        """Recupera informazioni proteiche da UniProt per una lista di geni"""
+
+        genes = list(dict.fromkeys(gene_symbols))
+        chunk_size = chunk_size or self.endpoints["uniprot"]["batch_size"]
+        proteins: Dict[str, Optional[ProteinInfo]] = {gene: None for gene in genes}
+
+        for chunk in self._chunks(genes, chunk_size):
+            query = f"""
+            PREFIX up: <http://purl.uniprot.org/core/>
+            PREFIX taxon: <http://purl.uniprot.org/taxonomy/>
+            PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
+
+            SELECT ?protein ?geneName ?proteinName
+            WHERE {{
+              {self._values_block("geneName", chunk)}
+              ?protein a up:Protein ;
+                       up:organism taxon:{self.organism} ;
+                       up:encodedBy ?gene ;
+                       up:recommendedName ?recName .
+              ?gene skos:prefLabel ?geneName .
+              ?recName up:fullName ?proteinName .
+            }}
+            """
+
+            result = self._execute_sparql(self.endpoints["uniprot"]["url"], query)
+            if not result:
+                continue
+
+            for binding in result.get("results", {}).get("bindings", []):
+                gene = binding.get("geneName", {}).get("value", "")
+                # Come nella query singola (LIMIT 1) si tiene il primo risultato
+                if gene in proteins and proteins[gene] is None:
+                    proteins[gene] = ProteinInfo(
+                        gene_symbol=gene,
+                        uniprot_id=binding.get("protein", {}).get("value", "").split("/")[-1],
+                        protein_name=binding.get("proteinName", {}).get("value", ""),
+                        source="UniProt"
+                    )
+
+        return proteins
+
+    def get_go_terms_uniprot_batch(self, gene_symbols: List[str],
+                                   chunk_size: Optional[int] = None) -> Dict[str, List[Dict[str, str]]]:
+        """Recupera termini GO da UniProt per una lista di geni"""
+
+        genes = list(dict.fromkeys(gene_symbols))
+        chunk_size = chunk_size or self.endpoints["uniprot"]["batch_size"]
+        go_terms: Dict[str, List[Dict[str, str]]] = {gene: [] for gene in genes}
+
+        for chunk in self._chunks(genes, chunk_size):
+            query = f"""
+            PREFIX up: <http://purl.uniprot.org/core/>
+            PREFIX taxon: <http://purl.uniprot.org/taxonomy/>
+            PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
+            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+            SELECT ?geneName ?goTerm ?goLabel
+            WHERE {{
+              {self._values_block("geneName", chunk)}
+              ?protein a up:Protein ;
+                       up:organism taxon:{self.organism} ;
+                       up:encodedBy ?gene ;
+                       up:classifiedWith ?goTerm .
+              ?gene skos:prefLabel ?geneName .
+              ?goTerm rdfs:label ?goLabel .
+              FILTER (STRSTARTS(STR(?goTerm), "http://purl.obolibrary.org/obo/GO_"))
+            }}
+            """
+
+            result = self._execute_sparql(self.endpoints["uniprot"]["url"], query)
+            if not result:
+                continue
+
+            for binding in result.get("results", {}).get("bindings", []):
+                gene = binding.get("geneName", {}).get("value", "")
+                # Stesso limite per gene della query singola (LIMIT 50)
+                if gene in go_terms and len(go_terms[gene]) < 50:
+                    go_terms[gene].append(self._parse_go_binding(binding))
+
+        return go_terms
+
+    def get_diseases_uniprot_batch(self, gene_symbols: List[str],
+                                   chunk_size: Optional[int] = None) -> Dict[str, List[str]]:
+        """Recupera annotazioni di malattia da UniProt per una lista di geni"""
+
+        genes = list(dict.fromkeys(gene_symbols))
+        chunk_size = chunk_size or self.endpoints["uniprot"]["batch_size"]
+        diseases: Dict[str, List[str]] = {gene: [] for gene in genes}
+
+        for chunk in self._chunks(genes, chunk_size):
+            query = f"""
+            PREFIX up: <http://purl.uniprot.org/core/>
+            PREFIX taxon: <http://purl.uniprot.org/taxonomy/>
+            PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
+            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+            SELECT DISTINCT ?geneName ?diseaseText
+            WHERE {{
+              {self._values_block("geneName", chunk)}
+              ?protein a up:Protein ;
+                       up:organism taxon:{self.organism} ;
+                       up:encodedBy ?gene ;
+                       up:annotation ?annotation .
+              ?gene skos:prefLabel ?geneName .
+              ?annotation a up:Disease_Annotation ;
+                          rdfs:comment ?diseaseText .
+            }}
+            """
+
+            result = self._execute_sparql(self.endpoints["uniprot"]["url"], query)
+            if not result:
+                continue
+
+            for binding in result.get("results", {}).get("bindings", []):
+                gene = binding.get("geneName", {}).get("value", "")
+                disease = binding.get("diseaseText", {}).get("value", "")
+                if gene in diseases and disease:
+                    diseases[gene].append(disease)
+
+        return diseases
+
     # =========================================================================
     # STRING QUERIES
     # =========================================================================
 
+    @staticmethod
+    def _parse_string_interaction(item: Dict) -> Interaction:
+        """Converte una riga JSON di STRING in Interaction"""
+
+        # Estrai i nomi dei geni (preferredName)
+        gene_a = item.get("preferredName_A", item.get("stringId_A", ""))
+        gene_b = item.get("preferredName_B", item.get("stringId_B", ""))
+        score = item.get("score", 0)
+
+        # Determina tipo di evidenza
+        evidence = []
+        if item.get("escore", 0) > 0:
+            evidence.append("experimental")
+        if item.get("dscore", 0) > 0:
+            evidence.append("database")
+        if item.get("tscore", 0) > 0:
+            evidence.append("textmining")
+        if item.get("ascore", 0) > 0:
+            evidence.append("coexpression")
+
+        return Interaction(
+            protein_a=gene_a,
+            protein_b=gene_b,
+            score=score,
+            evidence_type=", ".join(evidence) if evidence else "combined",
+            source="STRING",
+            escore=item.get("escore", 0),
+            dscore=item.get("dscore", 0),
+            tscore=item.get("tscore", 0),
+            ascore=item.get("ascore", 0)
+        )
+
+    def _string_offline(self) -> Optional[StringLinksIndex]:
+        """
+        Indice locale STRING se ENDPOINTS["string"]["mode"] è "offline"
+        (aperto alla prima richiesta), altrimenti None.
+        """
+        conf = self.endpoints["string"]
+        if conf.get("mode", "remote") != "offline":
+            return None
+        with self._string_index_lock:
+            if self._string_index is None:
+                self._string_index = StringLinksIndex(conf["index_path"])
+                if self._string_index.species != self.organism:
+                    print(f"[ERRORE] Indice STRING per la specie {self._string_index.species}, "
+                          f"richiesta {self.organism}")
+        return self._string_index
+
+    @staticmethod
+    def _parse_string_partner(item: Dict) -> Dict:
+        """Converte una riga interaction_partners di STRING in partner funzionale"""
+        return {
+            "gene": item.get("preferredName_B", ""),
+            "string_id": item.get("stringId_B", ""),
+            "score": item.get("score", 0),
+            "escore": item.get("escore", 0),
+            "dscore": item.get("dscore", 0),
+            "tscore": item.get("tscore", 0)
+        }
+
     def get_interactions_string(self, gene_symbol: str,
                                 min_score: float = DEFAULT_CONFIDENCE) -> List[Interaction]:
-        """Recupera interazioni proteina-proteina da STRING"""
+        """Recupera interazioni proteina-proteina da STRING (API REST o indice locale)"""
+
+        index = self._string_offline()
+        if index is not None:
+            return [self._parse_string_interaction(item)
+                    for item in index.network(gene_symbol, int(min_score * 1000), DEFAULT_LIMIT)]
 
         params = {
             "identifiers": gene_symbol,
@@ -209,34 +683,17 @@ class SPARQLAggregator:
 
         if result:
             for item in result:
-                # Estrai i nomi dei geni (preferredName)
-                gene_a = item.get("preferredName_A", item.get("stringId_A", ""))
-                gene_b = item.get("preferredName_B", item.get("stringId_B", ""))
-                score = item.get("score", 0)
-
-                # Determina tipo di evidenza
-                evidence = []
-                if item.get("escore", 0) > 0:
-                    evidence.append("experimental")
-                if item.get("dscore", 0) > 0:
-                    evidence.append("database")
-                if item.get("tscore", 0) > 0:
-                    evidence.append("textmining")
-                if item.get("ascore", 0) > 0:
-                    evidence.append("coexpression")
-
-                interactions.append(Interaction(
-                    protein_a=gene_a,
-                    protein_b=gene_b,
-                    score=score,
-                    evidence_type=", ".join(evidence) if evidence else "combined",
-                    source="STRING"
-                ))
+                interactions.append(self._parse_string_interaction(item))
 
         return interactions
 
     def get_functional_partners_string(self, gene_symbol: str, limit: int = 20) -> List[Dict]:
-        """Recupera partner funzionali da STRING con dettagli"""
+        """Recupera partner funzionali da STRING con dettagli (API REST o indice locale)"""
+
+        index = self._string_offline()
+        if index is not None:
+            return [self._parse_string_partner(item)
+                    for item in index.partners(gene_symbol, DEFAULT_REQUIRED_SCORE, limit)]
 
         params = {
             "identifiers": gene_symbol,
@@ -249,25 +706,123 @@ class SPARQLAggregator:
 
         if result:
             for item in result:
-                partners.append({
-                    "gene": item.get("preferredName_B", ""),
-                    "string_id": item.get("stringId_B", ""),
-                    "score": item.get("score", 0),
-                    "escore": item.get("escore", 0),
-                    "dscore": item.get("dscore", 0),
-                    "tscore": item.get("tscore", 0)
-                })
+                partners.append(self._parse_string_partner(item))
 
         return partners
 
+    # -------------------------------------------------------------------------
+    # Varianti batch: molti identificativi per chiamata (separati da "\r").
+    # I simboli sono prima risolti in STRING ID (get_string_ids con
+    # echo_query), così le righe di risposta sono ricondotte al gene richiesto
+    # anche quando STRING usa un preferredName diverso dal simbolo in input.
+    # -------------------------------------------------------------------------
+
+    def _resolve_string_ids(self, gene_symbols: List[str]) -> Dict[str, List[str]]:
+        """
+        Mappa STRING ID -> simboli richiesti per un chunk di geni (più simboli,
+        ad esempio un alias e il nome ufficiale, possono indicare la stessa proteina)
+        """
+
+        params = {
+            "identifiers": "\r".join(gene_symbols),
+            "species": self.organism,
+            "limit": 1,
+            "echo_query": 1
+        }
+
+        result = self._call_string_api("get_string_ids", params, post=True)
+        mapping: Dict[str, List[str]] = {}
+
+        if result:
+            for item in result:
+                string_id = item.get("stringId", "")
+                query_item = item.get("queryItem", "")
+                if string_id and query_item:
+                    query_items = mapping.setdefault(string_id, [])
+                    if query_item not in query_items:
+                        query_items.append(query_item)
+
+        return mapping
+
+    def _call_string_batch(self, endpoint: str, gene_symbols: List[str], params: Dict,
+                           chunk_size: Optional[int] = None) -> Dict[str, List[Dict]]:
+        """
+        Esegue una chiamata STRING per chunk di geni e ridistribuisce
+        le righe di risposta per gene (tramite stringId_A, a tutti i geni
+        che corrispondono allo stesso STRING ID).
+        """
+
+        genes = list(dict.fromkeys(gene_symbols))
+        chunk_size = chunk_size or self.endpoints["string"]["batch_size"]
+
+        index = self._string_offline()
+        if index is not None and endpoint == "interaction_partners":
+            return {
+                gene: index.partners(gene, params.get("required_score", DEFAULT_REQUIRED_SCORE),
+                                     params.get("limit"))
+                for gene in genes
+            }
+
+        rows: Dict[str, List[Dict]] = {gene: [] for gene in genes}
+
+        for chunk in self._chunks(genes, chunk_size):
+            id_to_gene = self._resolve_string_ids(chunk)
+            if not id_to_gene:
+                continue
+
+            chunk_params = dict(params, identifiers="\r".join(id_to_gene), species=self.organism)
+            result = self._call_string_api(endpoint, chunk_params, post=True)
+
+            if result:
+                for item in result:
+                    # Ogni riga va a tutti i simboli risolti nella stessa proteina
+                    for gene in id_to_gene.get(item.get("stringId_A", ""), ()):
+                        if gene in rows:
+                            rows[gene].append(item)
+
+        return rows
+
+    def get_interactions_string_batch(self, gene_symbols: List[str],
+                                      min_score: float = DEFAULT_CONFIDENCE,
+                                      limit: int = DEFAULT_LIMIT,
+                                      chunk_size: Optional[int] = None) -> Dict[str, List[Interaction]]:
+        """
+        Recupera interazioni da STRING per una lista di geni.
+        Usa interaction_partners, quindi ritorna solo gli archi gene -> partner
+        (limit e required_score sono applicati per singolo gene).
+        """
+
+        params = {
+            "limit": limit,
+            "required_score": int(min_score * 1000)
+        }
+
+        rows = self._call_string_batch("interaction_partners", gene_symbols, params, chunk_size)
+
+        return {
+            gene: [self._parse_string_interaction(item) for item in items]
+            for gene, items in rows.items()
+        }
+
+    def get_functional_partners_string_batch(self, gene_symbols: List[str], limit: int = 20,
+                                             chunk_size: Optional[int] = None) -> Dict[str, List[Dict]]:
+        """Recupera partner funzionali da STRING per una lista di geni"""
+
+        rows = self._call_string_batch("interaction_partners", gene_symbols,
+                                       {"limit": limit}, chunk_size)
+
+        return {
+            gene: [self._parse_string_partner(item) for item in items]
+            for gene, items in rows.items()
+        }
+
     # =========================================================================
     # WIKIPATHWAYS QUERIES
     # =========================================================================
 
-    def get_pathways_wikipathways(self, gene_symbol: str) -> List[Dict[str, str]]:
-        """Recupera pathway da WikiPathways"""
-
-        query = f"""
+    def _pathways_query(self, gene_symbol: str) -> str:
+        """Query pathway WikiPathways per un gene"""
+        return f"""
         PREFIX wp: <http://vocabularies.wikipathways.org/wp#>
         PREFIX dc: <http://purl.org/dc/elements/1.1/>
         PREFIX dcterms: <http://purl.org/dc/terms/>
@@ -286,30 +841,320 @@ class SPARQLAggregator:
         }}
         """
 
-        result = self._execute_sparql(ENDPOINTS["wikipathways"]["url"], query)
+    @staticmethod
+    def _parse_pathway_binding(binding: Dict) -> Dict[str, str]:
+        return {
+            "id": binding.get("identifier", {}).get("value", ""),
+            "title": binding.get("title", {}).get("value", ""),
+            "url": binding.get("pathway", {}).get("value", "")
+        }
+
+    def _wikipathways_offline(self) -> Optional[WikiPathwaysIndex]:
+        """
+        Indice locale WikiPathways se ENDPOINTS["wikipathways"]["mode"] è
+        "offline" (aperto alla prima richiesta), altrimenti None.
+        """
+        conf = self.endpoints["wikipathways"]
+        if conf.get("mode", "remote") != "offline":
+            return None
+        with self._pathway_index_lock:
+            if self._pathway_index is None:
+                self._pathway_index = WikiPathwaysIndex(conf["index_path"])
+        return self._pathway_index
+
+    def get_pathways_wikipathways(self, gene_symbol: str) -> List[Dict[str, str]]:
+        """Recupera pathway da WikiPathways (endpoint SPARQL o indice locale)"""
+
+        index = self._wikipathways_offline()
+        if index is not None:
+            return index.lookup(gene_symbol)
+
+        query = self._pathways_query(gene_symbol)
+
+        result = self._execute_sparql(self.endpoints["wikipathways"]["url"], query)
         pathways = []
 
         if result and result.get("results", {}).get("bindings"):
             for binding in result["results"]["bindings"]:
-                pathways.append({
-                    "id": binding.get("identifier", {}).get("value", ""),
-                    "title": binding.get("title", {}).get("value", ""),
-                    "url": binding.get("pathway", {}).get("value", "")
-                })
+                pathways.append(self._parse_pathway_binding(binding))
 
         return pathways
 
+    # =========================================================================
+    # PAGINAZIONE
+    # =========================================================================
+
+    def _iter_paged(self, endpoint_url: str, query: str, order_by: str,
+                    page_size: Optional[int] = None, prefetch: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Esegue una query a pagine (ORDER BY stabile + LIMIT/OFFSET) e produce i
+        binding di tutte le pagine. Con prefetch la pagina successiva viene
+        scaricata mentre il chiamante consuma quella corrente; se il chiamante
+        smette di iterare le pagine successive non vengono richieste.
+        Se una pagina fallisce l'iterazione termina e l'errore è registrato nel
+        thread del chiamante, così _call_tracked segnala il risultato incompleto.
+        """
+        page_size = page_size or DEFAULT_PAGE_SIZE
+
+        def fetch_page(offset: int) -> Optional[List[Dict]]:
+            paged_query = f"{query}ORDER BY {order_by}\nLIMIT {page_size}\nOFFSET {offset}\n"
+            result = self._execute_sparql(endpoint_url, paged_query)
+            if result is None:
+                return None
+            return result.get("results", {}).get("bindings", [])
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        next_page = None
+        try:
+            offset = 0
+            bindings = fetch_page(offset)
+            while bindings is not None:
+                full_page = len(bindings) == page_size
+                if executor is not None and full_page:
+                    next_page = executor.submit(fetch_page, offset + page_size)
+
+                yield from bindings
+
+                if not full_page:
+                    return
+                offset += page_size
+                bindings = next_page.result() if next_page is not None else fetch_page(offset)
+                next_page = None
+            # La pagina può essere stata scaricata dal thread di prefetch
+            print(f"[ERRORE] Paginazione interrotta all'offset {offset}: risultati incompleti")
+            self._mark_failed()
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def iter_go_terms(self, gene_symbol: str, page_size: Optional[int] = None,
+                      prefetch: bool = True) -> Iterator[Dict[str, str]]:
+        """Tutti i termini GO di un gene (senza il limite di 50), a pagine"""
+        for binding in self._iter_paged(self.endpoints["uniprot"]["url"],
+                                        self._go_terms_query(gene_symbol),
+                                        "?goTerm ?goLabel", page_size, prefetch):
+            yield self._parse_go_binding(binding)
+
+    def iter_diseases(self, gene_symbol: str, page_size: Optional[int] = None,
+                      prefetch: bool = True) -> Iterator[str]:
+        """Tutte le annotazioni di malattia di un gene, a pagine"""
+        for binding in self._iter_paged(self.endpoints["uniprot"]["url"],
+                                        self._diseases_query(gene_symbol),
+                                        "?diseaseText", page_size, prefetch):
+            disease = binding.get("diseaseText", {}).get("value", "")
+            if disease:
+                yield disease
+
+    def iter_pathways(self, gene_symbol: str, page_size: Optional[int] = None,
+                      prefetch: bool = True) -> Iterator[Dict[str, str]]:
+        """Tutti i pathway WikiPathways di un gene, a pagine"""
+        index = self._wikipathways_offline()
+        if index is not None:
+            yield from index.lookup(gene_symbol)
+            return
+        for binding in self._iter_paged(self.endpoints["wikipathways"]["url"],
+                                        self._pathways_query(gene_symbol),
+                                        "?pathway ?identifier ?title", page_size, prefetch):
+            yield self._parse_pathway_binding(binding)
+
+    # =========================================================================
+    # STREAMING
+    # =========================================================================
+
+    def iter_sparql(self, endpoint_url: str, query: str) -> Iterator[Dict[str, Any]]:
+        """
+        Esegue una query SPARQL e produce i binding uno alla volta mentre la
+        risposta viene scaricata (memoria costante, nessuna cache).
+        In caso di errore stampa il messaggio e termina l'iterazione.
+        """
+        name = self._endpoint_name(endpoint_url)
+        url = f"{endpoint_url}?format=json&query={urllib.parse.quote(query)}"
+        open_kwargs = {
+            "headers": {'Accept': 'application/sparql-results+json'},
+            "timeout": self.endpoints.get(name, {}).get("timeout", 60)
+        }
+
+        try:
+            if self.limiters is None:
+                response = self.transport.open("GET", url, **open_kwargs)
+            else:
+                response = self.limiters.call(name, self.transport.open, "GET", url, **open_kwargs)
+        except Exception as e:
+            print(f"[ERRORE] Query SPARQL fallita: {e}")
+            return
+
+        with response:
+            try:
+                yield from iter_sparql_bindings(response)
+            except (OSError, ValueError) as e:
+                print(f"[ERRORE] Stream SPARQL interrotto: {e}")
+
+    def stream_diseases_uniprot(self, gene_symbols: List[str],
+                                chunk_size: Optional[int] = None) -> Iterator[Tuple[str, str]]:
+        """Produce coppie (gene, malattia) da UniProt in streaming, per chunk di geni"""
+
+        genes = list(dict.fromkeys(gene_symbols))
+        chunk_size = chunk_size or self.endpoints["uniprot"]["batch_size"]
+
+        for chunk in self._chunks(genes, chunk_size):
+            query = f"""
+            PREFIX up: <http://purl.uniprot.org/core/>
+            PREFIX taxon: <http://purl.uniprot.org/taxonomy/>
+            PREFIX skos: <http://www.w3.org/2004/02/skos/core#>
+            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+            SELECT DISTINCT ?geneName ?diseaseText
+            WHERE {{
+              {self._values_block("geneName", chunk)}
+              ?protein a up:Protein ;
+                       up:organism taxon:{self.organism} ;
+                       up:encodedBy ?gene ;
+                       up:annotation ?annotation .
+              ?gene skos:prefLabel ?geneName .
+              ?annotation a up:Disease_Annotation ;
+                          rdfs:comment ?diseaseText .
+            }}
+            """
+
+            for binding in self.iter_sparql(self.endpoints["uniprot"]["url"], query):
+                disease = binding.get("diseaseText", {}).get("value", "")
+                if disease:
+                    yield binding.get("geneName", {}).get("value", ""), disease
+
+    def stream_pathways_wikipathways(self, gene_symbols: List[str],
+                                     chunk_size: Optional[int] = None) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """Produce coppie (gene, pathway) da WikiPathways in streaming, per chunk di geni"""
+
+        genes = list(dict.fromkeys(gene_symbols))
+        chunk_size = chunk_size or self.endpoints["wikipathways"]["batch_size"]
+
+        index = self._wikipathways_offline()
+        if index is not None:
+            for gene in genes:
+                for pathway in index.lookup(gene):
+                    yield gene, pathway
+            return
+
+        for chunk in self._chunks(genes, chunk_size):
+            query = f"""
+            PREFIX wp: <http://vocabularies.wikipathways.org/wp#>
+            PREFIX dc: <http://purl.org/dc/elements/1.1/>
+            PREFIX dcterms: <http://purl.org/dc/terms/>
+            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+            SELECT DISTINCT ?query ?pathway ?title ?identifier
+            WHERE {{
+              {self._values_block("query", chunk)}
+              ?gp a wp:GeneProduct ;
+                  rdfs:label ?label ;
+                  dcterms:isPartOf ?pathway .
+              ?pathway a wp:Pathway ;
+                       dc:title ?title ;
+                       dcterms:identifier ?identifier ;
+                       wp:organismName "Homo sapiens" .
+              FILTER (UCASE(?label) = UCASE(?query))
+            }}
+            """
+
+            for binding in self.iter_sparql(self.endpoints["wikipathways"]["url"], query):
+                yield binding.get("query", {}).get("value", ""), self._parse_pathway_binding(binding)
+
     # =========================================================================
     # AGGREGATION
     # =========================================================================
 
-    def aggregate_gene_data(self, gene_symbol: str) -> Dict[str, Any]:
+    def _source_fetchers(self, sources: Optional[List[str]] = None) -> Dict[str, Any]:
         """
-        Aggrega tutti i dati disponibili per un gene da tutte le fonti.
-        Ritorna un dizionario unificato.
+        Ritorna i metodi da chiamare per ogni fonte (tutte, o solo quelle in sources).
+        Con combined_uniprot le tre fonti UniProt sono servite dalla chiave "uniprot".
+        """
+        uniprot_sources = ("protein_info", "go_terms", "diseases")
+
+        if self.combined_uniprot:
+            fetchers = {"uniprot": self.get_uniprot_combined}
+        else:
+            fetchers = {
+                "protein_info": self.get_protein_info_uniprot,
+                "go_terms": self.get_go_terms_uniprot,
+                "diseases": self.get_diseases_uniprot
+            }
+        fetchers["interactions"] = self.get_interactions_string
+        fetchers["pathways"] = self.get_pathways_wikipathways
+
+        if sources is not None:
+            fetchers = {
+                name: fetch for name, fetch in fetchers.items()
+                if name in sources or (name == "uniprot" and any(s in sources for s in uniprot_sources))
+            }
+
+        return fetchers
+
+    @staticmethod
+    def _split_combined(results: Dict[str, Any]) -> Dict[str, Any]:
+        """Separa il risultato della query UniProt combinata nelle tre fonti"""
+        if "uniprot" in results:
+            results["protein_info"], results["go_terms"], results["diseases"] = results.pop("uniprot")
+        return results
+
+    def source_fetchers(self, sources: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Funzioni fonte -> fetch(gene) per gli scheduler esterni (es. AsyncAggregationEngine),
+        che eseguono le richieste per conto proprio e passano i risultati a build_result.
+        Con combined_uniprot la fonte "uniprot" sostituisce le tre fonti UniProt.
+        """
+        return self._source_fetchers(sources)
+
+    def build_result(self, gene_symbol: str, results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Dizionario unificato (come aggregate_gene_data) dai risultati delle
+        funzioni di source_fetchers, indicizzati per fonte
         """
+        return self._build_aggregated(gene_symbol, self._split_combined(dict(results)))
 
-        print(f"\n[INFO] Aggregando dati per {gene_symbol}...")
+    def _fetch_sources(self, gene_symbol: str, parallel: bool = False,
+                       sources: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Interroga le fonti per un gene (tutte, o solo quelle in sources).
+        In modalità parallela le chiamate sono eseguite su un pool di thread,
+        quindi la latenza complessiva è quella della fonte più lenta.
+        """
+        return self._fetch_sources_tracked(gene_symbol, parallel, sources)[0]
+
+    def _fetch_sources_tracked(self, gene_symbol: str, parallel: bool = False,
+                               sources: Optional[List[str]] = None) -> Tuple[Dict[str, Any], List[str]]:
+        """Come _fetch_sources, ma ritorna anche le fonti le cui richieste sono fallite"""
+        fetchers = self._source_fetchers(sources)
+
+        if not parallel:
+            tracked = {}
+            for name, fetch in fetchers.items():
+                if name in ("protein_info", "uniprot"):
+                    self._log("  -> Interrogando UniProt...")
+                elif name == "interactions":
+                    self._log("  -> Interrogando STRING...")
+                elif name == "pathways":
+                    self._log("  -> Interrogando WikiPathways...")
+                tracked[name] = self._call_tracked(fetch, gene_symbol)
+        else:
+            self._log(f"  -> Interrogando {len(fetchers)} fonti in parallelo...")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    name: executor.submit(self._call_tracked, fetch, gene_symbol)
+                    for name, fetch in fetchers.items()
+                }
+                tracked = {name: future.result() for name, future in futures.items()}
+
+        results = self._split_combined({name: result for name, (result, _) in tracked.items()})
+        failed = [name for name, (_, error) in tracked.items() if error]
+        if "uniprot" in failed:
+            failed.remove("uniprot")
+            failed += ["protein_info", "go_terms", "diseases"]
+        return results, failed
+
+    def _build_aggregated(self, gene_symbol: str, results: Dict[str, Any]) -> Dict[str, Any]:
+        """Costruisce il dizionario unificato dai risultati delle singole fonti"""
 
         aggregated = {
             "gene_symbol": gene_symbol,
@@ -322,8 +1167,7 @@ class SPARQLAggregator:
         }
 
         # UniProt
-        print("  -> Interrogando UniProt...")
-        protein_info = self.get_protein_info_uniprot(gene_symbol)
+        protein_info = results.get("protein_info")
         if protein_info:
             aggregated["uniprot"] = {
                 "id": protein_info.uniprot_id,
@@ -332,18 +1176,17 @@ class SPARQLAggregator:
             aggregated["sources"].append("UniProt")
 
         # GO Terms
-        go_terms = self.get_go_terms_uniprot(gene_symbol)
+        go_terms = results.get("go_terms")
         if go_terms:
             aggregated["go_terms"] = go_terms
 
         # Diseases
-        diseases = self.get_diseases_uniprot(gene_symbol)
+        diseases = results.get("diseases")
         if diseases:
             aggregated["diseases"] = diseases
 
         # STRING interactions
-        print("  -> Interrogando STRING...")
-        interactions = self.get_interactions_string(gene_symbol)
+        interactions = results.get("interactions")
         if interactions:
             aggregated["interactions"] = [
                 {
@@ -356,25 +1199,189 @@ class SPARQLAggregator:
             aggregated["sources"].append("STRING")
 
         # WikiPathways
-        print("  -> Interrogando WikiPathways...")
-        pathways = self.get_pathways_wikipathways(gene_symbol)
+        pathways = results.get("pathways")
         if pathways:
             aggregated["pathways"] = pathways
             aggregated["sources"].append("WikiPathways")
 
-        print(f"[OK] Dati aggregati da {len(aggregated['sources'])} fonti")
+        return aggregated
+
+    def aggregate_gene_data(self, gene_symbol: str, parallel: bool = False) -> Dict[str, Any]:
+        """
+        Aggrega tutti i dati disponibili per un gene da tutte le fonti.
+        Ritorna un dizionario unificato.
+
+        Args:
+            gene_symbol: Simbolo del gene
+            parallel: Se True interroga le fonti in parallelo (max_workers thread)
+        """
+
+        self._log(f"\n[INFO] Aggregando dati per {gene_symbol}...")
+
+        results = self._fetch_sources(gene_symbol, parallel)
+        aggregated = self._build_aggregated(gene_symbol, results)
+
+        self._log(f"[OK] Dati aggregati da {len(aggregated['sources'])} fonti")
 
         return aggregated
 
-    def aggregate_multiple_genes(self, gene_list: List[str]) -> Dict[str, Dict]:
-        """Aggrega dati per multipli geni"""
+    def _aggregate_journaled(self, gene_symbol: str, parallel: bool, journal,
+                             prefetched: Optional[Dict[str, Any]] = None,
+                             prefetch_failed: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Aggrega un gene usando il journal: i geni completi sono ricostruiti dal
+        journal, per gli altri si interrogano solo le fonti mancanti o fallite.
+        prefetched contiene fonti già recuperate (es. UniProt in batch).
+        """
+        pending = journal.pending_sources(gene_symbol)
+        if pending == []:
+            return self._build_aggregated(gene_symbol, journal.results(gene_symbol))
+
+        prefetched = prefetched or {}
+        sources = [s for s in (pending or list(SOURCE_ENDPOINTS)) if s != "uniprot"]
+        to_fetch = [s for s in sources if s not in prefetched]
+
+        results, failed = self._fetch_sources_tracked(gene_symbol, parallel, to_fetch) \
+            if to_fetch else ({}, [])
+        for source in sources:
+            if source in prefetched:
+                results[source] = prefetched[source]
+                if source in (prefetch_failed or []):
+                    failed.append(source)
+
+        journal.record(gene_symbol, results, failed)
+        return self._build_aggregated(gene_symbol, journal.results(gene_symbol))
+
+    def aggregate_multiple_genes(self, gene_list: List[str], parallel: bool = False,
+                                 batched: bool = False,
+                                 chunk_size: Optional[int] = None,
+                                 journal=None) -> Dict[str, Dict]:
+        """
+        Aggrega dati per multipli geni.
+
+        Args:
+            gene_list: Lista di simboli genici
+            parallel: Interroga le fonti di ogni gene in parallelo
+            batched: Recupera i dati UniProt con query VALUES per chunk di geni
+            chunk_size: Geni per query batch (default da config)
+            journal: CheckpointJournal (checkpoint.py) per salvare i risultati
+                     man mano e riprendere un'esecuzione interrotta: i geni
+                     completi non sono reinterrogati, per gli altri si
+                     ripetono solo le fonti fallite
+        """
 
         all_data = {}
+        if not batched:
+            for gene in gene_list:
+                if journal is None:
+                    all_data[gene] = self.aggregate_gene_data(gene, parallel)
+                else:
+                    self._log(f"\n[INFO] Aggregando dati per {gene}...")
+                    all_data[gene] = self._aggregate_journaled(gene, parallel, journal)
+            return all_data
+
+        # Con il journal, UniProt in batch solo per i geni che ne hanno bisogno
+        uniprot_sources = ("protein_info", "go_terms", "diseases")
+        uniprot_genes = gene_list
+        if journal is not None:
+            uniprot_genes = []
+            for gene in gene_list:
+                pending = journal.pending_sources(gene)
+                if pending is None or not set(pending).isdisjoint(uniprot_sources):
+                    uniprot_genes.append(gene)
+        uniprot_set = set(uniprot_genes)
+
+        self._log(f"\n[INFO] Interrogando UniProt in batch per {len(uniprot_genes)} geni...")
+        proteins, proteins_failed = self._call_tracked(self.get_protein_info_uniprot_batch,
+                                                       uniprot_genes, chunk_size)
+        go_terms, go_failed = self._call_tracked(self.get_go_terms_uniprot_batch,
+                                                 uniprot_genes, chunk_size)
+        diseases, diseases_failed = self._call_tracked(self.get_diseases_uniprot_batch,
+                                                       uniprot_genes, chunk_size)
+        # Un errore in una query batch rende incerti i risultati di tutti i geni
+        batch_failed = [source for source, error in zip(uniprot_sources,
+                                                         (proteins_failed, go_failed, diseases_failed))
+                        if error]
+
         for gene in gene_list:
-            all_data[gene] = self.aggregate_gene_data(gene)
+            self._log(f"\n[INFO] Aggregando dati per {gene}...")
+            uniprot_results = {
+                "protein_info": proteins.get(gene),
+                "go_terms": go_terms.get(gene, []),
+                "diseases": diseases.get(gene, [])
+            }
+            if journal is not None:
+                all_data[gene] = self._aggregate_journaled(
+                    gene, parallel, journal,
+                    prefetched=uniprot_results if gene in uniprot_set else None,
+                    prefetch_failed=batch_failed)
+            else:
+                results = self._fetch_sources(gene, parallel, sources=["interactions", "pathways"])
+                results.update(uniprot_results)
+                all_data[gene] = self._build_aggregated(gene, results)
+            self._log(f"[OK] Dati aggregati da {len(all_data[gene]['sources'])} fonti")
 
         return all_data
 
+    def iter_aggregate(self, genes: Iterable[str], parallel: bool = False,
+                       workers: Optional[int] = None, window: Optional[int] = None,
+                       journal=None,
+                       return_exceptions: bool = False) -> Iterator[Tuple[str, Any]]:
+        """
+        Aggrega un flusso di geni e produce (gene, dati) man mano che sono pronti.
+
+        A differenza di aggregate_multiple_genes non accumula i risultati: i
+        geni sono letti da genes solo quando c'è posto nella finestra di
+        richieste in corso, quindi la memoria resta costante anche con un
+        file di tutto il proteoma. L'ordine è quello di completamento.
+
+        Args:
+            genes: Qualsiasi iterabile di simboli (lista, generatore, file aperto:
+                   righe vuote ignorate, spazi rimossi)
+            parallel: Interroga le fonti di ogni gene in parallelo
+            workers: Geni elaborati contemporaneamente (default max_workers)
+            window: Geni al massimo in corso o in attesa (default 2 * workers)
+            journal: CheckpointJournal opzionale (vedi aggregate_multiple_genes)
+            return_exceptions: Se True un gene fallito produce (gene, eccezione)
+                               invece di interrompere l'iterazione
+        """
+        workers = workers or self.max_workers
+        window = max(window or 2 * workers, 1)
+        gene_iter = (gene.strip() for gene in genes if gene.strip())
+
+        def process(gene: str) -> Dict[str, Any]:
+            if journal is None:
+                return self.aggregate_gene_data(gene, parallel)
+            return self._aggregate_journaled(gene, parallel, journal)
+
+        pending = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                while True:
+                    while len(pending) < window:
+                        gene = next(gene_iter, None)
+                        if gene is None:
+                            break
+                        pending[executor.submit(process, gene)] = gene
+
+                    if not pending:
+                        break
+
+                    completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        gene = pending.pop(future)
+                        try:
+                            data = future.result()
+                        except Exception as e:
+                            if not return_exceptions:
+                                raise
+                            data = e
+                        yield gene, data
+            finally:
+                # Consumatore interrotto (break/eccezione): niente nuovi geni
+                for future in pending:
+                    future.cancel()
+
 
 # =============================================================================
 # TEST
@@ -0,0 +1,139 @@
+"""
+SPARQL Formats Module
+Decodifica dei risultati SPARQL in formato TSV/CSV nella stessa struttura
+del formato JSON (head/vars + results/bindings)
+"""
+
+import csv
+import io
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+
+# Media type richiesti per ciascun formato di risultato
+MEDIA_TYPES = {
+    "json": "application/sparql-results+json",
+    "tsv": "text/tab-separated-values",
+    "csv": "text/csv"
+}
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+_ESCAPE = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)')
+_ESCAPES = {"t": "\t", "n": "\n", "r": "\r", "b": "\b", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+_INTEGER = re.compile(r'^[+-]?\d+$')
+_DECIMAL = re.compile(r'^[+-]?\d*\.\d+$')
+_DOUBLE = re.compile(r'^[+-]?(\d+\.?\d*|\.\d+)[eE][+-]?\d+$')
+_IRI_SCHEME = re.compile(r'^[A-Za-z][A-Za-z0-9+.-]*:')
+
+
+def _unescape(match: "re.Match") -> str:
+    code = match.group(1)
+    if code[0] in "uU" and len(code) > 1:
+        return chr(int(code[1:], 16))
+    return _ESCAPES.get(code, code)
+
+
+def unescape_literal(value: str) -> str:
+    """Risolve le sequenze di escape di un letterale Turtle/N-Triples"""
+    if "\\" not in value:
+        return value
+    return _ESCAPE.sub(_unescape, value)
+
+
+def _tsv_term(field: str) -> Optional[Dict[str, str]]:
+    """Converte un termine RDF in sintassi Turtle (cella TSV) in un binding JSON"""
+    if not field:
+        return None
+
+    first = field[0]
+    if first == "<":
+        return {"type": "uri", "value": field[1:-1]}
+
+    if first == '"':
+        end = field.rfind('"')
+        value = unescape_literal(field[1:end])
+        term = {"type": "literal", "value": value}
+        suffix = field[end + 1:]
+        if suffix.startswith("@"):
+            term["xml:lang"] = suffix[1:]
+        elif suffix.startswith("^^"):
+            term["datatype"] = suffix[3:-1]
+        return term
+
+    if field.startswith("_:"):
+        return {"type": "bnode", "value": field[2:]}
+
+    # Letterali abbreviati (numeri e booleani)
+    if _INTEGER.match(field):
+        datatype = XSD + "integer"
+    elif _DECIMAL.match(field):
+        datatype = XSD + "decimal"
+    elif _DOUBLE.match(field):
+        datatype = XSD + "double"
+    elif field in ("true", "false"):
+        datatype = XSD + "boolean"
+    else:
+        return {"type": "literal", "value": field}
+    return {"type": "literal", "value": field, "datatype": datatype}
+
+
+def parse_sparql_tsv(text: str) -> Dict[str, Any]:
+    """Decodifica un risultato SPARQL TSV (text/tab-separated-values)"""
+
+    lines = text.split("\n")
+    variables = [v.strip().lstrip("?$") for v in lines[0].rstrip("\r").split("\t")] if lines else []
+    bindings: List[Dict[str, Dict[str, str]]] = []
+
+    for line in lines[1:]:
+        if line.endswith("\r"):
+            line = line[:-1]
+        if not line:
+            continue
+        binding = {}
+        for var, field in zip(variables, line.split("\t")):
+            term = _tsv_term(field)
+            if term is not None:
+                binding[var] = term
+        bindings.append(binding)
+
+    return {"head": {"vars": variables}, "results": {"bindings": bindings}}
+
+
+def parse_sparql_csv(text: str) -> Dict[str, Any]:
+    """
+    Decodifica un risultato SPARQL CSV (text/csv).
+    Il formato CSV non conserva il tipo dei termini: gli IRI sono riconosciuti
+    dallo schema, tutto il resto è un letterale.
+    """
+
+    rows = csv.reader(io.StringIO(text, newline=""))
+    variables = next(rows, [])
+    bindings: List[Dict[str, Dict[str, str]]] = []
+
+    for row in rows:
+        if not row:
+            continue
+        binding = {}
+        for var, value in zip(variables, row):
+            if not value:
+                continue
+            if value.startswith("_:"):
+                binding[var] = {"type": "bnode", "value": value[2:]}
+            elif _IRI_SCHEME.match(value) and " " not in value:
+                binding[var] = {"type": "uri", "value": value}
+            else:
+                binding[var] = {"type": "literal", "value": value}
+        bindings.append(binding)
+
+    return {"head": {"vars": variables}, "results": {"bindings": bindings}}
+
+
+def parse_sparql_results(body: str, result_format: str) -> Dict[str, Any]:
+    """Decodifica un risultato SPARQL nel formato indicato ("json", "tsv", "csv")"""
+    if result_format == "tsv":
+        return parse_sparql_tsv(body)
+    if result_format == "csv":
+        return parse_sparql_csv(body)
+    return json.loads(body)
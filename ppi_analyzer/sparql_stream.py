@@ -0,0 +1,120 @@
+"""
+SPARQL Stream Module
+Parser incrementale dei risultati SPARQL JSON con memoria limitata
+"""
+
+import codecs
+import json
+from typing import Any, BinaryIO, Dict, Iterator
+
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class _StreamReader:
+    """Buffer testuale alimentato a blocchi da uno stream binario"""
+
+    def __init__(self, stream: BinaryIO, chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Legge un altro blocco; ritorna False a fine stream"""
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            self.buffer += self.decoder.decode(b"", final=True)
+            return False
+        if self.pos > self.chunk_size:
+            # Scarta la parte già consumata: la memoria resta limitata
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += self.decoder.decode(chunk)
+        return True
+
+    def peek(self) -> str:
+        """Primo carattere non di spaziatura (stringa vuota a fine stream)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Risultato SPARQL JSON non valido: atteso '{char}', trovato '{found}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decodifica il prossimo valore JSON completo"""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # Un numero al bordo del buffer potrebbe continuare nel blocco successivo
+            if end == len(self.buffer) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def members(self) -> Iterator[str]:
+        """Itera sulle chiavi di un oggetto JSON (il valore va consumato dal chiamante)"""
+        self.expect("{")
+        while True:
+            char = self.peek()
+            if char == "}":
+                self.pos += 1
+                return
+            if char == ",":
+                self.pos += 1
+                continue
+            key = self.value()
+            self.expect(":")
+            yield key
+
+
+def iter_sparql_bindings(stream: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[Dict[str, Any]]:
+    """
+    Produce i binding di un risultato SPARQL JSON uno alla volta, man mano
+    che i byte arrivano dallo stream. Solo il binding corrente e un blocco
+    di input restano in memoria, indipendentemente dalla dimensione del risultato.
+    """
+    reader = _StreamReader(stream, chunk_size)
+
+    for key in reader.members():
+        if key != "results":
+            reader.value()  # "head", "boolean", ... : piccoli, si saltano
+            continue
+
+        for results_key in reader.members():
+            if results_key != "bindings":
+                reader.value()
+                continue
+
+            reader.expect("[")
+            while True:
+                char = reader.peek()
+                if char == "]":
+                    reader.pos += 1
+                    break
+                if char == ",":
+                    reader.pos += 1
+                    continue
+                if not char:
+                    raise ValueError("Risultato SPARQL JSON troncato")
+                yield reader.value()
+
@@ -0,0 +1,299 @@
+"""
+STRING Index Module
+Indice binario locale (CSR, memory-mapped) dei link STRING costruito dal file
+protein.links.detailed, per interrogare le interazioni senza API REST
+"""
+
+import array
+import gzip
+import json
+import mmap
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+DEFAULT_INDEX_PATH = "string_index"
+# Soglia applicata da STRING REST quando required_score non è specificato
+DEFAULT_REQUIRED_SCORE = 400
+
+# Canali salvati nell'indice: nome nel JSON di STRING REST -> colonna di protein.links.detailed
+CHANNELS = {
+    "score": "combined_score",
+    "escore": "experimental",
+    "dscore": "database",
+    "tscore": "textmining",
+    "ascore": "coexpression"
+}
+
+INDEX_VERSION = 1
+
+
+def _open_text(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def _iter_links(path: str) -> Iterator[Tuple[str, str, List[int]]]:
+    """Righe (protein1, protein2, [canali]) di protein.links.detailed"""
+    with _open_text(path) as f:
+        header = f.readline().split()
+        try:
+            columns = [header.index(column) for column in CHANNELS.values()]
+        except ValueError:
+            raise ValueError(f"{path}: intestazione protein.links.detailed non riconosciuta")
+        for line in f:
+            fields = line.split()
+            if len(fields) == len(header):
+                yield fields[0], fields[1], [int(fields[c]) for c in columns]
+
+
+def _read_protein_names(path: str) -> Dict[str, str]:
+    """STRING ID -> preferred_name da protein.info"""
+    names = {}
+    with _open_text(path) as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) >= 2:
+                names[fields[0]] = fields[1]
+    return names
+
+
+def build_index(links_path: str, index_path: str = DEFAULT_INDEX_PATH,
+                info_path: Optional[str] = None) -> Dict[str, object]:
+    """
+    Costruisce l'indice CSR in una directory.
+
+    Le proteine sono codificate come interi (ordine degli STRING ID); per
+    ogni proteina le righe sono ordinate per combined score decrescente,
+    così required_score e limit diventano un taglio del prefisso della riga.
+
+    File prodotti: proteins.tsv (id, nome), offsets.bin (uint64, n+1),
+    dst.bin (uint32) e un file uint16 per canale (score, escore, ...).
+
+    Args:
+        links_path: File protein.links.detailed (anche .gz)
+        index_path: Directory di destinazione
+        info_path: File protein.info per i preferred name (opzionale)
+
+    Returns:
+        Metadati dell'indice (scritti anche in meta.json)
+    """
+
+    # Primo passaggio: vocabolario delle proteine e grado di ciascuna
+    degree: Dict[str, int] = {}
+    for protein1, protein2, _ in _iter_links(links_path):
+        degree[protein1] = degree.get(protein1, 0) + 1
+        degree.setdefault(protein2, 0)
+
+    proteins = sorted(degree)
+    ids = {protein: i for i, protein in enumerate(proteins)}
+    offsets = array.array("Q", [0]) * (len(proteins) + 1)
+    for i, protein in enumerate(proteins):
+        offsets[i + 1] = offsets[i] + degree[protein]
+    n_edges = offsets[-1]
+    del degree
+
+    # Secondo passaggio: collocazione degli archi nella riga della sorgente
+    dst = array.array("I", bytes(4 * n_edges))
+    channels = {name: array.array("H", bytes(2 * n_edges)) for name in CHANNELS}
+    columns = [channels[name] for name in CHANNELS]
+    cursor = offsets[:-1]
+    for protein1, protein2, values in _iter_links(links_path):
+        src = ids[protein1]
+        pos = cursor[src]
+        cursor[src] = pos + 1
+        dst[pos] = ids[protein2]
+        for column, value in zip(columns, values):
+            column[pos] = value
+    del cursor
+
+    # Ordinamento di ogni riga per score decrescente (a parità, per id)
+    score = channels["score"]
+    for i in range(len(proteins)):
+        lo, hi = offsets[i], offsets[i + 1]
+        if hi - lo < 2:
+            continue
+        order = sorted(range(lo, hi), key=lambda p: (-score[p], dst[p]))
+        dst[lo:hi] = array.array("I", [dst[p] for p in order])
+        for column in columns:
+            column[lo:hi] = array.array("H", [column[p] for p in order])
+
+    names = _read_protein_names(info_path) if info_path else {}
+
+    os.makedirs(index_path, exist_ok=True)
+    with open(os.path.join(index_path, "proteins.tsv"), "w", encoding="utf-8") as f:
+        for protein in proteins:
+            f.write(f"{protein}\t{names.get(protein, protein.partition('.')[2] or protein)}\n")
+    for filename, data in [("offsets.bin", offsets), ("dst.bin", dst)] + \
+            [(f"{name}.bin", column) for name, column in channels.items()]:
+        with open(os.path.join(index_path, filename), "wb") as f:
+            data.tofile(f)
+
+    meta = {
+        "version": INDEX_VERSION,
+        "byteorder": sys.byteorder,
+        "species": proteins[0].partition(".")[0] if proteins else "",
+        "proteins": len(proteins),
+        "edges": n_edges,
+        "channels": list(CHANNELS),
+        "source": os.path.abspath(links_path),
+        "built": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    with open(os.path.join(index_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+class StringLinksIndex:
+    """
+    Indice STRING in sola lettura, memory-mapped.
+
+    I file binari non vengono copiati in memoria: più processi che aprono lo
+    stesso indice condividono le pagine della page cache del sistema.
+    Le risposte hanno lo stesso formato JSON delle API REST di STRING
+    (con i canali score, escore, dscore, tscore, ascore).
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"{path}: versione indice non supportata")
+        if self.meta.get("byteorder") != sys.byteorder:
+            raise ValueError(f"{path}: indice costruito con byte order {self.meta.get('byteorder')}")
+        self.species = self.meta.get("species", "")
+
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self._lookup: Dict[str, int] = {}
+        with open(os.path.join(path, "proteins.tsv"), encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                string_id, name = line.rstrip("\n").split("\t")
+                self.ids.append(string_id)
+                self.names.append(name)
+                self._lookup[string_id] = i
+                self._lookup.setdefault(name.upper(), i)
+
+        self._maps = []
+        self.offsets = self._map("offsets.bin", "Q")
+        self.dst = self._map("dst.bin", "I")
+        self.channels = {name: self._map(f"{name}.bin", "H") for name in self.meta["channels"]}
+        self.score = self.channels["score"]
+
+    def _map(self, filename: str, typecode: str) -> memoryview:
+        with open(os.path.join(self.path, filename), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(array.array(typecode))
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        base = memoryview(mapped)
+        view = base.cast(typecode)
+        self._maps.append((view, base, mapped))
+        return view
+
+    def resolve(self, identifier: str) -> Optional[int]:
+        """Indice interno di una proteina (STRING ID o preferred name, senza distinzione di maiuscole)"""
+        index = self._lookup.get(identifier)
+        if index is None:
+            index = self._lookup.get(identifier.upper())
+        return index
+
+    def _cut(self, lo: int, hi: int, required_score: int) -> int:
+        """Fine della riga [lo, hi) con score >= required_score (righe ordinate per score decrescente)"""
+        score = self.score
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if score[mid] >= required_score:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _row(self, src: int, pos: int) -> Dict:
+        dst = self.dst[pos]
+        row = {
+            "stringId_A": self.ids[src],
+            "stringId_B": self.ids[dst],
+            "preferredName_A": self.names[src],
+            "preferredName_B": self.names[dst],
+            "ncbiTaxonId": int(self.species) if self.species.isdigit() else self.species
+        }
+        for name, column in self.channels.items():
+            row[name] = column[pos] / 1000
+        return row
+
+    def _partner_positions(self, src: int, required_score: int, limit: Optional[int]) -> range:
+        lo, hi = self.offsets[src], self.offsets[src + 1]
+        hi = self._cut(lo, hi, required_score)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return range(lo, hi)
+
+    def partners(self, identifier: str, required_score: int = DEFAULT_REQUIRED_SCORE,
+                 limit: Optional[int] = None) -> List[Dict]:
+        """
+        Equivalente di STRING REST interaction_partners: i partner della
+        proteina con score >= required_score (0-1000), i migliori limit.
+        """
+        src = self.resolve(identifier)
+        if src is None:
+            return []
+        return [self._row(src, pos) for pos in self._partner_positions(src, required_score, limit)]
+
+    def network(self, identifier: str, required_score: int = DEFAULT_REQUIRED_SCORE,
+                limit: Optional[int] = None) -> List[Dict]:
+        """
+        Equivalente di STRING REST network per una proteina: la proteina,
+        i suoi migliori limit partner e tutti gli archi tra questi nodi con
+        score >= required_score (ogni coppia una sola volta).
+        """
+        src = self.resolve(identifier)
+        if src is None:
+            return []
+
+        positions = self._partner_positions(src, required_score, limit)
+        rows = [self._row(src, pos) for pos in positions]
+        nodes = {self.dst[pos] for pos in positions}
+
+        for node in sorted(nodes):
+            lo, hi = self.offsets[node], self.offsets[node + 1]
+            for pos in range(lo, self._cut(lo, hi, required_score)):
+                other = self.dst[pos]
+                if other > node and other in nodes:
+                    rows.append(self._row(node, pos))
+        return rows
+
+    def close(self):
+        self.offsets = self.dst = self.score = None
+        self.channels = {}
+        for view, base, mapped in self._maps:
+            try:
+                view.release()
+                base.release()
+                mapped.close()
+            except BufferError:
+                pass  # viste ancora referenziate altrove: chiusura alla garbage collection
+        self._maps = []
+
+
+# =============================================================================
+# COSTRUZIONE DA RIGA DI COMANDO
+# =============================================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Costruisce l'indice locale STRING da protein.links.detailed")
+    parser.add_argument("links", help="File protein.links.detailed (anche .gz)")
+    parser.add_argument("--info", help="File protein.info per i nomi dei geni")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Directory dell'indice")
+    args = parser.parse_args()
+
+    start = time.time()
+    meta = build_index(args.links, args.index, args.info)
+    print(f"[OK] {meta['proteins']} proteine, {meta['edges']} archi in {time.time() - start:.1f}s -> {args.index}")
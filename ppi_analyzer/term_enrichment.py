@@ -0,0 +1,396 @@
+"""
+Term Enrichment Module
+Analisi di sovrarappresentazione (ORA) di GO term e pathway WikiPathways in
+insiemi di geni: test ipergeometrico e correzione FDR di Benjamini-Hochberg
+"""
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from operator import attrgetter
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+from config import DEFAULT_ENRICHMENT_MIN_TERM_SIZE, DEFAULT_ENRICHMENT_MAX_TERM_SIZE
+
+
+# Categorie di termini: nome -> (chiave nei dati aggregati, campo etichetta)
+CATEGORIES = {
+    "GO": ("go_terms", "label"),
+    "WikiPathways": ("pathways", "title")
+}
+
+
+@dataclass
+class TermResult:
+    """Risultato del test di un termine su un insieme di geni"""
+    term_id: str
+    label: str
+    category: str
+    overlap: int           # Geni dell'insieme annotati al termine (k)
+    term_size: int         # Geni del background annotati al termine (K)
+    set_size: int          # Geni dell'insieme nel background (n)
+    background_size: int   # Geni del background (N)
+    p_value: float
+    fdr: float = 1.0
+    genes: List[str] = field(default_factory=list)
+
+    @property
+    def expected(self) -> float:
+        return self.set_size * self.term_size / self.background_size if self.background_size else 0.0
+
+    @property
+    def fold_enrichment(self) -> float:
+        return self.overlap / self.expected if self.expected else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "term_id": self.term_id,
+            "label": self.label,
+            "category": self.category,
+            "overlap": self.overlap,
+            "term_size": self.term_size,
+            "set_size": self.set_size,
+            "background_size": self.background_size,
+            "expected": round(self.expected, 4),
+            "fold_enrichment": round(self.fold_enrichment, 4),
+            "p_value": self.p_value,
+            "fdr": self.fdr,
+            "genes": self.genes
+        }
+
+
+def benjamini_hochberg(p_values: List[float], total: Optional[int] = None) -> List[float]:
+    """
+    q-value di Benjamini-Hochberg (stesso ordine di p_values). total è il
+    numero complessivo di test se p_values ne contiene solo una parte: i
+    test mancanti valgono p = 1 e occupano gli ultimi ranghi.
+    """
+    m = total if total is not None else len(p_values)
+    order = sorted(range(len(p_values)), key=p_values.__getitem__)
+    q_values = [1.0] * len(p_values)
+    running = 1.0
+    for rank in range(len(p_values), 0, -1):
+        i = order[rank - 1]
+        running = min(running, p_values[i] * m / rank)
+        q_values[i] = min(running, 1.0)
+    return q_values
+
+
+class Hypergeometric:
+    """
+    Code superiori ipergeometriche P(X >= k) con tabella dei log-fattoriali
+    precalcolata fino a N e cache dei risultati per (k, K, n): con molti
+    termini e insiemi gli stessi parametri ricorrono spesso.
+    """
+
+    def __init__(self, population: int):
+        self.population = population
+        self.log_factorial = [0.0] * (population + 1)
+        for i in range(2, population + 1):
+            self.log_factorial[i] = self.log_factorial[i - 1] + math.log(i)
+        self._cache: Dict[Tuple[int, int, int], float] = {}
+
+    def _log_choose(self, n: int, k: int) -> float:
+        lf = self.log_factorial
+        return lf[n] - lf[k] - lf[n - k]
+
+    def sf(self, k: int, successes: int, draws: int) -> float:
+        """
+        P(X >= k) con X ipergeometrica: draws estrazioni da una popolazione
+        di N elementi di cui successes "positivi"
+        """
+        key = (k, successes, draws)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        N, K, n = self.population, successes, draws
+        upper = min(K, n)
+        lower = max(0, n - (N - K))
+        if k <= lower:
+            p = 1.0
+        elif k > upper:
+            p = 0.0
+        else:
+            # Primo termine dalla tabella, i successivi per ricorrenza sul rapporto
+            term = math.exp(self._log_choose(K, k) + self._log_choose(N - K, n - k)
+                            - self._log_choose(N, n))
+            p = 0.0
+            for i in range(k, upper + 1):
+                p += term
+                if term < p * 1e-17:
+                    break
+                term *= (K - i) * (n - i) / ((i + 1) * (N - K - n + i + 1))
+            p = min(p, 1.0)
+
+        self._cache[key] = p
+        return p
+
+
+class TermIncidence:
+    """
+    Matrice di incidenza sparsa geni x termini, per righe: per ogni gene la
+    lista dei termini annotati. La sovrapposizione tra un insieme di geni e
+    tutti i termini è il prodotto sparso riga per riga: si visitano solo le
+    annotazioni dei geni dell'insieme, e i termini mai toccati hanno p = 1
+    senza essere calcolati.
+
+    Uso:
+        incidence = TermIncidence.from_aggregated(all_data)
+        results = incidence.enrich(["EYS", "CRB1", "USH2A"])
+    """
+
+    def __init__(self):
+        self.genes: List[str] = []
+        self.gene_ids: Dict[str, int] = {}
+        self.terms: List[Tuple[str, str]] = []       # (categoria, id)
+        self.term_ids: Dict[Tuple[str, str], int] = {}
+        self.labels: List[str] = []
+        self.gene_terms: List[List[int]] = []        # Righe: termini per gene
+        self.term_sizes: List[int] = []              # Geni annotati per termine
+
+    def _gene(self, gene: str) -> int:
+        key = gene.upper()
+        index = self.gene_ids.get(key)
+        if index is None:
+            index = len(self.genes)
+            self.gene_ids[key] = index
+            self.genes.append(key)
+            self.gene_terms.append([])
+        return index
+
+    def add(self, gene: str, category: str, term_id: str, label: str = ""):
+        """Annota gene con un termine"""
+        if not term_id:
+            return
+        gene_id = self._gene(gene)
+        key = (category, term_id)
+        index = self.term_ids.get(key)
+        if index is None:
+            index = len(self.terms)
+            self.term_ids[key] = index
+            self.terms.append(key)
+            self.labels.append(label)
+            self.term_sizes.append(0)
+        elif label and not self.labels[index]:
+            self.labels[index] = label
+        terms = self.gene_terms[gene_id]
+        if index not in terms:
+            terms.append(index)
+            self.term_sizes[index] += 1
+
+    def add_aggregated(self, gene: str, data: Mapping):
+        """Aggiunge le annotazioni di un gene (formato di aggregate_gene_data o Snapshot.view)"""
+        self._gene(gene)
+        for category, (key, label_field) in CATEGORIES.items():
+            for item in data.get(key, []):
+                self.add(gene, category, item.get("id", ""), item.get(label_field, ""))
+
+    @classmethod
+    def from_aggregated(cls, all_data: Mapping[str, Mapping]) -> "TermIncidence":
+        """Costruisce l'incidenza dall'output di aggregate_multiple_genes"""
+        incidence = cls()
+        for gene, data in all_data.items():
+            incidence.add_aggregated(gene, data)
+        return incidence
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "TermIncidence":
+        """Costruisce l'incidenza da uno snapshot colonnare (snapshot.Snapshot)"""
+        incidence = cls()
+        for gene in snapshot.genes():
+            incidence.add_aggregated(gene, snapshot.view(gene))
+        return incidence
+
+    def _gene_rows(self, genes: Iterable[str]) -> List[int]:
+        """Righe dei geni noti (i simboli sconosciuti sono ignorati)"""
+        return [i for i in (self.gene_ids.get(g) for g in genes) if i is not None]
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    # -------------------------------------------------------------------------
+    # Test di sovrarappresentazione
+    # -------------------------------------------------------------------------
+
+    def enrich(self, genes: Iterable[str], background: Optional[Iterable[str]] = None,
+               categories: Optional[Iterable[str]] = None,
+               min_term_size: int = DEFAULT_ENRICHMENT_MIN_TERM_SIZE,
+               max_term_size: int = DEFAULT_ENRICHMENT_MAX_TERM_SIZE,
+               min_overlap: int = 1, max_fdr: Optional[float] = None) -> List[TermResult]:
+        """
+        Test ipergeometrico (equivalente al Fisher esatto a una coda) per
+        ogni termine, con FDR di Benjamini-Hochberg calcolata separatamente
+        per categoria (GO, WikiPathways).
+
+        Args:
+            genes: Insieme di geni da testare
+            background: Universo dei geni (default: tutti i geni dell'incidenza).
+                        I geni del background senza annotazioni contano in N
+            categories: Categorie da testare (default: tutte)
+            min_term_size / max_term_size: Termini con K fuori intervallo non
+                        sono testati (né contati nella correzione)
+            min_overlap: Termini con meno geni in comune non sono riportati
+                        (ma sono contati nella correzione)
+            max_fdr: Se indicato, solo i termini con FDR <= max_fdr
+
+        Returns:
+            Risultati ordinati per p-value
+        """
+        return self.enrich_many({"": genes}, background, categories,
+                                min_term_size, max_term_size, min_overlap, max_fdr)[""]
+
+    def enrich_many(self, gene_sets: Mapping[str, Iterable[str]],
+                    background: Optional[Iterable[str]] = None,
+                    categories: Optional[Iterable[str]] = None,
+                    min_term_size: int = DEFAULT_ENRICHMENT_MIN_TERM_SIZE,
+                    max_term_size: int = DEFAULT_ENRICHMENT_MAX_TERM_SIZE,
+                    min_overlap: int = 1,
+                    max_fdr: Optional[float] = None) -> Dict[str, List[TermResult]]:
+        """
+        Come enrich per molti insiemi di geni (nome -> geni): incidenza,
+        tabella dei log-fattoriali e code ipergeometriche sono condivise.
+        """
+        categories = set(categories) if categories is not None else set(CATEGORIES)
+
+        if background is None:
+            background_genes = set(self.genes)
+            sizes = self.term_sizes
+        else:
+            background_genes = {g.upper() for g in background}
+            sizes = [0] * len(self.terms)
+            for row in self._gene_rows(background_genes):
+                for term in self.gene_terms[row]:
+                    sizes[term] += 1
+        background_size = len(background_genes)
+
+        # Termini testabili: categoria richiesta e dimensione nel background nei limiti
+        tested = [
+            self.terms[term][0] in categories and min_term_size <= size <= max_term_size
+            for term, size in enumerate(sizes)
+        ]
+        tested_per_category: Dict[str, int] = {}
+        for term, ok in enumerate(tested):
+            if ok:
+                category = self.terms[term][0]
+                tested_per_category[category] = tested_per_category.get(category, 0) + 1
+
+        hypergeometric = Hypergeometric(background_size)
+        results: Dict[str, List[TermResult]] = {}
+        # Righe ridotte ai termini testati, calcolate al primo uso di ogni gene
+        tested_rows: Dict[int, List[int]] = {}
+
+        for name, genes in gene_sets.items():
+            members = {g.upper() for g in genes} & background_genes
+            set_size = len(members)
+
+            # Prodotto sparso: geni dell'insieme per ogni termine toccato
+            hits: Dict[int, List[str]] = defaultdict(list)
+            for row in self._gene_rows(sorted(members)):
+                terms = tested_rows.get(row)
+                if terms is None:
+                    terms = tested_rows[row] = [t for t in self.gene_terms[row] if tested[t]]
+                gene = self.genes[row]
+                for term in terms:
+                    hits[term].append(gene)
+
+            # p-value per categoria su liste semplici; i TermResult sono creati
+            # solo per i termini riportati
+            by_category: Dict[str, Tuple[List[int], List[float]]] = {}
+            sf = hypergeometric.sf
+            for term, overlap_genes in hits.items():
+                terms, p_values = by_category.setdefault(self.terms[term][0], ([], []))
+                terms.append(term)
+                p_values.append(sf(len(overlap_genes), sizes[term], set_size))
+
+            # BH per categoria su tutti i termini testati (quelli non toccati hanno p = 1)
+            set_results = []
+            for category, (terms, p_values) in by_category.items():
+                q_values = benjamini_hochberg(p_values, tested_per_category[category])
+                for term, p, q in zip(terms, p_values, q_values):
+                    overlap_genes = hits[term]
+                    if len(overlap_genes) < min_overlap or (max_fdr is not None and q > max_fdr):
+                        continue
+                    set_results.append(TermResult(
+                        term_id=self.terms[term][1],
+                        label=self.labels[term],
+                        category=category,
+                        overlap=len(overlap_genes),
+                        term_size=sizes[term],
+                        set_size=set_size,
+                        background_size=background_size,
+                        p_value=p,
+                        fdr=q,
+                        genes=overlap_genes
+                    ))
+
+            # Ordinamento stabile: a parità di p-value resta l'ordine di annotazione
+            set_results.sort(key=attrgetter("p_value"))
+            results[name] = set_results
+
+        return results
+
+
+# =============================================================================
+# ANALISI DA RIGA DI COMANDO
+# =============================================================================
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import sys
+    import time
+    from snapshot import Snapshot
+
+    parser = argparse.ArgumentParser(description="Sovrarappresentazione di GO term e pathway in insiemi di geni")
+    parser.add_argument("snapshot", help="Snapshot colonnare dei dati aggregati (main.py --snapshot)")
+    parser.add_argument("--genes", help="Geni dell'insieme, separati da virgola")
+    parser.add_argument("--sets", help="TSV degli insiemi: nome<TAB>geni separati da virgola")
+    parser.add_argument("--background", help="File con i geni del background (uno per riga)")
+    parser.add_argument("--category", choices=list(CATEGORIES), action="append",
+                        help="Categorie da testare (default: tutte)")
+    parser.add_argument("--fdr", type=float, default=0.05, help="Soglia FDR dei risultati mostrati")
+    parser.add_argument("--min-size", type=int, default=DEFAULT_ENRICHMENT_MIN_TERM_SIZE)
+    parser.add_argument("--max-size", type=int, default=DEFAULT_ENRICHMENT_MAX_TERM_SIZE)
+    parser.add_argument("--output", "-o", help="File NDJSON con tutti i risultati (un termine per riga)")
+    args = parser.parse_args()
+
+    gene_sets: Dict[str, List[str]] = {}
+    if args.genes:
+        gene_sets["genes"] = [g.strip() for g in args.genes.split(",") if g.strip()]
+    if args.sets:
+        with open(args.sets, encoding="utf-8") as f:
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) >= 2 and not line.startswith("#"):
+                    gene_sets[fields[0]] = [g.strip() for g in fields[1].split(",") if g.strip()]
+    if not gene_sets:
+        parser.error("specificare --genes o --sets")
+
+    background = None
+    if args.background:
+        with open(args.background, encoding="utf-8") as f:
+            background = [line.split()[0] for line in f if line.strip() and not line.startswith("#")]
+
+    snapshot = Snapshot(args.snapshot)
+    incidence = TermIncidence.from_snapshot(snapshot)
+    snapshot.close()
+
+    start = time.time()
+    # Senza --output servono solo i termini significativi
+    results = incidence.enrich_many(gene_sets, background, args.category, args.min_size, args.max_size,
+                                    max_fdr=None if args.output else args.fdr)
+    print(f"[OK] {len(incidence)} termini, {len(gene_sets)} insiemi in {time.time() - start:.2f}s",
+          file=sys.stderr)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+    for name, items in results.items():
+        significant = [item for item in items if item.fdr <= args.fdr]
+        print(f"\n{name}: {len(significant)} termini con FDR <= {args.fdr}")
+        for item in significant[:20]:
+            print(f"  {item.category:<12} {item.term_id:<14} k={item.overlap:<4} K={item.term_size:<5} "
+                  f"p={item.p_value:.2e} FDR={item.fdr:.2e}  {item.label[:50]}")
+        if out:
+            for item in items:
+                out.write(json.dumps({"set": name, **item.to_dict()}, ensure_ascii=False) + "\n")
+    if out:
+        out.close()
@@ -0,0 +1,483 @@
+"""
+WikiPathways Index Module
+Indice locale (SQLite) dei pathway WikiPathways costruito da un dump RDF
+(Turtle / N-Triples) o GPML, per interrogazioni offline senza endpoint SPARQL
+"""
+
+import gzip
+import os
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+import xml.etree.ElementTree as ET
+import zipfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sparql_formats import unescape_literal
+
+
+DEFAULT_INDEX_PATH = "wikipathways_index.sqlite"
+DEFAULT_ORGANISM_NAME = "Homo sapiens"
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+RDFS_LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+DC_TITLE = "http://purl.org/dc/elements/1.1/title"
+DCTERMS_IDENTIFIER = "http://purl.org/dc/terms/identifier"
+DCTERMS_IS_PART_OF = "http://purl.org/dc/terms/isPartOf"
+WP = "http://vocabularies.wikipathways.org/wp#"
+WP_GENE_PRODUCT = WP + "GeneProduct"
+WP_PATHWAY = WP + "Pathway"
+WP_ORGANISM_NAME = WP + "organismName"
+
+# Predicati usati dalla query di get_pathways_wikipathways: il resto del dump si scarta
+_PREDICATES = {RDF_TYPE, RDFS_LABEL, DC_TITLE, DCTERMS_IDENTIFIER,
+               DCTERMS_IS_PART_OF, WP_ORGANISM_NAME}
+
+# Tipi di DataNode GPML corrispondenti a wp:GeneProduct (e sottoclassi)
+_GPML_GENE_TYPES = {"GeneProduct", "Protein", "Rna"}
+_GPML_FILE = re.compile(r'(WP\d+)(?:_(\d+))?\.gpml$', re.IGNORECASE)
+_WP_ID = re.compile(r'WP\d+')
+
+
+# =============================================================================
+# PARSER TURTLE / N-TRIPLES
+# =============================================================================
+
+class Literal(str):
+    """Letterale RDF (distinto dagli IRI, che sono semplici str)"""
+
+
+_TOKEN = re.compile(r'''
+    (?P<ws>\s+|\#[^\n]*)
+  | (?P<iri><[^<>"{}|^`\\\s]*>)
+  | (?P<long>"""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^'\\]|\\.|'(?!''))*\'\'\')
+  | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<lang>@[A-Za-z]+(?:-[A-Za-z0-9]+)*)
+  | (?P<dtype>\^\^)
+  | (?P<bnode>_:[\w.-]*[\w-])
+  | (?P<number>[+-]?(?:\d+\.\d+|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+  | (?P<pname>(?:[A-Za-z][\w.-]*)?:(?:(?:[\w:%-]|\\.)(?:(?:[\w:%.-]|\\.)*(?:[\w:%-]|\\.))?)?)
+  | (?P<name>[A-Za-z]+)
+  | (?P<punct>[.;,\[\]()])
+''', re.VERBOSE)
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise ValueError(f"Turtle non valido alla posizione {pos}: {text[pos:pos + 30]!r}")
+        kind = match.lastgroup
+        if kind != "ws":
+            tokens.append((kind, match.group(kind)))
+        pos = match.end()
+    return tokens
+
+
+class _TurtleParser:
+    """
+    Parser Turtle minimale (sottoinsieme usato dai dump WikiPathways):
+    prefissi, liste con ';' e ',', 'a', letterali con lingua/datatype,
+    nodi blank '[...]' e collezioni '(...)'. N-Triples è un sottoinsieme.
+    """
+
+    def __init__(self, prefixes: Optional[Dict[str, str]] = None, base: str = ""):
+        self.prefixes = prefixes if prefixes is not None else {}
+        self.base = base
+        self.bnodes = 0
+
+    def parse(self, text: str) -> Iterator[Tuple[str, str, str]]:
+        self.tokens = _tokenize(text)
+        self.pos = 0
+        triples: List[Tuple[str, str, str]] = []
+        while self.pos < len(self.tokens):
+            kind, value = self.tokens[self.pos]
+            if kind in ("lang", "name") and value.lower() in ("@prefix", "@base", "prefix", "base"):
+                self._directive(value)
+            else:
+                self._triples(triples)
+                self._expect(".")
+            yield from triples
+            triples.clear()
+
+    def _next(self) -> Tuple[str, str]:
+        if self.pos >= len(self.tokens):
+            raise ValueError("Turtle troncato")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def _peek(self) -> str:
+        return self.tokens[self.pos][1] if self.pos < len(self.tokens) else ""
+
+    def _expect(self, value: str):
+        found = self._next()[1]
+        if found != value:
+            raise ValueError(f"Turtle non valido: atteso '{value}', trovato '{found}'")
+
+    def _directive(self, keyword: str):
+        self.pos += 1
+        if keyword.lower().endswith("prefix"):
+            prefix = self._next()[1]
+            self.prefixes[prefix[:-1]] = self._iri(self._next()[1])
+        else:
+            self.base = self._iri(self._next()[1])
+        if keyword.startswith("@"):
+            self._expect(".")
+
+    def _iri(self, token: str) -> str:
+        iri = unescape_literal(token[1:-1])
+        if self.base and not re.match(r'^[A-Za-z][A-Za-z0-9+.-]*:', iri):
+            iri = urllib.parse.urljoin(self.base, iri)
+        return iri
+
+    def _new_bnode(self) -> str:
+        self.bnodes += 1
+        return f"_:genid{self.bnodes}"
+
+    def _term(self, triples: List) -> str:
+        kind, value = self._next()
+        if kind == "iri":
+            return self._iri(value)
+        if kind == "pname":
+            prefix, _, local = value.partition(":")
+            if prefix not in self.prefixes:
+                raise ValueError(f"Prefisso non dichiarato: {prefix}")
+            return self.prefixes[prefix] + re.sub(r'\\(.)', r'\1', local)
+        if kind == "bnode":
+            return value
+        if kind in ("string", "long"):
+            quote = 3 if kind == "long" else 1
+            literal = Literal(unescape_literal(value[quote:-quote]))
+            if self.pos < len(self.tokens) and self.tokens[self.pos][0] == "lang":
+                self.pos += 1
+            elif self._peek() == "^^":
+                self.pos += 1
+                self._term(triples)
+            return literal
+        if kind in ("number", "name"):
+            return Literal(value)
+        if value == "[":
+            node = self._new_bnode()
+            if self._peek() != "]":
+                self._predicate_objects(node, triples)
+            self._expect("]")
+            return node
+        if value == "(":
+            # Le collezioni non servono all'indice: si consumano e si scartano
+            node = self._new_bnode()
+            while self._peek() != ")":
+                self._term(triples)
+            self.pos += 1
+            return node
+        raise ValueError(f"Turtle non valido: termine inatteso '{value}'")
+
+    def _triples(self, triples: List):
+        if self._peek() == "[":
+            subject = self._term(triples)
+            if self._peek() != ".":
+                self._predicate_objects(subject, triples)
+        else:
+            subject = self._term(triples)
+            self._predicate_objects(subject, triples)
+
+    def _predicate_objects(self, subject: str, triples: List):
+        while True:
+            if self._peek() == "a" and self.tokens[self.pos][0] == "name":
+                self.pos += 1
+                predicate = RDF_TYPE
+            else:
+                predicate = self._term(triples)
+            while True:
+                triples.append((subject, predicate, self._term(triples)))
+                if self._peek() != ",":
+                    break
+                self.pos += 1
+            # Uno o più ';' separano i predicati (anche finali)
+            if self._peek() != ";":
+                return
+            while self._peek() == ";":
+                self.pos += 1
+            if self._peek() in (".", "]", ""):
+                return
+
+
+def iter_ntriples(lines: Iterable[str]) -> Iterator[Tuple[str, str, str]]:
+    """Triple di un file N-Triples, una riga alla volta (memoria costante)"""
+    parser = _TurtleParser()
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield from parser.parse(line)
+
+
+def iter_turtle(text: str) -> Iterator[Tuple[str, str, str]]:
+    """Triple di un documento Turtle"""
+    return _TurtleParser().parse(text)
+
+
+# =============================================================================
+# GPML
+# =============================================================================
+
+def parse_gpml(data: bytes, filename: str = "") -> Iterator[Tuple[str, str, str, str, str]]:
+    """
+    Righe (label, id, titolo, url, organismo) di un file GPML.
+    Identificativo e revisione sono ricavati dal nome del file (WP123_456.gpml).
+    """
+    root = ET.fromstring(data)
+    namespace = root.tag[:root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+
+    match = _GPML_FILE.search(os.path.basename(filename))
+    if match:
+        identifier, revision = match.group(1).upper(), match.group(2)
+    else:
+        found = _WP_ID.search(root.get("Name", "") + " " + filename)
+        identifier, revision = (found.group(0) if found else ""), None
+    if not identifier:
+        return
+
+    url = f"https://identifiers.org/wikipathways/{identifier}"
+    if revision:
+        url += f"_r{revision}"
+    title = root.get("Name", "")
+    organism = root.get("Organism", "")
+
+    for node in root.iter(f"{namespace}DataNode"):
+        label = node.get("TextLabel")
+        if label and node.get("Type") in _GPML_GENE_TYPES:
+            yield label.strip(), identifier, title, url, organism
+
+
+# =============================================================================
+# INDICE
+# =============================================================================
+
+class _TripleCollector:
+    """Raccoglie dalle triple solo i predicati necessari e le unisce in righe d'indice"""
+
+    def __init__(self):
+        self.types: Dict[str, set] = {}
+        self.labels: Dict[str, set] = {}
+        self.part_of: Dict[str, set] = {}
+        self.pathways: Dict[str, Dict[str, str]] = {}
+
+    def add(self, subject: str, predicate: str, obj: str):
+        if predicate not in _PREDICATES:
+            return
+        if predicate == RDF_TYPE:
+            self.types.setdefault(subject, set()).add(obj)
+        elif predicate == RDFS_LABEL:
+            self.labels.setdefault(subject, set()).add(str(obj))
+        elif predicate == DCTERMS_IS_PART_OF:
+            self.part_of.setdefault(subject, set()).add(obj)
+        else:
+            self.pathways.setdefault(subject, {}).setdefault(predicate, str(obj))
+
+    def rows(self) -> Iterator[Tuple[str, str, str, str, str]]:
+        for subject, parents in self.part_of.items():
+            if WP_GENE_PRODUCT not in self.types.get(subject, ()):
+                continue
+            for pathway in parents:
+                props = self.pathways.get(pathway, {})
+                if (WP_PATHWAY not in self.types.get(pathway, ())
+                        or DC_TITLE not in props or DCTERMS_IDENTIFIER not in props):
+                    continue
+                for label in self.labels.get(subject, ()):
+                    yield (label, props[DCTERMS_IDENTIFIER], props[DC_TITLE],
+                           pathway, props.get(WP_ORGANISM_NAME, ""))
+
+
+class WikiPathwaysIndex:
+    """
+    Indice persistente label di gene -> pathway WikiPathways.
+
+    Equivale alla query di SPARQLAggregator.get_pathways_wikipathways, ma la
+    label è confrontata in forma normalizzata (maiuscolo) tramite un indice
+    B-tree, invece del FILTER UCASE che l'endpoint valuta riga per riga.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, create: bool = False):
+        """
+        Args:
+            path: File SQLite dell'indice
+            create: Crea l'indice se non esiste (costruzione); altrimenti un
+                    file mancante solleva FileNotFoundError come l'indice STRING
+        """
+        if not create and not os.path.exists(path):
+            raise FileNotFoundError(f"{path}: indice WikiPathways non trovato")
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pathways (
+                label TEXT NOT NULL,
+                organism TEXT NOT NULL,
+                id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                url TEXT NOT NULL,
+                PRIMARY KEY (label, organism, url, id, title)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    # -------------------------------------------------------------------------
+    # Costruzione
+    # -------------------------------------------------------------------------
+
+    def _insert(self, rows: Iterable[Tuple[str, str, str, str, str]]) -> int:
+        count = 0
+        batch = []
+        for label, identifier, title, url, organism in rows:
+            batch.append((label.upper(), organism, identifier, title, url))
+            if len(batch) >= 10000:
+                count += self._flush(batch)
+        return count + self._flush(batch)
+
+    def _flush(self, batch: List[Tuple]) -> int:
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO pathways VALUES (?, ?, ?, ?, ?)", batch)
+            inserted = self._conn.total_changes - before
+        batch.clear()
+        return inserted
+
+    @staticmethod
+    def _open_text(path: str):
+        if path.endswith(".gz"):
+            return gzip.open(path, "rt", encoding="utf-8")
+        return open(path, encoding="utf-8")
+
+    @staticmethod
+    def _kind(name: str) -> str:
+        name = name.lower()
+        if name.endswith(".gz"):
+            name = name[:-3]
+        for ext in (".gpml", ".ttl", ".nt"):
+            if name.endswith(ext):
+                return ext[1:]
+        return ""
+
+    def _ingest_member(self, name: str, data: bytes, collector: _TripleCollector) -> int:
+        kind = self._kind(name)
+        if name.lower().endswith(".gz"):
+            data = gzip.decompress(data)
+        if kind == "gpml":
+            return self._insert(parse_gpml(data, name))
+        if kind == "ttl":
+            for triple in iter_turtle(data.decode("utf-8")):
+                collector.add(*triple)
+        elif kind == "nt":
+            for triple in iter_ntriples(data.decode("utf-8").splitlines()):
+                collector.add(*triple)
+        return 0
+
+    def _ingest_path(self, path: str, collector: _TripleCollector) -> int:
+        if os.path.isdir(path):
+            count = 0
+            for dirpath, _, filenames in os.walk(path):
+                for filename in sorted(filenames):
+                    count += self._ingest_path(os.path.join(dirpath, filename), collector)
+            return count
+
+        if zipfile.is_zipfile(path):
+            count = 0
+            with zipfile.ZipFile(path) as archive:
+                for member in archive.namelist():
+                    if self._kind(member):
+                        count += self._ingest_member(member, archive.read(member), collector)
+            return count
+
+        kind = self._kind(path)
+        if kind == "nt":
+            # I dump N-Triples possono essere grandi: lettura riga per riga
+            with self._open_text(path) as f:
+                for triple in iter_ntriples(f):
+                    collector.add(*triple)
+            return 0
+        if kind:
+            with open(path, "rb") as f:
+                return self._ingest_member(path, f.read(), collector)
+        return 0
+
+    def build(self, sources: Iterable[str], replace: bool = True) -> int:
+        """
+        Costruisce l'indice da file o directory di dump WikiPathways.
+
+        Args:
+            sources: File .ttl/.nt/.gpml (anche .gz), archivi .zip o directory
+            replace: Svuota l'indice prima dell'importazione
+
+        Returns:
+            Numero di righe (label, pathway) inserite
+        """
+        sources = list(sources)
+        if replace:
+            with self._lock:
+                self._conn.execute("DELETE FROM pathways")
+
+        collector = _TripleCollector()
+        count = 0
+        for source in sources:
+            count += self._ingest_path(source, collector)
+        count += self._insert(collector.rows())
+
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                ("sources", "\n".join(os.path.abspath(s) for s in sources)),
+                ("built", time.strftime("%Y-%m-%dT%H:%M:%S"))
+            ])
+            self._conn.commit()
+        return count
+
+    # -------------------------------------------------------------------------
+    # Interrogazione
+    # -------------------------------------------------------------------------
+
+    def lookup(self, gene_symbol: str, organism: str = DEFAULT_ORGANISM_NAME) -> List[Dict[str, str]]:
+        """Pathway di un gene, nello stesso formato di get_pathways_wikipathways"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, title, url FROM pathways WHERE label = ? AND organism = ?",
+                (gene_symbol.upper(), organism)
+            ).fetchall()
+        return [{"id": identifier, "title": title, "url": url} for identifier, title, url in rows]
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            rows, labels, pathways = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT label), COUNT(DISTINCT url) FROM pathways"
+            ).fetchone()
+            meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        return {"rows": rows, "labels": labels, "pathways": pathways, "built": meta.get("built")}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# =============================================================================
+# COSTRUZIONE DA RIGA DI COMANDO
+# =============================================================================
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Costruisce l'indice locale WikiPathways da un dump RDF/GPML")
+    parser.add_argument("sources", nargs="+", help="File .ttl/.nt/.gpml (anche .gz), archivi .zip o directory")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="File SQLite dell'indice")
+    parser.add_argument("--append", action="store_true", help="Aggiunge all'indice esistente")
+    args = parser.parse_args()
+
+    start = time.time()
+    index = WikiPathwaysIndex(args.index, create=True)
+    count = index.build(args.sources, replace=not args.append)
+    stats = index.stats()
+    index.close()
+
+    print(f"[OK] {count} righe indicizzate in {time.time() - start:.1f}s")
+    print(f"     {stats['labels']} label, {stats['pathways']} pathway -> {args.index}")